@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import getopt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ccql_node import ccql_node
+
+N_BLOCKS = 100
+N_TRANSACTIONS = 200
+
+
+def print_usage():
+    print("Usage: bench_conversion.py [-h|--help] [-b|--blocks <n>] [-t|--transactions <n>] [-c|--columns]")
+    print("")
+    print("Conversion throughput of EVM blocks from JSON-RPC results into the data model, without node requests.")
+    print("With -c, transactions are converted into ccql_data.TransactionColumns instead of objects.")
+    print("")
+    sys.exit()
+
+
+def get_raw_transaction(height, i):
+    # legacy and EIP-1559 transactions, contract creations without recipient
+    raw_tx = {
+        "hash": "0x" + format(height * 100000 + i, "064x"),
+        "from": "0x" + format(i % 50 + 1, "040x"),
+        "to": "0x" + format(i % 80 + 1000, "040x"),
+        "value": hex(i * 10**16 + 1),
+        "gas": hex(21000 + i),
+        "input": "0x",
+    }
+    if i % 2 == 0:
+        raw_tx["gasPrice"] = hex(10**9 * (i + 1))
+    else:
+        raw_tx["maxFeePerGas"] = hex(3 * 10**10 + i)
+        raw_tx["maxPriorityFeePerGas"] = hex(10**9 + i)
+    if i % 10 == 0:
+        raw_tx["to"] = None
+        raw_tx["input"] = "0x6080604052"
+    return raw_tx
+
+
+def get_raw_block(height, n_transactions):
+    return {
+        "hash": "0x" + format(height, "064x"),
+        "number": hex(height),
+        "timestamp": hex(1600000000 + height),
+        "transactions": [ get_raw_transaction(height, i) for i in range(n_transactions) ]
+    }
+
+
+def run_benchmark(n_blocks, n_transactions, columnar_transactions):
+
+    node = ccql_node.Web3_EVM_Node("0x0")
+    raw_blocks = [ get_raw_block(height, n_transactions) for height in range(n_blocks) ]
+
+    start = time.perf_counter()
+    for raw_block in raw_blocks:
+        node.convert_block(raw_block, None, True, columnar_transactions)
+    duration = time.perf_counter() - start
+
+    n = n_blocks * n_transactions
+    print("Blocks:", n_blocks, "Transactions:", n)
+    print("Duration: %.3f s" % duration)
+    print("Throughput: %.0f transactions/s" % (n / duration))
+
+
+def parse_cli():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hb:t:c", ["help", "blocks=", "transactions=", "columns"])
+
+    except getopt.GetoptError as err:
+        print(err)
+        print_usage()
+
+    n_blocks = N_BLOCKS
+    n_transactions = N_TRANSACTIONS
+    columnar_transactions = False
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print_usage()
+        elif opt in ("-b", "--blocks"):
+            n_blocks = int(arg)
+        elif opt in ("-t", "--transactions"):
+            n_transactions = int(arg)
+        elif opt in ("-c", "--columns"):
+            columnar_transactions = True
+
+    run_benchmark(n_blocks, n_transactions, columnar_transactions)
+
+if __name__ == "__main__":
+    parse_cli()
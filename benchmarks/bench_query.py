@@ -0,0 +1,312 @@
+import os
+import io
+import sys
+import json
+import time
+import getopt
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import ccql
+import ccql_result_writer
+import ccql_node_connector
+from ccql_node import ccql_node
+from ccql_node import rpc_replay
+
+from bench_conversion import get_raw_transaction
+
+N_BLOCKS = 100
+N_TRANSACTIONS = 200
+N_ACCOUNTS = 1000
+N_REPEAT = 5
+
+CHAIN_KEY = "eth:main:1"
+
+# results of saved runs, one run per line, see save_result
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_query_results.ndjson")
+
+# increase of the duration against the last saved run reported as regression
+REGRESSION_THRESHOLD = 0.2
+
+# representative statements, {range} is replaced by the heights of the synthetic blocks
+STATEMENTS = [
+    ("headers", "Q BlockDesc.height S " + CHAIN_KEY + ":B.{range}"),
+    ("transactions", "Q T.id S " + CHAIN_KEY + ":B.{range}"),
+    ("transaction_filter", "Q T.id S " + CHAIN_KEY + ":B.{range} F Transaction.fee>0.0005"),
+    ("height_filter", "Q T.id S " + CHAIN_KEY + ":B.{range} F BlockDesc.height>={half}"),
+    ("limit", "Q T.id S " + CHAIN_KEY + ":B.{range} LIMIT 10 OFFSET 5"),
+    ("accounts", "Q A.id S " + CHAIN_KEY + ":B.{range}"),
+]
+
+# functions timed per stage, stages of concurrent threads overlap
+STAGES = [
+    ("rpc", rpc_replay.Replay_Provider, "make_batch_request"),
+    ("convert", ccql_node.Web3_EVM_Node, "convert_block"),
+    ("flatten", ccql_node_connector.CCQL_Node_Connector, "flatten_block"),
+    ("filter", ccql, "filter_source_objects"),
+    ("map", ccql, "map_query_results"),
+    ("output", ccql, "output_query_result"),
+]
+
+
+def print_usage():
+    print("Usage: bench_query.py [-h|--help] [-b|--blocks <n>] [-t|--transactions <n>] [-a|--accounts <n>] [-n|--repeat <n>]")
+    print("  [-l|--latency <ms>] [-f|--format <format>] [-q|--query <statement>] [-s|--save]")
+    print("")
+    print("End-to-end query throughput on synthetic blocks with <n> transactions between <n> accounts, replayed")
+    print("without node requests. Statements with -q may contain {range} for the block heights.")
+    print("With -s, results are appended to " + os.path.basename(RESULTS_FILE) + " and compared against by later runs.")
+    print("")
+    sys.exit()
+
+
+def get_address(n):
+    return "0x" + format(n + 1, "040x")
+
+
+def get_raw_block(height, n_transactions, n_accounts, full_transactions):
+
+    transactions = []
+    for i in range(n_transactions):
+        raw_tx = get_raw_transaction(height, i)
+        n = height * n_transactions + i
+        raw_tx["from"] = get_address(n % n_accounts)
+        if not raw_tx["to"] is None:
+            raw_tx["to"] = get_address((n * 7 + 1) % n_accounts)
+        transactions.append(raw_tx if full_transactions else raw_tx["hash"])
+
+    return {
+        "hash": "0x" + format(height, "064x"),
+        "parentHash": "0x" + format(height - 1, "064x"),
+        "number": hex(height),
+        "timestamp": hex(1600000000 + height),
+        "transactions": transactions
+    }
+
+
+def write_fixture(fixture_file, n_blocks, n_transactions, n_accounts):
+
+    # JSON-RPC calls of the block source, see module rpc_replay
+    with open(fixture_file, "w") as file:
+        file.write(json.dumps({ "method": "eth_blockNumber", "params": [], "result": hex(n_blocks) }) + "\n")
+        for height in range(1, n_blocks + 1):
+            for full_transactions in (True, False):
+                raw_block = get_raw_block(height, n_transactions, n_accounts, full_transactions)
+                file.write(json.dumps({ "method": "eth_getBlockByNumber", "params": [hex(height), full_transactions], "result": raw_block }) + "\n")
+
+
+class Stage_Timer:
+
+    def __init__(self):
+        self.durations = {}
+        self.lock = threading.Lock()
+        self.originals = []
+
+    def add(self, stage, duration):
+        with self.lock:
+            self.durations[stage] = self.durations.get(stage, 0.) + duration
+
+    def wrap(self, stage, owner, name):
+
+        function = getattr(owner, name)
+        timer = self
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timer.add(stage, time.perf_counter() - start)
+
+        self.originals.append((owner, name, function))
+        setattr(owner, name, timed)
+
+    def __enter__(self):
+        for (stage, owner, name) in STAGES:
+            self.wrap(stage, owner, name)
+        return self
+
+    def __exit__(self, *args):
+        for (owner, name, function) in reversed(self.originals):
+            setattr(owner, name, function)
+        self.originals = []
+
+
+def run_statement(statement, result_format):
+
+    # the result writer is kept for its number of rows
+    writers = []
+    get_result_writer = ccql_result_writer.get_result_writer
+
+    def get_counted_result_writer(result_format, output=None):
+        writers.append(get_result_writer(result_format, output))
+        return writers[-1]
+
+    output = io.BytesIO() if ccql_result_writer.RESULT_WRITERS[result_format].binary else io.StringIO()
+    ccql_result_writer.get_result_writer = get_counted_result_writer
+    try:
+        start = time.perf_counter()
+        ccql.process_query(statement.split(), result_format, output)
+        duration = time.perf_counter() - start
+    finally:
+        ccql_result_writer.get_result_writer = get_result_writer
+
+    return (duration, writers[0].n_rows)
+
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(RESULTS_FILE),
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_last_result(result):
+
+    # last saved run of the same statement and parameters
+    if not os.path.exists(RESULTS_FILE):
+        return None
+
+    keys = ("statement", "blocks", "transactions", "accounts", "latency", "format")
+    last_result = None
+    with open(RESULTS_FILE) as file:
+        for line in file:
+            if line.strip() == "":
+                continue
+            saved_result = json.loads(line)
+            if all(saved_result.get(key) == result[key] for key in keys):
+                last_result = saved_result
+    return last_result
+
+
+def save_result(result):
+    with open(RESULTS_FILE, "a") as file:
+        file.write(json.dumps(result) + "\n")
+
+
+def print_result(result, last_result):
+
+    print(result["name"] + ":", result["statement"])
+    print("  Duration: %.3f s (median of %d), Rows: %d" % (result["duration"], result["repeat"], result["rows"]))
+    print("  Throughput: %.0f transactions/s, %.0f blocks/s" % (result["transactions_per_s"], result["blocks_per_s"]))
+    print("  Peak memory: %.1f MB" % (result["peak_memory"] / 1024**2))
+    print("  Stages:", ", ".join("%s %.3f s" % (stage, duration) for (stage, duration) in result["stages"].items()))
+
+    if not last_result is None:
+        change = result["duration"] / last_result["duration"] - 1
+        memory_change = result["peak_memory"] / last_result["peak_memory"] - 1
+        print("  Change: %+.1f%% duration, %+.1f%% peak memory against %s (%s)%s" % (100 * change, 100 * memory_change,
+            last_result["commit"], last_result["date"], ", REGRESSION" if change > REGRESSION_THRESHOLD else ""))
+
+
+def run_benchmark(statements, n_blocks, n_transactions, n_accounts, n_repeat, latency, result_format, save):
+
+    with tempfile.TemporaryDirectory() as fixture_dir:
+
+        fixture_file = rpc_replay.get_fixture_file(fixture_dir, CHAIN_KEY)
+        write_fixture(fixture_file, n_blocks, n_transactions, n_accounts)
+
+        for (name, statement) in statements:
+            statement = statement.replace("{range}", "1.." + str(n_blocks)).replace("{half}", str(n_blocks // 2 + 1))
+
+            # the node of the source replays the synthetic blocks, without cache
+            node = ccql_node.Web3_EVM_Node("0x0", settings={ "RPC_REPLAY_FILE": fixture_file, "REPLAY_LATENCY": latency })
+            ccql_node_connector.CCQL_Node_Connector.node_connections[CHAIN_KEY] = node
+
+            durations = []
+            stages = {}
+            for i in range(n_repeat):
+                with Stage_Timer() as timer:
+                    (duration, n_rows) = run_statement(statement, result_format)
+                durations.append(duration)
+                for (stage, stage_duration) in timer.durations.items():
+                    stages.setdefault(stage, []).append(stage_duration)
+
+            # peak memory is measured in a separate run, tracing slows down the query
+            tracemalloc.start()
+            run_statement(statement, result_format)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            duration = statistics.median(durations)
+            result = {
+                "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "commit": get_commit(),
+                "python": platform.python_version(),
+                "name": name,
+                "statement": statement,
+                "blocks": n_blocks,
+                "transactions": n_transactions,
+                "accounts": n_accounts,
+                "latency": latency,
+                "format": result_format,
+                "repeat": n_repeat,
+                "duration": duration,
+                "rows": n_rows,
+                "transactions_per_s": n_blocks * n_transactions / duration,
+                "blocks_per_s": n_blocks / duration,
+                "peak_memory": peak_memory,
+                "stages": { stage: statistics.median(stages[stage]) for (stage, owner, name) in STAGES if stage in stages }
+            }
+
+            print_result(result, get_last_result(result))
+            if save:
+                save_result(result)
+
+    del ccql_node_connector.CCQL_Node_Connector.node_connections[CHAIN_KEY]
+
+
+def parse_cli():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hb:t:a:n:l:f:q:s",
+            ["help", "blocks=", "transactions=", "accounts=", "repeat=", "latency=", "format=", "query=", "save"])
+
+    except getopt.GetoptError as err:
+        print(err)
+        print_usage()
+
+    n_blocks = N_BLOCKS
+    n_transactions = N_TRANSACTIONS
+    n_accounts = N_ACCOUNTS
+    n_repeat = N_REPEAT
+    latency = 0
+    result_format = ccql_result_writer.FORMAT_NDJSON
+    statements = STATEMENTS
+    save = False
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print_usage()
+        elif opt in ("-b", "--blocks"):
+            n_blocks = int(arg)
+        elif opt in ("-t", "--transactions"):
+            n_transactions = int(arg)
+        elif opt in ("-a", "--accounts"):
+            n_accounts = int(arg)
+        elif opt in ("-n", "--repeat"):
+            n_repeat = int(arg)
+        elif opt in ("-l", "--latency"):
+            latency = float(arg) / 1000
+        elif opt in ("-f", "--format"):
+            result_format = arg
+        elif opt in ("-q", "--query"):
+            statements = [("query", arg)]
+        elif opt in ("-s", "--save"):
+            save = True
+
+    if not result_format in ccql_result_writer.RESULT_WRITERS:
+        print("Error: result format", result_format, "not in", list(ccql_result_writer.RESULT_WRITERS.keys()))
+        sys.exit()
+
+    run_benchmark(statements, n_blocks, n_transactions, n_accounts, n_repeat, latency, result_format, save)
+
+if __name__ == "__main__":
+    parse_cli()
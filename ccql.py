@@ -1,457 +1,1089 @@
-from encodings import normalize_encoding
-from inspect import ArgSpec
-from os import stat
-import sys
-import getopt
-import re
-import math
-import uuid
-from unittest import result
-
-import ccql_node_connector
-import ccql_identity_provider
-
-from ccql_node import ccql_data
-
-CCQL_VERSION = "CCQL test environment v0.1"
-R_MAX = "r_max"
-
-def print_usage():
-    print("Usage: ccql.py [-h|--help] <query_statement>")
-    print("")
-    print("CCQL Test environment.")
-    print("")
-    print("Query Statement:")
-    print("")
-    print("<query_statement> = ")
-    print("  Q <query_attribut_spec>(, <query_attribut_spec>)*  ")
-    print("  S <source_spec>(, <source_spec>)*  ")
-    print("  [F <filter_spec>(, <filter_spec>)*];")
-    print("")
-    print("For details, refer to the EBNF grammar specification.")
-    print("")
-    sys.exit()
-
-
-def process_query(query_statement):
-
-    query_attribute_clause = []
-    source_clause = []
-    filter_clause = []
-    result_map = {}
-
-    clause_selector = ""
-
-    # query statement per definition from the data model, see module ccql_data
-    for token in query_statement:
-
-        if token in ccql_data.Q_CLAUSES:
-            clause_selector = token
-
-        elif clause_selector == ccql_data.Q:
-            query_attr_spec = parse_query_clause(token)
-            query_attribute_clause.append(query_attr_spec)
-
-        elif clause_selector == ccql_data.S:
-            source_spec = parse_source_clause(token)
-            source_clause.append(source_spec)
-
-        elif clause_selector == ccql_data.F:
-            filter_spec = parse_filter_clause(token)
-            filter_clause.append(filter_spec)
-
-        else:
-            if len(clause_selector) > 0:
-                print("Format error in:", clause_selector, "clause")
-                print("Statement token:", token)
-            else:
-                print("Format error, missing query statement")
-            sys.exit()
-
-    i = 0
-    if len(query_attribute_clause) > 0:
-        for source_spec in source_clause:
-            i += 1
-            process_query_for_source(source_spec, i, query_attribute_clause, result_map)
-
-    output_query_result(query_attribute_clause, i, result_map, filter_clause)
-
-
-def parse_query_clause(input):
-
-    statement = input.strip().rstrip(',').strip()
-    query_attr_spec = statement.split('.')
-    
-    if len(query_attr_spec) != 2:
-        print("Error: format error in query clause, not using syntax <class>.<attribute>")
-        sys.exit()
-    elif not query_attr_spec[0] in ccql_data.CCQL_CLASSES:
-        print("Error: format error in query clause, <class> not in", ccql_data.CCQL_CLASSES)
-        sys.exit()
-
-    if not isinstance(statement, str):
-        print("Error: non-string value in query clause")
-        sys.exit()
-
-    return query_attr_spec
-
-
-def parse_source_clause(input):
-
-    statement = input.strip().rstrip(',').strip()
-    source_attr_spec = statement.split(':')
-
-    if len(source_attr_spec) < 3 or len(source_attr_spec) > 4:
-        print("Error: format error in source clause, not using syntax <blockchain_instance>:<network_instance>:<chain_descriptor_instance>", "\n")
-        print("Data model <blockchain_instance>:<network_instance>:<chain_descriptor_instance> =", ccql_data.get_chain_instance_list())
-        sys.exit()
-    elif len(source_attr_spec) == 4:
-        optional_source_spec = source_attr_spec[3].split(".")
-        if len(optional_source_spec) != 2 or not optional_source_spec[0] in ccql_data.SOURCE_SPEC_OPTIONAL:
-            print("Error: format error in source clause, not using syntax <blockchain_instance>:<network_instance>:<chain_descriptor_instance>:[<source>.<block_instance>|<source>.<transaction_instance>|<source>.<account_instance>] with <source> not in", ccql_data.SOURCE_SPEC_OPTIONAL, "\n")
-            print("Data model <blockchain_instance>:<network_instance>:<chain_descriptor_instance> =", ccql_data.get_chain_instance_list())
-            sys.exit()
-        
-    if not isinstance(statement, str):
-        print("Error: non-string value in source clause")
-        sys.exit()
-
-    blockchain_inst = parse_attribute(source_attr_spec[0])
-    network_inst = parse_attribute(source_attr_spec[1])
-    chain_desc_inst = parse_attribute(source_attr_spec[2])
-    optional_source_class = ""
-    optional_source_inst = ""
-
-    if len(source_attr_spec) == 4:
-        optional_source_class = parse_class(source_attr_spec[3])
-        optional_source_inst = parse_attribute(source_attr_spec[3])
-    
-    return (blockchain_inst, network_inst, chain_desc_inst, optional_source_class, optional_source_inst)
-
-
-def parse_filter_clause(input):
-
-    statement = input.strip().rstrip(',').strip()
-    statement = re.sub('(\w)=(\w)', r'\1==\2', statement)
-
-    filter_syntax = '(\S+)\.(\S+)(==|!=|<=|>=|<|>)(\S+)'
-    filter_spec = re.findall(filter_syntax, statement)
-
-    if len(filter_spec) != 1 or len(filter_spec[0]) != 4:
-        print("Filter specification:", filter_spec)
-        print("Error: format error in filter clause, not syntax <class>.<attribute> <operator> <value> with <operator> not in (==|!=|<|>|<=|>=)")
-        sys.exit()
-
-    if not isinstance(statement, str):
-        print("Error: non-string value in filter clause")
-        sys.exit()
-    
-    filter_class = filter_spec[0][0]
-    filter_attr = filter_spec[0][1]
-    filter_operator = filter_spec[0][2]
-    filter_value = filter_spec[0][3]
-    
-    if not filter_class in ccql_data.CCQL_CLASSES:
-        print("Error: format error in filter clause, not starting with syntax <class>.<attribute> or <class> not in", ccql_data.CCQL_CLASSES)
-        sys.exit()
-
-    return (filter_class, filter_attr, filter_operator, filter_value)
-
-
-def process_query_for_source(source_spec, i, query_attribute_clause, result_map):
-
-    # source specification
-    blockchain_inst = source_spec[0]
-    network_inst = source_spec[1]
-    chain_desc_inst = source_spec[2]
-    optional_source_class = source_spec[3]
-    optional_source_inst = source_spec[4]
-
-    node_connector = ccql_node_connector.CCQL_Node_Connector(blockchain_inst, network_inst, chain_desc_inst)
-    identity_acc = ccql_identity_provider.CCQL_Identity_Provider()
-    
-    # optional source specifications: blocks, transactions, accounts, assets, tokens, data
-    if len(optional_source_class) > 0:
-        if optional_source_class == ccql_data.BLOCK or optional_source_class == ccql_data.BLOCK_S:
-            (block, block_desc, status, linked_block_desc, validation_desc, val_desc_proposer, val_desc_creator, val_desc_att, tx, acc) = node_connector.get_block(optional_source_inst)
-            map_query_result(query_attribute_clause, i, ccql_data.BLOCK, ccql_data.BLOCK_S, block, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.BLOCK_DESC, None, block_desc, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.BLOCK_STATUS, None, status, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.BLOCK_DESC_LINKED, None, linked_block_desc, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.BLOCK_VALIDATION_DESC, None, validation_desc, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.BLOCK_VALIDATOR_PROPOSER, None, val_desc_proposer, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.BLOCK_VALIDATOR_CREATOR, None, val_desc_creator, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.BLOCK_VALIDATOR_ATTESTER, None, val_desc_att, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.TRANSACTION, ccql_data.TRANSACTION_S, tx, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.ACCOUNT, ccql_data.ACCOUNT_S, acc, result_map)
-        elif optional_source_class == ccql_data.ACCOUNT or optional_source_class == ccql_data.ACCOUNT_S:
-            (account, accountDesc, asset, assetType, token, tokenType, data, storageType) = node_connector.get_account(optional_source_inst)
-            map_query_result(query_attribute_clause, i, ccql_data.ACCOUNT, ccql_data.ACCOUNT_S, account, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.ACCOUNT_DESC, None, accountDesc, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.ACCOUNT_ASSET, ccql_data.ACCOUNT_ASSET_S, asset, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.ACCOUNT_ASSET_TYPE, None, assetType, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.ACCOUNT_TOKEN, ccql_data.ACCOUNT_TOKEN_S, token, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.ACCOUNT_TOKEN_TYPE, None, tokenType, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.ACCOUNT_DATA, ccql_data.ACCOUNT_DATA_S, data, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.ACCOUNT_STORAGE_TYPE, None, storageType, result_map)
-        elif optional_source_class == ccql_data.TRANSACTION or optional_source_class == ccql_data.TRANSACTION_S:
-            (tx, txDesc, utxo) = node_connector.get_transaction(optional_source_inst)
-            map_query_result(query_attribute_clause, i, ccql_data.TRANSACTION, ccql_data.TRANSACTION_S, tx, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.TRANSACTION_DESC, None, txDesc, result_map)
-            map_query_result(query_attribute_clause, i, ccql_data.UTXO, None, utxo, result_map)
-        else:
-            print("Unknown optional source class:", optional_source_class)
-            sys.exit()
-    
-
-def parse_class_attribute(statement):
-    class_attr = statement.split('.')
-    return (class_attr[0], class_attr[-1])
-    
-def parse_class(statement):
-    class_attr = statement.split('.')
-    return class_attr[0]
-    
-def parse_attribute(statement):
-    class_attr = statement.split('.')
-    return class_attr[-1]
-    
-
-def map_query_result(query_attribute_clause, i, source_type, source_type_short, result, result_map):
-
-    result_map_key = str(i) + ":" + str(source_type)
-
-    if not source_type in result_map.keys():
-        result_map[result_map_key] = {}
-
-    for r in result:
-        if not 'id' in dir(r):
-            r.id = str(uuid.uuid4())
-        result_map[result_map_key][r.id] = r
-
-    for i in range(0, len(query_attribute_clause)):
-        cl = query_attribute_clause[i][0]
-        if cl == source_type_short:
-            query_attribute_clause[i][0] = source_type
-
-
-def append_result(result_map, source_type, key, result_value):
-
-    if key in result_map[source_type].keys():
-        # append
-        result_map[source_type][key].append(str(result_value))
-    else:
-        # initialize
-        if (len(str(result_value)) > 0):
-            result_map[source_type][key] = [str(result_value)]
-        else:
-            result_map[source_type][key] = []
-
-def output_query_result(query_attribute_clause, i, result_map, filter_clause):
-
-    print()
-    print("Query results:\n")
-    output_query_result_by_attribute(query_attribute_clause, i, result_map, filter_clause)
-    print()
-    #print("DEBUG: Raw result data")
-    #print(result_map)
-
-    
-def output_query_result_by_attribute(query_attribute_clause, i, result_map, filter_clause):
-
-    types_output = ""
-    types_output = append_query_result_types(i, result_map, types_output, query_attribute_clause)
-    print(types_output)
-    (n_rows, rows_output) = append_query_result_values(i, result_map, query_attribute_clause, filter_clause)
-    for row in rows_output:
-        print(row)
-
-    print("\nNumber of rows:", n_rows)
-
-
-def append_query_result_types(i, result_map, types_output, query_attribute_clause):
-
-    for source_id in range(1, i+1):
-        for qa in query_attribute_clause:
-            qa_class = qa[0]
-            qa_attr = qa[-1]
-            types_output += str(source_id) + ":" + qa_class + "." + qa_attr + "|"
-
-    return types_output
-
-
-def append_query_result_value(output, value, n_rows_remaining):
-
-    if isinstance(value, list):
-        # output multiple rows
-        if len(value) > 0:
-            n_rows_remaining = int(n_rows_remaining / len(value))
-        for val in value:
-            for i in range(0, n_rows_remaining):
-                # output ID if exists, string value otherwise
-                if hasattr(val, "id"):
-                    output[-1].append(val.id)
-                else:
-                    output[-1].append(str(val))
-    else:
-        # output one row
-        for i in range(0, n_rows_remaining):
-            # output ID if exists, string value otherwise
-            if hasattr(value, "id"):
-                output[-1].append(value.id)
-            else:
-                output[-1].append(str(value))
-
-
-def apply_filter(cls, attr, val, filter_clause):
-
-    if len(filter_clause) < 1:
-        return True
-    if cls == filter_clause[0][0] and attr == filter_clause[0][1]:
-        if eval(f'{val} {filter_clause[0][2]} {filter_clause[0][3]}'):
-            #print("Filter function", f'{val} {filter_clause[0][2]} {filter_clause[0][3]}', "is True")
-            return True
-        else:
-            #print("Filter function", f'{val} {filter_clause[0][2]} {filter_clause[0][3]}', "is False")
-            return False
-    else:
-        return True
-
-
-def append_query_result_values(i, result_map, query_attribute_clause, filter_clause):
-
-    n_rows = 1
-
-    # check attributes for each source
-    for source_id in range(1, i+1):
-        for q in query_attribute_clause:
-            query_attr_spec = get_query_attributes(q)
-            source_type = query_attr_spec[0]
-            attr = query_attr_spec[-1]
-            q_rows = 0
-            source_key = str(source_id) + ":" + source_type
-
-            if not source_key in result_map.keys():
-                print("\nAbort:", source_key, "could not be constructed from the given source clause\n")
-                sys.exit()
-
-            for r in result_map[source_key].values():
-                val = getattr(r, attr)
-                if apply_filter(source_type, attr, val, filter_clause):
-                    if isinstance(val, list):
-                        q_rows += len(val)
-                    else:
-                        q_rows += 1
-            n_rows *= q_rows
-
-    n_rows_remaining = n_rows
-    output_columns = []
-    
-    # output result for each source
-    for source_id in range(1, i+1):
-        for q in query_attribute_clause:
-            query_attr_spec = get_query_attributes(q)
-            source_type = query_attr_spec[0]
-            attr = query_attr_spec[-1]
-            source_key = str(source_id) + ":" + source_type
-            output_columns.append([])
-
-            for r in result_map[source_key].values():
-                val = getattr(r, attr)
-                if apply_filter(source_type, attr, val, filter_clause):
-                    append_query_result_value(output_columns, val, n_rows_remaining)
-    
-    n_columns = len(output_columns)
-
-    # output result rows
-    rows_output = []
-    for i in range(0, n_rows):
-        values_output = ""
-        for j in range(0, n_columns):
-            values_output += output_columns[j][i] + "|"
-        rows_output.append(values_output)
-    
-    # return result as a set
-    rows_output = list(dict.fromkeys(rows_output))
-    return (len(rows_output), rows_output)
-
-
-def cart_product_last(relations, attributes):
-    
-    for r in relations:
-
-        n_rows = 1
-
-        for a in attributes:
-            if a in r.keys() and isinstance(r[a], list):
-                n_rows *= len(r[a])
-
-        rep_rows = n_rows
-        output_columns = []
-
-        for a in attributes:
-            if not a in r.keys():
-                print("Attribute not found:", a)
-                continue
-            output_columns.append([])
-            if isinstance(r[a], list):
-                rep_rows = int(rep_rows / len(r[a]))
-                for val in r[a]:
-                    for i in range(0, rep_rows):
-                        output_columns[-1].append(str(val))
-            else:
-                for i in range(0, rep_rows):
-                    output_columns[-1].append(str(r[a]))
-    
-    return output_columns
-
-
-def get_query_attributes(query_specification):
-
-    if type(query_specification) is tuple or type(query_specification) is list:
-        return query_specification
-
-    query_attr_spec = query_specification.split(".")
-
-    if not len(query_attr_spec) == 2:
-        print("Error: format error in query clause")
-        sys.exit(1)
-
-    return query_attr_spec
-
-
-def get_query_args(args):
-    if len(args) == 1:
-        # query statement is in one argument, possibly given in quotes
-        quoted_args = args[0].split(" ")
-        return quoted_args
-    return args
-
-
-def parse_cli():
-
-    try:
-        opts, args = getopt.getopt(sys.argv[1:], "qh",
-            ["query"])
-
-    except getopt.GetoptError as err:
-        print(err)
-        print_usage()
-
-    if len(opts) < 1 and len(args) > 0:
-        # no options given, assuming query statement follows
-        query_args = get_query_args(args)
-        process_query(query_args)
-    elif len(args) < 1:
-        print_usage()
-
-    for opt, arg in opts:
-        if opt in ("-q", "--query"):
-            query_args = get_query_args(args)
-            process_query(query_args)
-        elif opt in ("-h", "--help"):
-            print_usage()
-        else:
-            print(CCQL_VERSION)
-
-parse_cli()
+import sys
+import getopt
+import re
+import math
+import itertools
+import operator
+import threading
+import contextlib
+import contextvars
+
+import ccql_result_writer
+
+from ccql_node import ccql_data
+from ccql_node import query_profile
+from ccql_node import metrics
+
+CCQL_VERSION = "CCQL test environment v0.1"
+
+# seconds to wait for the results of the source specifications
+SOURCE_TIMEOUT = 300
+
+# comparison functions of the filter clause
+FILTER_OPERATORS = { "==": operator.eq, "!=": operator.ne, "<>": operator.ne, "<": operator.lt, ">": operator.gt, "<=": operator.le, ">=": operator.ge }
+
+# list attributes contribute one value per element, transactions of a block may be kept as columns, see ccql_data.TransactionColumns
+LIST_TYPES = (list, ccql_data.TransactionColumns)
+
+# integer keys of written objects without id, counted per query, see get_query_result_value
+result_keys = contextvars.ContextVar("result_keys", default=None)
+
+# join predicates <source>:<class>.<attribute>=<source>:<class>.<attribute> of the filter clause
+JOIN_SYNTAX = '(\d+):(\w+)\.(\w+)(==|!=|<>|<=|>=|<|>)(\d+):(\w+)\.(\w+)'
+
+def print_usage():
+    print("Usage: ccql.py [-h|--help] [-f|--format <format>] [-o|--output <file>] [-r|--record <dir>] [-p|--replay <dir> [-l|--latency <ms>]]")
+    print("  [-m|--metrics <exporter>] <query_statement>")
+    print("")
+    print("CCQL Test environment.")
+    print("")
+    print("Query Statement:")
+    print("")
+    print("<query_statement> = ")
+    print("  Q <query_attribut_spec>(, <query_attribut_spec>)*  ")
+    print("  S <source_spec>(, <source_spec>)*  ")
+    print("  [F <filter_spec>(, <filter_spec>)*( OR <filter_spec>(, <filter_spec>)*)*]")
+    print("  [LIMIT <n> [OFFSET <m>]];")
+    print("")
+    print("<source_spec> instances: <source>.<id>, lists <source>.<id>,<id>,...")
+    print("  and block ranges B.<from>..<to>, e.g. eth:main:1:B.1000..2000")
+    print("")
+    print("Filter specifications separated by , must all apply, OR separates alternatives")
+    print("")
+    print("Join predicates <n>:<class>.<attribute>=<m>:<class>.<attribute> of the filter clause combine the objects")
+    print("  of sources <n> and <m> with equal attribute values by hash joins, e.g. F 1:Account.id=2:Account.id")
+    print("")
+    print("LIMIT and OFFSET select transactions per block or of a transaction list")
+    print("")
+    print("Result formats: text (default), ndjson, csv, arrow (IPC stream), parquet")
+    print("  written to stdout or <file>, arrow and parquet require pyarrow")
+    print("")
+    print("JSON-RPC calls are recorded to fixture files in <dir> with -r, or replayed from <dir> with -p")
+    print("  without network access, replayed requests are delayed by <ms> milliseconds")
+    print("")
+    print("EXPLAIN <query_statement> writes the planned source fetches, pushed down predicates and projections,")
+    print("  EXPLAIN ANALYZE <query_statement> runs the query and adds time, JSON-RPC requests, bytes, objects and rows per stage")
+    print("")
+    print("Metrics and traces of queries, JSON-RPC requests per chain and method, and cache lookups are exported")
+    print("  with -m to <exporter> = histograms (summary on stderr), prometheus:<file> or otlp[:<collector url>]")
+    print("")
+    print("For details, refer to the EBNF grammar specification.")
+    print("")
+    sys.exit()
+
+
+def process_query(query_statement, result_format=ccql_result_writer.FORMAT_TEXT, output=None):
+
+    # duration and failures of queries, see module metrics
+    with metrics.span("ccql_query"):
+
+        result_writer = ccql_result_writer.get_result_writer(result_format, output)
+
+        # EXPLAIN writes the plan of the query instead of its results, EXPLAIN ANALYZE runs the query
+        # and writes the plan with the profile of the query, see module query_profile
+        (explain, analyze, query_statement) = parse_explain_prefix(query_statement)
+        if not analyze:
+            process_query_statement(query_statement, result_format, output, result_writer, explain)
+            return
+
+        profile = query_profile.Query_Profile()
+        token = query_profile.current_profile.set(profile)
+        try:
+            process_query_statement(query_statement, result_format, output, result_writer, explain, profile)
+        finally:
+            query_profile.current_profile.reset(token)
+
+
+def parse_explain_prefix(query_statement):
+
+    explain = len(query_statement) > 0 and query_statement[0] == ccql_data.EXPLAIN
+    if not explain:
+        return (False, False, query_statement)
+    analyze = len(query_statement) > 1 and query_statement[1] == ccql_data.ANALYZE
+    return (explain, analyze, query_statement[1 + int(analyze):])
+
+
+def process_query_statement(query_statement, result_format, output, result_writer, explain=False, profile=None):
+
+    query_attribute_clause = []
+    source_clause = []
+    filter_clause = []
+    join_clause = []
+    tx_limit = None
+    tx_offset = None
+    result_map = {}
+
+    clause_selector = ""
+
+    # query statement per definition from the data model, see module ccql_data
+    with query_profile.measure(query_profile.STAGE_PARSE):
+        for token in join_operator_tokens(query_statement):
+
+            if token in ccql_data.Q_CLAUSES:
+                clause_selector = token
+
+            elif clause_selector == ccql_data.Q:
+                query_attr_spec = parse_query_clause(token)
+                query_attribute_clause.append(query_attr_spec)
+
+            elif clause_selector == ccql_data.S:
+                source_spec = parse_source_clause(token)
+                source_clause.append(source_spec)
+
+            elif clause_selector == ccql_data.F and token == ccql_data.OR and len(join_clause) > 0:
+                print("Error: format error in filter clause, join predicates are not supported with", ccql_data.OR)
+                sys.exit()
+
+            elif clause_selector == ccql_data.F and token == ccql_data.OR and len(filter_clause) > 0:
+                filter_clause.append([])
+
+            elif clause_selector == ccql_data.F and is_join_spec(token):
+                join_spec = parse_join_clause(token, len(source_clause))
+                join_clause.append(join_spec)
+
+            elif clause_selector == ccql_data.F:
+                filter_spec = parse_filter_clause(token)
+                if len(filter_clause) == 0:
+                    filter_clause.append([])
+                filter_clause[-1].append(filter_spec)
+
+            elif clause_selector == ccql_data.LIMIT and tx_limit is None:
+                tx_limit = parse_limit_clause(token, clause_selector)
+
+            elif clause_selector == ccql_data.OFFSET and tx_offset is None:
+                tx_offset = parse_limit_clause(token, clause_selector)
+
+            else:
+                if len(clause_selector) > 0:
+                    print("Format error in:", clause_selector, "clause")
+                    print("Statement token:", token)
+                else:
+                    print("Format error, missing query statement")
+                sys.exit()
+
+    if tx_offset is None:
+        tx_offset = 0
+    limit_clause = (tx_limit, tx_offset)
+
+    # join predicates apply to the combined results of all sources, not to alternatives
+    if len(join_clause) > 0 and len(filter_clause) > 1:
+        print("Error: format error in filter clause, join predicates are not supported with", ccql_data.OR)
+        sys.exit()
+
+    if len(filter_clause) > 0 and len(filter_clause[-1]) == 0:
+        print("Format error in:", ccql_data.F, "clause, missing filter specification after", ccql_data.OR)
+        sys.exit()
+
+    # filter clause as a disjunction of conjunctions, with predicates on block heights and
+    # transaction ids applied before blocks and transactions are requested
+    with query_profile.measure(query_profile.STAGE_PLAN):
+        query_classes = plan_query_classes(query_attribute_clause, filter_clause, join_clause)
+        filter_plan = (compile_filter_clause(filter_clause), plan_block_heights(filter_clause), plan_transaction_ids(filter_clause))
+
+    if explain:
+        query_plan = explain_query(query_statement, query_attribute_clause, source_clause, filter_clause, join_clause, limit_clause, query_classes, filter_plan)
+        if profile is None:
+            output_query_plan(query_plan, result_writer)
+            return
+        # rows of the query are counted, not written
+        query_result_writer = result_writer
+        result_writer = ccql_result_writer.Result_Writer()
+
+    # messages are written to stderr while structured results are written to stdout
+    messages = contextlib.nullcontext()
+    if result_format != ccql_result_writer.FORMAT_TEXT and output is None:
+        messages = contextlib.redirect_stdout(sys.stderr)
+
+    i = 0
+    if len(query_attribute_clause) > 0:
+        # asyncio is only loaded for queries with sources, not for usage and format errors
+        import asyncio
+        with messages:
+            asyncio.run(process_query_sources(source_clause, query_classes, limit_clause, filter_plan, result_map))
+        i = len(source_clause)
+
+    token = result_keys.set(itertools.count())
+    try:
+        # objects of joined classes of the sources are combined by hash joins instead of a cartesian product
+        relations = None
+        if len(join_clause) > 0 and i > 0:
+            with query_profile.measure(query_profile.STAGE_JOIN):
+                relations = join_query_results(result_map, join_clause)
+
+        with query_profile.measure(query_profile.STAGE_OUTPUT):
+            output_query_result(query_attribute_clause, i, result_map, result_writer, relations)
+    finally:
+        result_keys.reset(token)
+
+    if not profile is None:
+        query_profile.add(query_profile.STAGE_OUTPUT, rows=result_writer.n_rows)
+        profile.stop()
+        output_query_plan(query_plan + profile.get_lines(), query_result_writer)
+
+
+def plan_transaction_fetch(query_classes):
+
+    # block headers are sufficient unless transactions or classes derived from them are queried,
+    # transactions are kept as columns if only attributes of Transaction are queried
+    full_transactions = not query_classes.isdisjoint(ccql_data.BLOCK_TRANSACTION_CLASSES)
+    columnar_transactions = query_classes.isdisjoint(ccql_data.TRANSACTION_OBJECT_CLASSES)
+    return (full_transactions, columnar_transactions)
+
+
+def explain_query(query_statement, query_attribute_clause, source_clause, filter_clause, join_clause, limit_clause, query_classes, filter_plan):
+
+    # planned fetches of each source with the predicates and projections pushed down to the source
+    (filter_groups, height_ranges, transaction_ids) = filter_plan
+    (tx_limit, tx_offset) = limit_clause
+    (full_transactions, columnar_transactions) = plan_transaction_fetch(query_classes)
+
+    query_plan = [ "Query: " + " ".join(query_statement) ]
+    query_plan.append("Projection: " + ", ".join(get_query_result_types(len(source_clause), query_attribute_clause)))
+    query_plan.append("Classes built: " + ", ".join(sorted(query_classes)))
+
+    i = 0
+    for (blockchain_inst, network_inst, chain_desc_inst, source_class, source_inst) in source_clause:
+        i += 1
+        source_class = ccql_data.CCQL_CLASSES_S.get(source_class, source_class)
+        if isinstance(source_inst, range):
+            instances = "%d..%d" % (source_inst[0], source_inst[-1])
+        else:
+            instances = ",".join(source_inst)
+        instances += ", instances: " + str(len(source_inst))
+        query_plan.append("Source " + str(i) + ": " + ":".join((blockchain_inst, network_inst, chain_desc_inst)) + " " + source_class + " " + instances)
+
+        if source_class == ccql_data.BLOCK:
+            if not full_transactions:
+                query_plan.append("  Fetch: block headers with transaction hashes")
+            elif columnar_transactions:
+                query_plan.append("  Fetch: blocks with transactions, converted into transaction columns")
+            else:
+                query_plan.append("  Fetch: blocks with transactions, converted into transaction objects")
+            if not height_ranges is None:
+                query_plan.append("  Pushed down: " + ccql_data.BLOCK_DESC + ".height in " + " or ".join(format_height_range(r) for r in height_ranges) + ", other blocks are not requested")
+        elif source_class == ccql_data.TRANSACTION:
+            query_plan.append("  Fetch: transactions by id")
+            if not transaction_ids is None:
+                query_plan.append("  Pushed down: " + ccql_data.TRANSACTION + ".id in " + ",".join(sorted(transaction_ids)) + ", other transactions are not requested")
+        elif source_class == ccql_data.ACCOUNT:
+            query_plan.append("  Fetch: account balances")
+
+        if source_class in (ccql_data.BLOCK, ccql_data.TRANSACTION) and (not tx_limit is None or tx_offset > 0):
+            query_plan.append("  Pushed down: " + ccql_data.LIMIT + " " + str(tx_limit) + " " + ccql_data.OFFSET + " " + str(tx_offset) + ", only selected transactions are converted")
+
+    if len(filter_groups) > 0:
+        query_plan.append("Filter: " + (" " + ccql_data.OR + " ").join(", ".join(filter_class + "." + filter_attr + filter_operator + filter_value
+            for (filter_class, filter_attr, filter_operator, filter_value) in filter_group) for filter_group in filter_clause))
+
+    for join_spec in join_clause:
+        query_plan.append("Hash join: " + " = ".join(format_join_side(join_side) for join_side in join_spec) + ", hash table of the smaller input")
+
+    return query_plan
+
+
+def format_height_range(height_range):
+    (height_from, height_to) = height_range
+    return ("" if height_from == -math.inf else str(height_from)) + ccql_data.SOURCE_RANGE + ("" if height_to == math.inf else str(height_to))
+
+
+def format_join_side(join_side):
+    (source_id, join_class, join_attr) = join_side
+    return str(source_id) + ":" + join_class + "." + join_attr
+
+
+def output_query_plan(query_plan, result_writer):
+    result_writer.open(["QUERY PLAN"], [str])
+    for line in query_plan:
+        result_writer.write_row([line])
+    result_writer.close()
+
+
+async def process_query_sources(source_clause, query_classes, limit_clause, filter_plan, result_map):
+
+    # all sources are processed concurrently, each with its own result map
+    import asyncio
+    loop = asyncio.get_running_loop()
+    source_futures = []
+    source_result_maps = []
+
+    i = 0
+    for source_spec in source_clause:
+        i += 1
+        source_result_maps.append({})
+        source_futures.append(run_in_thread(loop, process_query_for_source, source_spec, i, query_classes, limit_clause, filter_plan, source_result_maps[-1]))
+
+    (done, pending) = await asyncio.wait(source_futures, timeout=SOURCE_TIMEOUT)
+
+    for (source_spec, source_future) in zip(source_clause, source_futures):
+        if source_future in pending:
+            print("Error: no result from source", ":".join(source_spec[0:3]), "within", SOURCE_TIMEOUT, "seconds")
+            sys.exit()
+
+    for (source_future, source_result_map) in zip(source_futures, source_result_maps):
+        source_future.result()
+        result_map.update(source_result_map)
+
+
+def plan_query_classes(query_attribute_clause, filter_clause, join_clause=[]):
+
+    # classes referenced by the query, filter and join clauses, only these are built and mapped for each source
+    query_classes = set()
+    for (query_class, query_attr) in query_attribute_clause:
+        add_query_class(query_classes, query_class, query_attr)
+    for filter_group in filter_clause:
+        for filter_spec in filter_group:
+            add_query_class(query_classes, filter_spec[0], filter_spec[1])
+    for join_spec in join_clause:
+        for (source_id, join_class, join_attr) in join_spec:
+            add_query_class(query_classes, join_class, join_attr)
+
+    return query_classes
+
+
+def add_query_class(query_classes, query_class, query_attr):
+
+    # block attributes built from the transactions of a block require full transactions, see plan_transaction_fetch
+    query_classes.add(query_class)
+    if query_class == ccql_data.BLOCK and query_attr in ccql_data.BLOCK_TRANSACTION_ATTRIBUTES:
+        query_classes.add(ccql_data.TRANSACTION)
+
+
+def plan_block_heights(filter_clause):
+
+    # ranges of BlockDesc.height per conjunction, None if a conjunction does not restrict the height
+    if len(filter_clause) == 0:
+        return None
+
+    height_ranges = []
+    for filter_group in filter_clause:
+        (height_from, height_to) = (-math.inf, math.inf)
+        for filter_spec in filter_group:
+            (filter_class, filter_attr, filter_operator, filter_value) = filter_spec
+            if filter_class != ccql_data.BLOCK_DESC or filter_attr != "height":
+                continue
+            height = coerce_filter_value(filter_spec, 0)
+            if filter_operator in ("==", ">="):
+                height_from = max(height_from, height)
+            if filter_operator in ("==", "<="):
+                height_to = min(height_to, height)
+            if filter_operator == ">":
+                height_from = max(height_from, height+1)
+            if filter_operator == "<":
+                height_to = min(height_to, height-1)
+        if height_from == -math.inf and height_to == math.inf:
+            return None
+        height_ranges.append((height_from, height_to))
+
+    return height_ranges
+
+
+def plan_transaction_ids(filter_clause):
+
+    # ids of Transaction.id equality predicates, None if a conjunction does not restrict the id
+    if len(filter_clause) == 0:
+        return None
+
+    transaction_ids = set()
+    for filter_group in filter_clause:
+        group_ids = None
+        for (filter_class, filter_attr, filter_operator, filter_value) in filter_group:
+            if filter_class == ccql_data.TRANSACTION and filter_attr == ccql_data.ID and filter_operator == "==":
+                if group_ids is None:
+                    group_ids = { filter_value.lower() }
+                else:
+                    group_ids &= { filter_value.lower() }
+        if group_ids is None:
+            return None
+        transaction_ids |= group_ids
+
+    return transaction_ids
+
+
+def run_in_thread(loop, function, *args):
+
+    # node connections are synchronous, daemon threads do not delay the exit after a timeout
+    future = loop.create_future()
+
+    def set_result(result):
+        if not future.done():
+            future.set_result(result)
+
+    def set_exception(exception):
+        if not future.done():
+            future.set_exception(exception)
+
+    def run():
+        try:
+            result = function(*args)
+            callback = (set_result, result)
+        except BaseException as e:
+            callback = (set_exception, e)
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(*callback)
+
+    # the thread runs in the context of the query, e.g. for the messages of the query server
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+    return future
+
+
+def parse_query_clause(input):
+
+    statement = input.strip().rstrip(',').strip()
+    query_attr_spec = statement.split('.')
+    
+    if len(query_attr_spec) != 2:
+        print("Error: format error in query clause, not using syntax <class>.<attribute>")
+        sys.exit()
+    elif not query_attr_spec[0] in ccql_data.CCQL_CLASSES:
+        print("Error: format error in query clause, <class> not in", ccql_data.CCQL_CLASSES)
+        sys.exit()
+
+    if not isinstance(statement, str):
+        print("Error: non-string value in query clause")
+        sys.exit()
+
+    query_attr_spec[0] = ccql_data.CCQL_CLASSES_S.get(query_attr_spec[0], query_attr_spec[0])
+
+    return query_attr_spec
+
+
+def parse_source_clause(input):
+
+    statement = input.strip().rstrip(',').strip()
+    source_attr_spec = statement.split(':')
+
+    if len(source_attr_spec) < 3 or len(source_attr_spec) > 4:
+        print("Error: format error in source clause, not using syntax <blockchain_instance>:<network_instance>:<chain_descriptor_instance>", "\n")
+        print("Data model <blockchain_instance>:<network_instance>:<chain_descriptor_instance> =", ccql_data.get_chain_instance_list())
+        sys.exit()
+    elif len(source_attr_spec) == 4:
+        optional_source_spec = source_attr_spec[3].split(".", 1)
+        if len(optional_source_spec) != 2 or not optional_source_spec[0] in ccql_data.SOURCE_SPEC_OPTIONAL:
+            print("Error: format error in source clause, not using syntax <blockchain_instance>:<network_instance>:<chain_descriptor_instance>:[<source>.<block_instance>|<source>.<transaction_instance>|<source>.<account_instance>] with <source> not in", ccql_data.SOURCE_SPEC_OPTIONAL, "\n")
+            print("Data model <blockchain_instance>:<network_instance>:<chain_descriptor_instance> =", ccql_data.get_chain_instance_list())
+            sys.exit()
+        
+    if not isinstance(statement, str):
+        print("Error: non-string value in source clause")
+        sys.exit()
+
+    blockchain_inst = parse_attribute(source_attr_spec[0])
+    network_inst = parse_attribute(source_attr_spec[1])
+    chain_desc_inst = parse_attribute(source_attr_spec[2])
+    optional_source_class = ""
+    optional_source_inst = []
+
+    if len(source_attr_spec) == 4:
+        optional_source_class = parse_class(source_attr_spec[3])
+        optional_source_inst = parse_source_instances(optional_source_class, source_attr_spec[3])
+    
+    return (blockchain_inst, network_inst, chain_desc_inst, optional_source_class, optional_source_inst)
+
+
+def parse_source_instances(source_class, statement):
+
+    # instance <id>, instance list <id>,<id>,... or block range <from>..<to>
+    instances = statement.split('.', 1)[-1]
+
+    if ccql_data.SOURCE_RANGE in instances:
+
+        if not source_class in (ccql_data.BLOCK, ccql_data.BLOCK_S):
+            print("Error: format error in source clause, instance ranges <from>..<to> are only supported for", ccql_data.BLOCK, "instances")
+            sys.exit()
+
+        bounds = instances.split(ccql_data.SOURCE_RANGE)
+        if len(bounds) != 2 or not all(b.lstrip('-').isnumeric() for b in bounds):
+            print("Error: format error in source clause, not using syntax <source>.<from>..<to> with numeric <from> and <to>")
+            sys.exit()
+
+        number_from = int(bounds[0])
+        number_to = int(bounds[1])
+        if number_from > number_to or (number_from < 0) != (number_to < 0):
+            print("Error: format error in source clause, block range", instances, "is empty or mixes block heights and block depths")
+            sys.exit()
+
+        return range(number_from, number_to+1)
+
+    return [ inst for inst in instances.split(ccql_data.SOURCE_LIST) if len(inst) > 0 ]
+
+
+def parse_filter_clause(input):
+
+    statement = input.strip().rstrip(',').strip()
+    statement = re.sub('(\w)=(\w)', r'\1==\2', statement)
+
+    filter_syntax = '(\S+)\.(\w+)(==|!=|<>|<=|>=|<|>)(\S+)'
+    filter_spec = re.findall(filter_syntax, statement)
+
+    if len(filter_spec) != 1 or len(filter_spec[0]) != 4:
+        print("Filter specification:", filter_spec)
+        print("Error: format error in filter clause, not syntax <class>.<attribute> <operator> <value> with <operator> not in (=|<>|!=|<|>|<=|>=)")
+        sys.exit()
+
+    if not isinstance(statement, str):
+        print("Error: non-string value in filter clause")
+        sys.exit()
+    
+    filter_class = ccql_data.CCQL_CLASSES_S.get(filter_spec[0][0], filter_spec[0][0])
+    filter_attr = filter_spec[0][1]
+    filter_operator = filter_spec[0][2]
+    filter_value = filter_spec[0][3]
+    
+    if not filter_spec[0][0] in ccql_data.CCQL_CLASSES:
+        print("Error: format error in filter clause, not starting with syntax <class>.<attribute> or <class> not in", ccql_data.CCQL_CLASSES)
+        sys.exit()
+
+    return (filter_class, filter_attr, filter_operator, filter_value)
+
+
+def join_operator_tokens(query_statement):
+
+    # filter specifications given with spaces around the operator, e.g. 1:Account.id = 2:Account.id
+    tokens = []
+    attach = False
+    for token in query_statement:
+        if len(tokens) > 0 and (attach or token in FILTER_OPERATORS or token == "="):
+            tokens[-1] += token
+            attach = token in FILTER_OPERATORS or token == "="
+        else:
+            tokens.append(token)
+            attach = False
+    return tokens
+
+
+def is_join_spec(input):
+    statement = input.strip().rstrip(',').strip()
+    return not re.fullmatch(JOIN_SYNTAX, re.sub('(\w)=(\w)', r'\1==\2', statement)) is None
+
+
+def parse_join_clause(input, n_sources):
+
+    statement = input.strip().rstrip(',').strip()
+    statement = re.sub('(\w)=(\w)', r'\1==\2', statement)
+    join_spec = re.fullmatch(JOIN_SYNTAX, statement).groups()
+
+    if join_spec[3] != "==":
+        print("Error: format error in filter clause, join predicates <source>:<class>.<attribute>=<source>:<class>.<attribute> only support =")
+        sys.exit()
+
+    join_sides = []
+    for (source_id, join_class, join_attr) in (join_spec[0:3], join_spec[4:7]):
+        if not join_class in ccql_data.CCQL_CLASSES:
+            print("Error: format error in filter clause, <class> of join predicate", statement, "not in", ccql_data.CCQL_CLASSES)
+            sys.exit()
+        if int(source_id) < 1 or int(source_id) > n_sources:
+            print("Error: format error in filter clause, <source>", source_id, "of join predicate", statement, "not in 1 ..", n_sources, "of the source clause")
+            sys.exit()
+        join_sides.append((int(source_id), ccql_data.CCQL_CLASSES_S.get(join_class, join_class), join_attr))
+
+    if join_sides[0][0:2] == join_sides[1][0:2]:
+        print("Error: format error in filter clause, join predicate", statement, "compares a class of a source with itself")
+        sys.exit()
+
+    return tuple(join_sides)
+
+
+def compile_filter_clause(filter_clause):
+
+    # each filter specification is compiled once into a predicate on attribute values
+    return [ [ compile_filter_spec(filter_spec) for filter_spec in filter_group ] for filter_group in filter_clause ]
+
+
+def compile_filter_spec(filter_spec):
+
+    (filter_class, filter_attr, filter_operator, filter_value) = filter_spec
+    compare = FILTER_OPERATORS[filter_operator]
+
+    # the filter value converted to the type of the attribute, by attribute value type
+    filter_values = {}
+
+    def predicate(value):
+        if isinstance(value, LIST_TYPES):
+            return any(predicate(val) for val in value)
+        if hasattr(value, "id"):
+            value = value.id
+        if isinstance(value, str):
+            value = value.lower()
+        value_type = type(value)
+        if not value_type in filter_values:
+            filter_values[value_type] = coerce_filter_value(filter_spec, value)
+        try:
+            return compare(value, filter_values[value_type])
+        except TypeError:
+            # e.g. unset attributes
+            return False
+
+    return (filter_class, filter_attr, predicate)
+
+
+def coerce_filter_value(filter_spec, value):
+
+    # integers and floats are given as decimal or hex values, strings such as hex ids are compared case-insensitively
+    filter_value = filter_spec[3]
+    try:
+        if isinstance(value, bool):
+            return filter_value.lower() in ("true", "1")
+        if isinstance(value, int):
+            if filter_value.lower().startswith("0x"):
+                return int(filter_value, 16)
+            return int(filter_value)
+        if isinstance(value, float):
+            if filter_value.lower().startswith("0x"):
+                return float(int(filter_value, 16))
+            return float(filter_value)
+    except ValueError:
+        print("Error: format error in filter clause, value", filter_value, "of", filter_spec[0] + "." + filter_spec[1], "is not of type", type(value).__name__)
+        sys.exit()
+    return filter_value.lower()
+
+
+def parse_limit_clause(input, clause):
+
+    statement = input.strip().rstrip(';').strip()
+
+    if not statement.isnumeric():
+        print("Error: format error in", clause, "clause, not using syntax", clause, "<n> with non-negative integer <n>")
+        sys.exit()
+
+    return int(statement)
+
+
+def process_query_for_source(source_spec, i, query_classes, limit_clause, filter_plan, result_map):
+
+    # source specification
+    blockchain_inst = source_spec[0]
+    network_inst = source_spec[1]
+    chain_desc_inst = source_spec[2]
+    optional_source_class = source_spec[3]
+    optional_source_inst = source_spec[4]
+
+    # transactions selected per block or of a transaction list
+    (tx_limit, tx_offset) = limit_clause
+    (filter_groups, height_ranges, transaction_ids) = filter_plan
+
+    (full_transactions, columnar_transactions) = plan_transaction_fetch(query_classes)
+
+    # web3 and the node modules are only loaded for sources, not for parsing the query
+    with query_profile.measure(query_profile.STAGE_CONNECT):
+        import ccql_node_connector
+        node_connector = ccql_node_connector.CCQL_Node_Connector(blockchain_inst, network_inst, chain_desc_inst)
+    
+    # optional source specifications: blocks, transactions, accounts, assets, tokens, data
+    if len(optional_source_class) > 0:
+        if optional_source_class == ccql_data.BLOCK or optional_source_class == ccql_data.BLOCK_S:
+            # blocks are streamed in height order while further blocks are fetched, blocks outside of the filtered heights are not requested
+            block_ids = node_connector.select_block_ids(optional_source_inst, height_ranges)
+            map_source_results(query_classes, i, ccql_data.BLOCK_SOURCE_CLASSES, node_connector.scan_blocks(block_ids, tx_limit, tx_offset, full_transactions, columnar_transactions), filter_groups, result_map)
+        elif optional_source_class == ccql_data.ACCOUNT or optional_source_class == ccql_data.ACCOUNT_S:
+            map_source_results(query_classes, i, ccql_data.ACCOUNT_SOURCE_CLASSES, node_connector.scan_accounts(optional_source_inst), filter_groups, result_map)
+        elif optional_source_class == ccql_data.TRANSACTION or optional_source_class == ccql_data.TRANSACTION_S:
+            # transactions not matching an id of the filter clause are not requested
+            tx_ids = node_connector.select_transaction_ids(optional_source_inst, transaction_ids)
+            map_source_results(query_classes, i, ccql_data.TRANSACTION_SOURCE_CLASSES, node_connector.scan_transactions(tx_ids, tx_limit, tx_offset), filter_groups, result_map)
+        else:
+            print("Unknown optional source class:", optional_source_class)
+            sys.exit()
+    
+
+def parse_class_attribute(statement):
+    class_attr = statement.split('.')
+    return (class_attr[0], class_attr[-1])
+    
+def parse_class(statement):
+    class_attr = statement.split('.')
+    return class_attr[0]
+    
+def parse_attribute(statement):
+    class_attr = statement.split('.')
+    return class_attr[-1]
+    
+
+def filter_source_objects(filter_groups, source_objects):
+
+    # objects of one block, transaction or account by class, objects selected by any conjunction of the filter clause are kept
+    if len(filter_groups) == 0:
+        return source_objects
+
+    selected_objects = { source_type: set() for source_type in source_objects }
+    selected_all = set()
+    for filter_group in filter_groups:
+        group_objects = dict(source_objects)
+        for (filter_class, filter_attr, predicate) in filter_group:
+            # classes not built for the source do not satisfy a predicate
+            group_objects[filter_class] = [ obj for obj in group_objects.get(filter_class, []) if predicate(getattr(obj, filter_attr, None)) ]
+            if len(group_objects[filter_class]) == 0:
+                break
+        else:
+            for source_type in source_objects:
+                # all objects of classes without a predicate in the conjunction are selected, e.g. transaction columns
+                if group_objects[source_type] is source_objects[source_type]:
+                    selected_all.add(source_type)
+                else:
+                    selected_objects[source_type].update(id(obj) for obj in group_objects[source_type])
+
+    return { source_type: result if source_type in selected_all else [ obj for obj in result if id(obj) in selected_objects[source_type] ] for (source_type, result) in source_objects.items() }
+
+
+def map_source_results(query_classes, i, source_classes, source_results, filter_groups, result_map):
+
+    # all classes of the source are mapped, also if the filter clause skips all objects
+    map_query_results(query_classes, i, { source_type: [] for source_type in source_classes }, result_map)
+
+    for source_result in source_results:
+        source_objects = dict(zip(source_classes, source_result))
+        with query_profile.measure(query_profile.STAGE_FILTER):
+            selected_objects = filter_source_objects(filter_groups, source_objects)
+        with query_profile.measure(query_profile.STAGE_MAP):
+            map_query_results(query_classes, i, selected_objects, result_map)
+
+        # objects passed to the filter, objects selected, and objects mapped for the query classes
+        if not query_profile.get_profile() is None:
+            n_selected = sum(len(result) for result in selected_objects.values())
+            query_profile.add(query_profile.STAGE_FILTER, objects=sum(len(result) for result in source_objects.values()), rows=n_selected)
+            query_profile.add(query_profile.STAGE_MAP, objects=n_selected, rows=sum(len(result) for (source_type, result) in selected_objects.items() if source_type in query_classes))
+
+
+def map_query_results(query_classes, i, source_objects, result_map):
+    for (source_type, result) in source_objects.items():
+        map_query_result(query_classes, i, source_type, result, result_map)
+
+
+def map_query_result(query_classes, i, source_type, result, result_map):
+
+    # only classes referenced by the query are mapped, see plan_query_classes
+    if not source_type in query_classes:
+        return
+
+    result_map_key = str(i) + ":" + str(source_type)
+
+    if not result_map_key in result_map.keys():
+        result_map[result_map_key] = {}
+
+    # objects without id and transaction columns are keyed by the number of results mapped before,
+    # keys are reproducible across runs of a query and never collide as the number only grows
+    source_results = result_map[result_map_key]
+
+    # transaction columns are mapped as one result, see get_query_result_columns
+    if isinstance(result, ccql_data.TransactionColumns):
+        source_results[len(source_results)] = result
+        return
+
+    for r in result:
+        if hasattr(r, "id"):
+            source_results[r.id] = r
+        else:
+            source_results[len(source_results)] = r
+
+
+def output_query_result(query_attribute_clause, i, result_map, result_writer, relations=None):
+
+    if relations is None:
+        rows = get_query_result_rows(get_query_result_columns(i, result_map, query_attribute_clause))
+    else:
+        rows = get_joined_query_result_rows(i, result_map, query_attribute_clause, relations)
+
+    # rows are written while they are generated
+    result_writer.open(get_query_result_types(i, query_attribute_clause), get_query_result_value_types(i, query_attribute_clause))
+    for row in rows:
+        result_writer.write_row(row)
+    result_writer.close()
+
+
+def get_query_result_types(i, query_attribute_clause):
+
+    types = []
+    for source_id in range(1, i+1):
+        for qa in query_attribute_clause:
+            qa_class = qa[0]
+            qa_attr = qa[-1]
+            types.append(str(source_id) + ":" + qa_class + "." + qa_attr)
+
+    return types
+
+
+def get_query_result_value_types(i, query_attribute_clause):
+
+    # types of the values of each column, see ccql_data.ATTRIBUTE_TYPES
+    return [ ccql_data.ATTRIBUTE_TYPES.get(qa[0], {}).get(qa[-1]) for source_id in range(1, i+1) for qa in query_attribute_clause ]
+
+
+def get_query_result_value(value):
+
+    # ID if exists, value otherwise
+    if hasattr(value, "id"):
+        return value.id
+    if hasattr(value, "key"):
+        # objects without id are keyed in the order they are written, reproducible across runs
+        if value.key is None:
+            value.key = next(result_keys.get())
+        return value.key
+    if isinstance(value, (list, dict, set)):
+        return str(value)
+    return value
+
+
+def get_query_result_attribute_values(r, attr):
+
+    # transaction columns are read directly, Transaction objects are only built for other attributes
+    if isinstance(r, ccql_data.TransactionColumns):
+        values = r.get_column(attr)
+        if values is None:
+            values = [ getattr(tx, attr) for tx in r ]
+        return values
+    return [ getattr(r, attr) ]
+
+
+def get_query_result_objects(result_map, source_key):
+
+    if not source_key in result_map.keys():
+        print("\nAbort:", source_key, "could not be constructed from the given source clause\n")
+        sys.exit()
+
+    return result_map[source_key].values()
+
+
+def get_query_result_column(results, attr):
+
+    # list attributes contribute one value per element
+    column = []
+    for r in results:
+        for val in get_query_result_attribute_values(r, attr):
+            if isinstance(val, LIST_TYPES):
+                column.extend(get_query_result_value(v) for v in val)
+            else:
+                column.append(get_query_result_value(val))
+    return column
+
+
+def get_query_result_columns(i, result_map, query_attribute_clause):
+
+    # values of each query attribute for each source, objects are filtered per source, see filter_source_objects
+    columns = []
+
+    for source_id in range(1, i+1):
+        for q in query_attribute_clause:
+            query_attr_spec = get_query_attributes(q)
+            source_key = str(source_id) + ":" + query_attr_spec[0]
+            columns.append(get_query_result_column(get_query_result_objects(result_map, source_key), query_attr_spec[-1]))
+
+    return columns
+
+
+def get_query_result_rows(columns):
+
+    # cartesian product of the columns as a set, rows are generated one at a time
+    rows = set()
+    for row in itertools.product(*columns):
+        if not row in rows:
+            rows.add(row)
+            yield row
+
+
+def get_join_objects(result_map, join_node):
+
+    # transaction columns are joined per transaction
+    objects = []
+    for r in get_query_result_objects(result_map, str(join_node[0]) + ":" + join_node[1]):
+        if isinstance(r, ccql_data.TransactionColumns):
+            objects.extend(r)
+        else:
+            objects.append(r)
+    return objects
+
+
+def get_join_keys(obj, attr):
+
+    # ids of referenced objects and strings such as addresses are compared case-insensitively,
+    # list attributes match by any element
+    value = getattr(obj, attr, None)
+    keys = set()
+    for val in (value if isinstance(value, LIST_TYPES) else [value]):
+        val = get_query_result_value(val)
+        if isinstance(val, str):
+            val = val.lower()
+        if not val is None:
+            keys.add(val)
+    return keys
+
+
+def get_join_relation(relations, result_map, join_node):
+
+    # relation of the joined classes containing the class of a source, one object per class in each row
+    for relation in relations:
+        if join_node in relation[0]:
+            return relation
+    relation = ([join_node], [ (obj,) for obj in get_join_objects(result_map, join_node) ])
+    relations.append(relation)
+    return relation
+
+
+def join_query_results(result_map, join_clause):
+
+    # join predicates in the order of the filter clause, relations are joined by a hash table on the
+    # smaller relation probed by the other, predicates within one relation select its rows
+    relations = []
+    for (left, right) in join_clause:
+        left_relation = get_join_relation(relations, result_map, left[0:2])
+        right_relation = get_join_relation(relations, result_map, right[0:2])
+        left_index = left_relation[0].index(left[0:2])
+        right_index = right_relation[0].index(right[0:2])
+
+        if left_relation is right_relation:
+            rows = [ row for row in left_relation[1] if not get_join_keys(row[left_index], left[2]).isdisjoint(get_join_keys(row[right_index], right[2])) ]
+            relations[relations.index(left_relation)] = (left_relation[0], rows)
+            continue
+
+        is_left_build = len(left_relation[1]) <= len(right_relation[1])
+        if is_left_build:
+            (build, build_index, build_attr, probe, probe_index, probe_attr) = (left_relation, left_index, left[2], right_relation, right_index, right[2])
+        else:
+            (build, build_index, build_attr, probe, probe_index, probe_attr) = (right_relation, right_index, right[2], left_relation, left_index, left[2])
+
+        hash_table = {}
+        for row in build[1]:
+            for key in get_join_keys(row[build_index], build_attr):
+                hash_table.setdefault(key, []).append(row)
+
+        rows = []
+        for probe_row in probe[1]:
+            # rows of the build side matching several keys of a list attribute are joined once
+            matches = {}
+            for key in get_join_keys(probe_row[probe_index], probe_attr):
+                for build_row in hash_table.get(key, []):
+                    matches[id(build_row)] = build_row
+            for build_row in matches.values():
+                rows.append(build_row + probe_row if is_left_build else probe_row + build_row)
+
+        query_profile.add(query_profile.STAGE_JOIN, objects=len(build[1]) + len(probe[1]), rows=len(rows))
+
+        relations.remove(left_relation)
+        relations.remove(right_relation)
+        relations.append((left_relation[0] + right_relation[0], rows))
+
+    return relations
+
+
+def get_joined_query_result_rows(i, result_map, query_attribute_clause, relations):
+
+    # values of joined classes are combined per row of a relation, other columns and relations
+    # as cartesian product, columns are numbered per source and query attribute
+    factors = []
+    joined_columns = set()
+
+    for (join_nodes, object_rows) in relations:
+        column_attributes = []
+        for (n, (source_id, join_class)) in enumerate(join_nodes):
+            for (k, q) in enumerate(query_attribute_clause):
+                query_attr_spec = get_query_attributes(q)
+                if query_attr_spec[0] == join_class:
+                    column_attributes.append(((source_id-1) * len(query_attribute_clause) + k, n, query_attr_spec[-1]))
+        values = {}
+        for object_row in object_rows:
+            values.update(dict.fromkeys(itertools.product(*[ get_query_result_column([object_row[n]], attr) for (column, n, attr) in column_attributes ])))
+        factors.append(([ column for (column, n, attr) in column_attributes ], list(values)))
+        joined_columns.update(column for (column, n, attr) in column_attributes)
+
+    for source_id in range(1, i+1):
+        for (k, q) in enumerate(query_attribute_clause):
+            column = (source_id-1) * len(query_attribute_clause) + k
+            if column in joined_columns:
+                continue
+            query_attr_spec = get_query_attributes(q)
+            source_key = str(source_id) + ":" + query_attr_spec[0]
+            factors.append(([column], [ (value,) for value in get_query_result_column(get_query_result_objects(result_map, source_key), query_attr_spec[-1]) ]))
+
+    # rows as a set, as for the cartesian product of the columns
+    rows = set()
+    for combination in itertools.product(*[ values for (columns, values) in factors ]):
+        row = [None] * (i * len(query_attribute_clause))
+        for ((columns, values), value) in zip(factors, combination):
+            for (column, val) in zip(columns, value):
+                row[column] = val
+        row = tuple(row)
+        if not row in rows:
+            rows.add(row)
+            yield row
+
+
+def get_query_attributes(query_specification):
+
+    if type(query_specification) is tuple or type(query_specification) is list:
+        return query_specification
+
+    query_attr_spec = query_specification.split(".")
+
+    if not len(query_attr_spec) == 2:
+        print("Error: format error in query clause")
+        sys.exit(1)
+
+    return query_attr_spec
+
+
+def get_query_args(args):
+    if len(args) == 1:
+        # query statement is in one argument, possibly given in quotes
+        quoted_args = args[0].split(" ")
+        return quoted_args
+    return args
+
+
+def parse_cli():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "qhf:o:r:p:l:m:",
+            ["query", "help", "format=", "output=", "record=", "replay=", "latency=", "metrics="])
+
+    except getopt.GetoptError as err:
+        print(err)
+        print_usage()
+
+    result_format = ccql_result_writer.FORMAT_TEXT
+    output = None
+    record_dir = None
+    replay_dir = None
+    replay_latency = 0
+
+    for opt, arg in opts:
+        if opt in ("-q", "--query"):
+            # query statement follows the options
+            pass
+        elif opt in ("-h", "--help"):
+            print_usage()
+        elif opt in ("-f", "--format"):
+            result_format = arg
+        elif opt in ("-o", "--output"):
+            output = arg
+        elif opt in ("-r", "--record"):
+            record_dir = arg
+        elif opt in ("-p", "--replay"):
+            replay_dir = arg
+        elif opt in ("-l", "--latency"):
+            try:
+                replay_latency = float(arg) / 1000
+            except ValueError:
+                print("Error: latency is not numeric")
+                sys.exit()
+        elif opt in ("-m", "--metrics"):
+            metrics.add_exporter(metrics.get_exporter(arg))
+        else:
+            print(CCQL_VERSION)
+
+    if not record_dir is None or not replay_dir is None:
+        # fixture files of JSON-RPC calls per chain, see ccql_node/rpc_replay.py
+        import ccql_node_connector
+        ccql_node_connector.CCQL_Node_Connector.rpc_record_dir = record_dir
+        ccql_node_connector.CCQL_Node_Connector.rpc_replay_dir = replay_dir
+        ccql_node_connector.CCQL_Node_Connector.replay_latency = replay_latency
+
+    if len(args) < 1:
+        print_usage()
+    else:
+        query_args = get_query_args(args)
+        try:
+            process_query(query_args, result_format, output)
+        except ConnectionError as e:
+            print("Error:", e)
+            sys.exit()
+
+if __name__ == "__main__":
+    parse_cli()
@@ -0,0 +1,207 @@
+import os
+import time
+import json
+import zlib
+import sqlite3
+import threading
+
+from . import metrics
+
+CACHE_DIR = "ccql-cache"
+CACHE_FILE = "cache.db"
+CACHE_VERSION = 3
+
+# total size of cached payloads in bytes, least recently used entries are evicted beyond
+CACHE_MAX_SIZE = 512 * 1024**2
+CACHE_EVICT_RATIO = 0.9
+
+# sqlite limits the number of variables per statement
+QUERY_CHUNK_SIZE = 500
+
+KIND_BLOCK = "block"
+KIND_TRANSACTION = "tx"
+
+
+class Block_Cache:
+
+    def __init__(self, chain_key, working_dir=".", max_size=CACHE_MAX_SIZE):
+
+        # raw JSON-RPC payloads of one chain, keyed by <blockchain>:<network>:<chain_descriptor>
+        self.chain_key = chain_key
+        self.max_size = max_size
+        self.lock = threading.Lock()
+
+        cache_dir = os.path.join(working_dir, CACHE_DIR)
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.db = sqlite3.connect(os.path.join(cache_dir, CACHE_FILE), check_same_thread=False)
+        with self.lock, self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            if self.db.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+                self.db.execute("DROP TABLE IF EXISTS entries")
+                self.db.execute("DROP TABLE IF EXISTS tips")
+                self.db.execute("PRAGMA user_version = " + str(CACHE_VERSION))
+            # blocks and transactions are final or expire, see put_blocks
+            self.db.execute("CREATE TABLE IF NOT EXISTS entries (chain_key TEXT, kind TEXT, id TEXT, height INTEGER, parent TEXT, full INTEGER, final INTEGER, expires REAL, payload BLOB, size INTEGER, accessed REAL, PRIMARY KEY (chain_key, kind, id))")
+            self.db.execute("CREATE TABLE IF NOT EXISTS tips (chain_key TEXT PRIMARY KEY, tip INTEGER, final_height INTEGER, updated REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS entries_height ON entries (chain_key, kind, height)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            self.size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def encode_payload(self, payload):
+        return zlib.compress(json.dumps(payload).encode("utf-8"))
+
+    def decode_payload(self, data):
+        return json.loads(zlib.decompress(data).decode("utf-8"))
+
+    def get_blocks(self, heights, full):
+
+        # cached blocks by height with their finality, a block with full transactions also serves requests without
+        blocks = {}
+        heights = list(dict.fromkeys(heights))
+        now = time.time()
+
+        with metrics.span("ccql_cache", chain=self.chain_key, operation="get_blocks"), self.lock, self.db:
+            for i in range(0, len(heights), QUERY_CHUNK_SIZE):
+                chunk = heights[i:i+QUERY_CHUNK_SIZE]
+                rows = self.db.execute("SELECT id, height, final, payload FROM entries WHERE chain_key = ? AND kind = ? AND full >= ? AND (final = 1 OR expires > ?) AND height IN (" + ",".join("?" * len(chunk)) + ")",
+                    [self.chain_key, KIND_BLOCK, int(full), now] + chunk).fetchall()
+                for (id, height, final, payload) in rows:
+                    blocks[height] = (self.decode_payload(payload), final == 1)
+                self.touch([ row[0] for row in rows ], KIND_BLOCK)
+
+        if not full:
+            for (block, final) in blocks.values():
+                block["transactions"] = [ tx["hash"] if isinstance(tx, dict) else tx for tx in block["transactions"] ]
+
+        self.add_lookups(KIND_BLOCK, len(blocks), len(heights) - len(blocks))
+        return blocks
+
+    def get_transactions(self, hashes):
+
+        # cached transactions of final blocks or of blocks near the tip that are not expired
+        transactions = {}
+        hashes = list(dict.fromkeys(hashes))
+        now = time.time()
+
+        with metrics.span("ccql_cache", chain=self.chain_key, operation="get_transactions"), self.lock, self.db:
+            for i in range(0, len(hashes), QUERY_CHUNK_SIZE):
+                chunk = hashes[i:i+QUERY_CHUNK_SIZE]
+                rows = self.db.execute("SELECT id, payload FROM entries WHERE chain_key = ? AND kind = ? AND (final = 1 OR expires > ?) AND id IN (" + ",".join("?" * len(chunk)) + ")",
+                    [self.chain_key, KIND_TRANSACTION, now] + chunk).fetchall()
+                for (id, payload) in rows:
+                    transactions[id] = self.decode_payload(payload)
+                self.touch([ row[0] for row in rows ], KIND_TRANSACTION)
+
+        self.add_lookups(KIND_TRANSACTION, len(transactions), len(hashes) - len(transactions))
+        return transactions
+
+    def add_lookups(self, kind, hits, misses):
+        # hits and misses per kind of entry, see module metrics
+        metrics.add("ccql_cache_lookups_total", hits, chain=self.chain_key, kind=kind, result="hit")
+        metrics.add("ccql_cache_lookups_total", misses, chain=self.chain_key, kind=kind, result="miss")
+
+    def touch(self, ids, kind):
+        accessed = time.time()
+        self.db.executemany("UPDATE entries SET accessed = ? WHERE chain_key = ? AND kind = ? AND id = ?",
+            [ (accessed, self.chain_key, kind, id) for id in ids ])
+
+    def put_blocks(self, blocks, full, final_height, ttl):
+
+        # blocks up to final_height are cached until evicted, blocks near the tip for ttl seconds
+        with metrics.span("ccql_cache", chain=self.chain_key, operation="put_blocks"), self.lock, self.db:
+            for block in blocks:
+                height = int(block["number"], 16)
+                is_final = height <= final_height
+                expires = None
+                if not is_final:
+                    expires = time.time() + ttl
+                self.invalidate(height, block["hash"], block["parentHash"])
+                self.put(KIND_BLOCK, block["hash"], height, full, block, block["parentHash"], is_final, expires)
+            self.evict()
+
+    def invalidate(self, height, hash, parent_hash):
+
+        # a block with a different hash at its height, a different parent below or a child
+        # referring to a different parent indicates a reorg, non-final blocks from there are removed
+        reorg_heights = []
+        for (id, h, parent) in self.db.execute("SELECT id, height, parent FROM entries WHERE chain_key = ? AND kind = ? AND height BETWEEN ? AND ?",
+                [self.chain_key, KIND_BLOCK, height-1, height+1]).fetchall():
+            if (h == height and id != hash) or (h == height-1 and id != parent_hash) or (h == height+1 and parent != hash):
+                reorg_heights.append(h)
+
+        if len(reorg_heights) > 0:
+            self.delete("height >= ? AND (final = 0 OR height = ?)", [min(reorg_heights), height], KIND_BLOCK)
+            self.delete("height >= ? AND (final = 0 OR height = ?)", [min(reorg_heights), height], KIND_TRANSACTION)
+            self.db.execute("DELETE FROM tips WHERE chain_key = ?", [self.chain_key])
+
+        # transactions refer to their block by hash in the parent column
+        self.delete("height = ? AND parent != ?", [height, hash], KIND_TRANSACTION)
+
+    def get_tip(self, ttl):
+
+        with self.lock, self.db:
+            row = self.db.execute("SELECT tip, final_height FROM tips WHERE chain_key = ? AND updated > ?", [self.chain_key, time.time() - ttl]).fetchone()
+        self.add_lookups("tip", int(not row is None), int(row is None))
+        if row is None:
+            return None
+        return (row[0], row[1])
+
+    def put_tip(self, tip, final_height):
+
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO tips VALUES (?, ?, ?, ?)", [self.chain_key, tip, final_height, time.time()])
+
+    def put_transactions(self, transactions, final_height, ttl):
+
+        # transactions are stored with the height and hash of their block and the finality rules of blocks, see put_blocks
+        with metrics.span("ccql_cache", chain=self.chain_key, operation="put_transactions"), self.lock, self.db:
+            for tx in transactions:
+                height = int(tx["blockNumber"], 16)
+                is_final = height <= final_height
+                expires = None
+                if not is_final:
+                    expires = time.time() + ttl
+                self.put(KIND_TRANSACTION, tx["hash"], height, True, tx, tx["blockHash"], is_final, expires)
+            self.evict()
+
+    def put(self, kind, id, height, full, payload, parent, final, expires):
+        row = self.db.execute("SELECT size, full FROM entries WHERE chain_key = ? AND kind = ? AND id = ?", [self.chain_key, kind, id]).fetchone()
+        if not row is None:
+            if row[1] > int(full):
+                # keep the payload with full transactions
+                return
+            self.size -= row[0]
+        data = self.encode_payload(payload)
+        self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [self.chain_key, kind, id, height, parent, int(full), int(final), expires, data, len(data), time.time()])
+        self.size += len(data)
+
+    def delete(self, condition, parameters, kind):
+        condition = "chain_key = ? AND kind = ? AND " + condition
+        parameters = [self.chain_key, kind] + parameters
+        self.size -= self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries WHERE " + condition, parameters).fetchone()[0]
+        self.db.execute("DELETE FROM entries WHERE " + condition, parameters)
+
+    def evict(self):
+
+        # least recently used entries of all chains are removed until the cache is below its size limit
+        if self.size <= self.max_size:
+            return
+
+        # the cache file is shared by all chains and processes
+        self.size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if self.size <= self.max_size:
+            return
+
+        evict_size = self.size - self.max_size * CACHE_EVICT_RATIO
+        rows = self.db.execute("SELECT rowid, size FROM entries ORDER BY accessed").fetchall()
+        evict_rowids = []
+        for (rowid, size) in rows:
+            if evict_size <= 0:
+                break
+            evict_rowids.append((rowid,))
+            evict_size -= size
+            self.size -= size
+
+        self.db.executemany("DELETE FROM entries WHERE rowid = ?", evict_rowids)
@@ -1,349 +1,497 @@
-from web3.contract import Contract
-
-# ID and descriptor attributes
-ID = 'id'
-DESC = 'desc'
-
-# chain package classes
-BLOCKCHAIN = 'Chain'
-BLOCKCHAIN_S = 'C'
-NETWORK = 'Network'
-NETWORK_S = 'N'
-CHAIN_DESC = 'ChainDesc'
-CHAIN_DESC_S = 'D'
-CHAIN_TYPE = 'ChainType'
-CONSENSUS_TYPE = 'ConsensusType'
-EXECUTION_TYPE = 'ExecutionType'
-
-# block package classes
-BLOCK = 'Block'
-BLOCK_S = 'B'
-BLOCK_DESC = 'BlockDesc'
-BLOCK_DESC_LINKED = 'BlockDescLinked'
-BLOCK_STATUS = 'Status'
-BLOCK_VALIDATION_DESC = 'ValidationDesc'
-BLOCK_VALIDATOR_DESC = 'ValidatorDesc'
-BLOCK_VALIDATOR_PROPOSER = 'ValidatorDescPr'
-BLOCK_VALIDATOR_CREATOR = 'ValidatorDescCr'
-BLOCK_VALIDATOR_ATTESTER = 'ValidatorDescAtt'
-
-# transaction package classes
-TRANSACTION = 'Transaction'
-TRANSACTION_S = 'T'
-TRANSACTION_DESC = 'TDesc'
-TRANSACTION_UTXO = 'UTXO'
-TRANSACTION_ADDRESS = 'Address'
-
-# account package classes
-ACCOUNT = 'Account'
-ACCOUNT_S = 'A'
-ACCOUNT_DESC = 'AccountDesc'
-ACCOUNT_ASSET = 'Asset'
-ACCOUNT_ASSET_S = 'AS'
-ACCOUNT_ASSET_TYPE = 'AssetType'
-ACCOUNT_TOKEN = 'Token'
-ACCOUNT_TOKEN_S = 'TO'
-ACCOUNT_TOKEN_TYPE = 'TokenType'
-ACCOUNT_DATA = 'Data'
-ACCOUNT_DATA_S = 'DT'
-ACCOUNT_STORAGE_TYPE = 'StorageType'
-
-# classes of all packages
-CHAIN_PKG_CLASSES = [ BLOCKCHAIN, BLOCKCHAIN_S, NETWORK, NETWORK_S, CHAIN_DESC, CHAIN_DESC_S, CHAIN_TYPE, CONSENSUS_TYPE, EXECUTION_TYPE ]
-BLOCK_PKG_CLASSES = [ BLOCK, BLOCK_S, BLOCK_DESC, BLOCK_VALIDATION_DESC, BLOCK_STATUS, BLOCK_VALIDATOR_DESC ]
-TRANSACTION_PKG_CLASSES = [ TRANSACTION, TRANSACTION_S, TRANSACTION_DESC, TRANSACTION_UTXO, TRANSACTION_ADDRESS ]
-ACCOUNT_PKG_CLASSES = [ ACCOUNT, ACCOUNT_S, ACCOUNT_DESC, ACCOUNT_ASSET, ACCOUNT_ASSET_S, ACCOUNT_ASSET_TYPE, ACCOUNT_TOKEN, ACCOUNT_TOKEN_S, ACCOUNT_TOKEN_TYPE, ACCOUNT_DATA, ACCOUNT_DATA_S, ACCOUNT_STORAGE_TYPE ]
-
-# query statements
-Q = "Q"
-S = "S"
-F = "F"
-Q_CLAUSES = [ Q, S, F ]
-
-CCQL_CLASSES = CHAIN_PKG_CLASSES + BLOCK_PKG_CLASSES + TRANSACTION_PKG_CLASSES + ACCOUNT_PKG_CLASSES
-
-SOURCE_SPEC_OPTIONAL = [ BLOCK, BLOCK_S, TRANSACTION, TRANSACTION_S, ACCOUNT, ACCOUNT_S, ACCOUNT_ASSET, ACCOUNT_ASSET_S, ACCOUNT_TOKEN, ACCOUNT_TOKEN_S, ACCOUNT_DATA, ACCOUNT_DATA_S ]
-
-
-# Data Model
-
-class ChainType(object):
-    def __init__(self):
-        self.typeName = ""
-        self.isMainNet = False
-        self.isTestNet = False
-        self.isSideChain = False
-        self.chain = []
-class ExecutionType(object):
-    def __init__(self):
-        self.typeName = ""
-        self.isUtxoBased = ""
-        self.isAccountBased = ""
-        self.isEvmBased = False
-        self.chainDescriptor = []
-class Network(object):
-    def __init__(self):
-        self.id = ""
-        self.name = ""
-        self.chainDescriptors = []
-        self.nodeURI = ""
-        self.nodeCall = ""
-        self.network = []
-        self.network = None
-class Blockchain(object):
-    def __init__(self):
-        self.id = ""
-        self.name = ""
-        self.networks = []
-class ConsensusType(object):
-    def __init__(self):
-        self.typeName = ""
-        self.name = ""
-        self.implementation = ""
-        self.chain = []
-class ChainDescriptor(object):
-    def __init__(self):
-        self.id = ""
-        self.name = ""
-        self.chainType = []
-        self.consensusType = None
-        self.blocks = []
-        self.executionType = None
-        self.chain = None
-        self.block = []
-        self.executionType2 = None
-        self.consensusType = None
-        self.chainDescriptor = None
-class Transaction(object):
-    def __init__(self):
-        self.id = ""
-        self.descriptor = []
-        self.fee = 0.
-        self.feePrice = 0.
-        self.feeUnit = ""
-class UTXO(object):
-    def __init__(self):
-        self.id = 0
-        self.transaction = None
-        self.transactionDescriptor = None
-class Address(object):
-    def __init__(self):
-        self.id = 0
-        self.name = ""
-        self.validatorDescriptor = []
-        self.transactionDescriptor = []
-        self.account = None
-class TransactionDescriptor(object):
-    def __init__(self):
-        self.from_ = []
-        self.to = []
-        self.asset = None
-        self.token = None
-        self.data = None
-        self.value = 0.
-        self.script = ""
-        self.utxo = None
-        self.unit = ""
-class Data(object):
-    def __init__(self):
-        self.id = 0
-        self.storageType = None
-        self.stateId = ""
-        self.transactionDescriptor = []
-        self.storageType = None
-        self.account = None
-class Account(object):
-    def __init__(self):
-        self.id = ""
-        self.descriptor = None
-        self.assets = []
-        self.tokens = []
-        self.data = []
-        self.accountDescriptor = None
-        self.block = []
-class Asset(object):
-    def __init__(self):
-        self.id = 0
-        self.assetType = None
-        self.utxo = []
-        self.balance = 0.
-        self.assetType = None
-        self.transactionDescriptor = []
-        self.account = None
-class AssetType(object):
-    def __init__(self):
-        self.id = 0
-        self.typeName = ""
-        self.unit = ""
-        self.asset = []
-class AccountDescriptor(object):
-    def __init__(self):
-        self.isSmartContract = False
-        self.isExternallyOwned = False
-        self.addressType = ""
-        self.accountDescriptor = None
-        self.account = None
-class StorageType(object):
-    def __init__(self):
-        self.id = 0
-        self.typeName = ""
-        self.IsBlobType = False
-        self.isKeyValueType = False
-        self.data = []
-class TokenType(object):
-    def __init__(self):
-        self.id = 0
-        self.typeName = ""
-        self.standardRef = ""
-        self.unit = ""
-        self.token = []
-class Token(object):
-    def __init__(self):
-        self.id = 0
-        self.tokenType = None
-        self.balance = 0.
-        self.tokenType = None
-        self.transactionDescriptor = []
-        self.account = None
-class Status(object):
-    def __init__(self):
-        self.isFinal = False
-        self.isOrphan = False
-        self.isOmmer = False
-        self.blockDescriptor = []
-class BlockDescriptor(object):
-    def __init__(self):
-        self.height = 0
-        self.epoch = 0
-        self.slot = 0
-        self.creationData = ""
-        self.timestamp = 0
-        self.status = None
-        self.dagSupport = False
-        self.capacity = 0
-        self.status2 = None
-        self.block = None
-class ValidatorDescriptor(object):
-    def __init__(self):
-        self.validator = []
-        self.signature = []
-        self.votes = []
-        self.rewards = []
-        self.address = []
-        self.validationDescriptor = []
-class Block(object):
-    def __init__(self):
-        self.id = ""
-        self.descriptor = None
-        self.linkedBlockDescriptor = []
-        self.validationDescriptor = None
-        self.transactions = []
-        self.accounts = []
-        self.chain = None
-        self.validationDescriptor = None
-class ValidationDescriptor(object):
-    def __init__(self):
-        self.validationInput = ""
-        self.validationCondition = ""
-        self.hashValue = ""
-        self.proposer = []
-        self.creator = []
-        self.attestations = []
-        self.reward = 0.
-        self.validatorDescriptor = []
-        self.block = None
-class Query(object):
-    def __init__(self):
-        self.network = []
-        self.chain = []
-        self.block = []
-        self.account = []
-        self.transaction = []
-        self.account = []
-        self.transaction = []
-        self.block = []
-        self.chain = []
-
-
-D_MODEL = []
-
-# supported blockchains
-def init_bc(bc_id, bc_name, net_id, net_name, cd_id, cd_name):
-
-    cd = ChainDescriptor()
-    cd.id = str(cd_id)
-    cd.name = cd_name
-
-    net = Network()
-    net.id = str(net_id)
-    net.name = net_name
-    net.chainDescriptors.append(cd)
-
-    bc = Blockchain()
-    bc.id = str(bc_id)
-    bc.name = bc_name
-    bc.networks.append(net)
-
-    return bc
-
-
-def init_d_model():
-
-    btc = init_bc("btc", "Bitcoin", "main", "Bitcoin mainnet", 1, "Bitcoin chain")
-    eth = init_bc("eth", "Ethereum", "main", "Ethereum mainnet", 1, "Ethereum chain")
-    ada = init_bc("ada", "Cardano", "main", "Cardano mainnet", 1, "Cardano chain")
-    sol = init_bc("sol", "Solana", "main", "Solana mainnet", 1, "Solana chain")
-    avax_p = init_bc("avax", "Avalanche", "main", "Avalanche Primary Network", "p", "P-Chain")
-    avax_x = init_bc("avax", "Avalanche", "main", "Avalanche Primary Network", "x", "X-Chain")
-    avax_c = init_bc("avax", "Avalanche", "main", "Avalanche Primary Network", "c", "C-Chain")
-    
-    D_MODEL.extend([ btc, eth, ada, sol, avax_p, avax_x, avax_c])
-
-init_d_model()
-
-def get_bc_by_id(bc_id, net_id, cd_id):
-
-    for bc in D_MODEL:
-        if bc.id == bc_id:
-            for net in bc.networks:
-                if net.id == net_id:
-                    for cd in net.chainDescriptors:
-                        if cd.id == cd_id:
-                            return bc
-
-    return None
-
-def get_chain_instance_list():
-    instances = []
-    for bc in D_MODEL:
-        for net in bc.networks:
-            for cd in net.chainDescriptors:
-                inst = bc.id + ":" + net.id + ":" + cd.id
-                instances.append(inst)
-    return instances
-
-def print_obj(obj):
-    cl = type(obj).__name__
-    inst = ""
-    if 'id' in dir(obj):
-        inst = obj.id
-    elif 'height' in dir(obj):
-        inst = obj.name
-    else:
-        inst = obj
-    print(cl, inst)
-    for attr in dir(obj):
-        val = str(getattr(obj, attr))
-        if not attr.startswith("_"):
-            print(" -", attr, val)
-
-def print_objs(obj_list):
-    for obj in obj_list:
-        print_obj(obj)
-
-def print_obj_ids(obj_list):
-    out = ""
-    for obj in obj_list:
-        if 'id' in dir(obj):
-            out += obj.id + " "
-    print(out)
+import os
+import json
+import decimal
+
+# ID and descriptor attributes
+ID = 'id'
+DESC = 'desc'
+
+# chain package classes
+BLOCKCHAIN = 'Chain'
+BLOCKCHAIN_S = 'C'
+NETWORK = 'Network'
+NETWORK_S = 'N'
+CHAIN_DESC = 'ChainDesc'
+CHAIN_DESC_S = 'D'
+CHAIN_TYPE = 'ChainType'
+CONSENSUS_TYPE = 'ConsensusType'
+EXECUTION_TYPE = 'ExecutionType'
+
+# block package classes
+BLOCK = 'Block'
+BLOCK_S = 'B'
+BLOCK_DESC = 'BlockDesc'
+BLOCK_DESC_LINKED = 'BlockDescLinked'
+BLOCK_STATUS = 'Status'
+BLOCK_VALIDATION_DESC = 'ValidationDesc'
+BLOCK_VALIDATOR_DESC = 'ValidatorDesc'
+BLOCK_VALIDATOR_PROPOSER = 'ValidatorDescPr'
+BLOCK_VALIDATOR_CREATOR = 'ValidatorDescCr'
+BLOCK_VALIDATOR_ATTESTER = 'ValidatorDescAtt'
+
+# transaction package classes
+TRANSACTION = 'Transaction'
+TRANSACTION_S = 'T'
+TRANSACTION_DESC = 'TDesc'
+TRANSACTION_UTXO = 'UTXO'
+TRANSACTION_ADDRESS = 'Address'
+
+# account package classes
+ACCOUNT = 'Account'
+ACCOUNT_S = 'A'
+ACCOUNT_DESC = 'AccountDesc'
+ACCOUNT_ASSET = 'Asset'
+ACCOUNT_ASSET_S = 'AS'
+ACCOUNT_ASSET_TYPE = 'AssetType'
+ACCOUNT_TOKEN = 'Token'
+ACCOUNT_TOKEN_S = 'TO'
+ACCOUNT_TOKEN_TYPE = 'TokenType'
+ACCOUNT_DATA = 'Data'
+ACCOUNT_DATA_S = 'DT'
+ACCOUNT_STORAGE_TYPE = 'StorageType'
+
+# classes of all packages
+CHAIN_PKG_CLASSES = [ BLOCKCHAIN, BLOCKCHAIN_S, NETWORK, NETWORK_S, CHAIN_DESC, CHAIN_DESC_S, CHAIN_TYPE, CONSENSUS_TYPE, EXECUTION_TYPE ]
+BLOCK_PKG_CLASSES = [ BLOCK, BLOCK_S, BLOCK_DESC, BLOCK_VALIDATION_DESC, BLOCK_STATUS, BLOCK_VALIDATOR_DESC ]
+TRANSACTION_PKG_CLASSES = [ TRANSACTION, TRANSACTION_S, TRANSACTION_DESC, TRANSACTION_UTXO, TRANSACTION_ADDRESS ]
+ACCOUNT_PKG_CLASSES = [ ACCOUNT, ACCOUNT_S, ACCOUNT_DESC, ACCOUNT_ASSET, ACCOUNT_ASSET_S, ACCOUNT_ASSET_TYPE, ACCOUNT_TOKEN, ACCOUNT_TOKEN_S, ACCOUNT_TOKEN_TYPE, ACCOUNT_DATA, ACCOUNT_DATA_S, ACCOUNT_STORAGE_TYPE ]
+
+# query statements
+Q = "Q"
+S = "S"
+F = "F"
+LIMIT = "LIMIT"
+OFFSET = "OFFSET"
+Q_CLAUSES = [ Q, S, F, LIMIT, OFFSET ]
+
+# prefixes of query statements printing the query plan, with ANALYZE also the measured profile
+EXPLAIN = "EXPLAIN"
+ANALYZE = "ANALYZE"
+
+# alternatives of filter specifications in the filter clause
+OR = "OR"
+
+# source instance lists and ranges, e.g. B.1,5,9 and B.1000..2000
+SOURCE_LIST = ","
+SOURCE_RANGE = ".."
+
+CCQL_CLASSES = CHAIN_PKG_CLASSES + BLOCK_PKG_CLASSES + TRANSACTION_PKG_CLASSES + ACCOUNT_PKG_CLASSES
+
+# short class names
+CCQL_CLASSES_S = { BLOCKCHAIN_S: BLOCKCHAIN, NETWORK_S: NETWORK, CHAIN_DESC_S: CHAIN_DESC, BLOCK_S: BLOCK, TRANSACTION_S: TRANSACTION, ACCOUNT_S: ACCOUNT, ACCOUNT_ASSET_S: ACCOUNT_ASSET, ACCOUNT_TOKEN_S: ACCOUNT_TOKEN, ACCOUNT_DATA_S: ACCOUNT_DATA }
+
+# classes and block attributes built from the transactions of a block
+BLOCK_TRANSACTION_CLASSES = [ TRANSACTION, TRANSACTION_DESC, TRANSACTION_UTXO, TRANSACTION_ADDRESS, ACCOUNT ]
+BLOCK_TRANSACTION_ATTRIBUTES = [ 'transactions', 'accounts' ]
+
+# classes built from Transaction objects, transactions are kept as columns without them, see TransactionColumns
+TRANSACTION_OBJECT_CLASSES = [ TRANSACTION_DESC, TRANSACTION_UTXO, TRANSACTION_ADDRESS ]
+
+# classes built for block, account and transaction sources, in the order of the flattened results of the node connector
+BLOCK_SOURCE_CLASSES = [ BLOCK, BLOCK_DESC, BLOCK_STATUS, BLOCK_DESC_LINKED, BLOCK_VALIDATION_DESC, BLOCK_VALIDATOR_PROPOSER, BLOCK_VALIDATOR_CREATOR, BLOCK_VALIDATOR_ATTESTER, TRANSACTION, ACCOUNT ]
+ACCOUNT_SOURCE_CLASSES = [ ACCOUNT, ACCOUNT_DESC, ACCOUNT_ASSET, ACCOUNT_ASSET_TYPE, ACCOUNT_TOKEN, ACCOUNT_TOKEN_TYPE, ACCOUNT_DATA, ACCOUNT_STORAGE_TYPE ]
+TRANSACTION_SOURCE_CLASSES = [ TRANSACTION, TRANSACTION_DESC, TRANSACTION_UTXO ]
+
+SOURCE_SPEC_OPTIONAL = [ BLOCK, BLOCK_S, TRANSACTION, TRANSACTION_S, ACCOUNT, ACCOUNT_S, ACCOUNT_ASSET, ACCOUNT_ASSET_S, ACCOUNT_TOKEN, ACCOUNT_TOKEN_S, ACCOUNT_DATA, ACCOUNT_DATA_S ]
+
+
+# Data Model
+
+# objects without id are given an integer key per query when written, see ccql.get_query_result_value
+# fees and values of EVM transactions are also kept in wei as exact integers, feeWei and valueWei
+
+class ChainType(object):
+    __slots__ = ("typeName", "isMainNet", "isTestNet", "isSideChain", "chain", "key")
+    def __init__(self):
+        self.typeName = ""
+        self.isMainNet = False
+        self.isTestNet = False
+        self.isSideChain = False
+        self.chain = []
+        self.key = None
+class ExecutionType(object):
+    __slots__ = ("typeName", "isUtxoBased", "isAccountBased", "isEvmBased", "chainDescriptor", "key")
+    def __init__(self):
+        self.typeName = ""
+        self.isUtxoBased = ""
+        self.isAccountBased = ""
+        self.isEvmBased = False
+        self.chainDescriptor = []
+        self.key = None
+class Network(object):
+    __slots__ = ("id", "name", "chainDescriptors", "nodeURI", "nodeCall", "network")
+    def __init__(self):
+        self.id = ""
+        self.name = ""
+        self.chainDescriptors = []
+        self.nodeURI = ""
+        self.nodeCall = ""
+        self.network = None
+class Blockchain(object):
+    __slots__ = ("id", "name", "networks")
+    def __init__(self):
+        self.id = ""
+        self.name = ""
+        self.networks = []
+class ConsensusType(object):
+    __slots__ = ("typeName", "name", "implementation", "chain", "key")
+    def __init__(self):
+        self.typeName = ""
+        self.name = ""
+        self.implementation = ""
+        self.chain = []
+        self.key = None
+class ChainDescriptor(object):
+    __slots__ = ("id", "name", "chainType", "consensusType", "blocks", "executionType", "chain", "block", "executionType2", "chainDescriptor")
+    def __init__(self):
+        self.id = ""
+        self.name = ""
+        self.chainType = []
+        self.consensusType = None
+        self.blocks = []
+        self.executionType = None
+        self.chain = None
+        self.block = []
+        self.executionType2 = None
+        self.chainDescriptor = None
+class Transaction(object):
+    __slots__ = ("id", "descriptor", "fee", "feePrice", "feeUnit", "feeWei")
+    def __init__(self):
+        self.id = ""
+        self.descriptor = []
+        self.fee = 0.
+        self.feePrice = 0.
+        self.feeUnit = ""
+        self.feeWei = None
+class UTXO(object):
+    __slots__ = ("id", "transaction", "transactionDescriptor")
+    def __init__(self):
+        self.id = 0
+        self.transaction = None
+        self.transactionDescriptor = None
+class Address(object):
+    __slots__ = ("id", "name", "validatorDescriptor", "transactionDescriptor", "account")
+    def __init__(self):
+        self.id = 0
+        self.name = ""
+        self.validatorDescriptor = []
+        self.transactionDescriptor = []
+        self.account = None
+class TransactionDescriptor(object):
+    __slots__ = ("from_", "to", "asset", "token", "data", "value", "script", "utxo", "unit", "valueWei", "key")
+    def __init__(self):
+        self.from_ = []
+        self.to = []
+        self.asset = None
+        self.token = None
+        self.data = None
+        self.value = 0.
+        self.script = ""
+        self.utxo = None
+        self.unit = ""
+        self.valueWei = None
+        self.key = None
+class Data(object):
+    __slots__ = ("id", "storageType", "stateId", "transactionDescriptor", "account")
+    def __init__(self):
+        self.id = 0
+        self.storageType = None
+        self.stateId = ""
+        self.transactionDescriptor = []
+        self.account = None
+class Account(object):
+    __slots__ = ("id", "descriptor", "assets", "tokens", "data", "accountDescriptor", "block")
+    def __init__(self):
+        self.id = ""
+        self.descriptor = None
+        self.assets = []
+        self.tokens = []
+        self.data = []
+        self.accountDescriptor = None
+        self.block = []
+class Asset(object):
+    __slots__ = ("id", "assetType", "utxo", "balance", "transactionDescriptor", "account")
+    def __init__(self):
+        self.id = 0
+        self.assetType = None
+        self.utxo = []
+        self.balance = 0.
+        self.transactionDescriptor = []
+        self.account = None
+class AssetType(object):
+    __slots__ = ("id", "typeName", "unit", "asset")
+    def __init__(self):
+        self.id = 0
+        self.typeName = ""
+        self.unit = ""
+        self.asset = []
+class AccountDescriptor(object):
+    __slots__ = ("isSmartContract", "isExternallyOwned", "addressType", "accountDescriptor", "account", "key")
+    def __init__(self):
+        self.isSmartContract = False
+        self.isExternallyOwned = False
+        self.addressType = ""
+        self.accountDescriptor = None
+        self.account = None
+        self.key = None
+class StorageType(object):
+    __slots__ = ("id", "typeName", "IsBlobType", "isKeyValueType", "data")
+    def __init__(self):
+        self.id = 0
+        self.typeName = ""
+        self.IsBlobType = False
+        self.isKeyValueType = False
+        self.data = []
+class TokenType(object):
+    __slots__ = ("id", "typeName", "standardRef", "unit", "token")
+    def __init__(self):
+        self.id = 0
+        self.typeName = ""
+        self.standardRef = ""
+        self.unit = ""
+        self.token = []
+class Token(object):
+    __slots__ = ("id", "tokenType", "balance", "transactionDescriptor", "account")
+    def __init__(self):
+        self.id = 0
+        self.tokenType = None
+        self.balance = 0.
+        self.transactionDescriptor = []
+        self.account = None
+class Status(object):
+    __slots__ = ("isFinal", "isOrphan", "isOmmer", "blockDescriptor", "key")
+    def __init__(self):
+        self.isFinal = False
+        self.isOrphan = False
+        self.isOmmer = False
+        self.blockDescriptor = []
+        self.key = None
+class BlockDescriptor(object):
+    __slots__ = ("height", "epoch", "slot", "creationData", "timestamp", "status", "dagSupport", "capacity", "status2", "block", "key")
+    def __init__(self):
+        self.height = 0
+        self.epoch = 0
+        self.slot = 0
+        self.creationData = ""
+        self.timestamp = 0
+        self.status = None
+        self.dagSupport = False
+        self.capacity = 0
+        self.status2 = None
+        self.block = None
+        self.key = None
+class ValidatorDescriptor(object):
+    __slots__ = ("validator", "signature", "votes", "rewards", "address", "validationDescriptor", "key")
+    def __init__(self):
+        self.validator = []
+        self.signature = []
+        self.votes = []
+        self.rewards = []
+        self.address = []
+        self.validationDescriptor = []
+        self.key = None
+class Block(object):
+    __slots__ = ("id", "descriptor", "linkedBlockDescriptor", "validationDescriptor", "transactions", "accounts", "chain")
+    def __init__(self):
+        self.id = ""
+        self.descriptor = None
+        self.linkedBlockDescriptor = []
+        self.validationDescriptor = None
+        self.transactions = []
+        self.accounts = []
+        self.chain = None
+class ValidationDescriptor(object):
+    __slots__ = ("validationInput", "validationCondition", "hashValue", "proposer", "creator", "attestations", "reward", "validatorDescriptor", "block", "key")
+    def __init__(self):
+        self.validationInput = ""
+        self.validationCondition = ""
+        self.hashValue = ""
+        self.proposer = []
+        self.creator = []
+        self.attestations = []
+        self.reward = 0.
+        self.validatorDescriptor = []
+        self.block = None
+        self.key = None
+class Query(object):
+    __slots__ = ("network", "chain", "block", "account", "transaction")
+    def __init__(self):
+        self.network = []
+        self.chain = []
+        self.block = []
+        self.account = []
+        self.transaction = []
+
+
+# types of the values written for query attributes, references are written as the ids or keys of the referenced objects,
+# exact amounts in the smallest unit as decimal.Decimal, attributes not listed may have values of several types
+ATTRIBUTE_TYPES = {
+    BLOCK: { ID: str, "descriptor": int, "linkedBlockDescriptor": int, "validationDescriptor": int, "transactions": str, "accounts": str },
+    BLOCK_DESC: { "height": int, "epoch": int, "slot": int, "creationData": str, "timestamp": int, "status": int, "dagSupport": bool, "capacity": int },
+    BLOCK_DESC_LINKED: { "height": int, "epoch": int, "slot": int, "creationData": str, "timestamp": int, "status": int, "dagSupport": bool, "capacity": int },
+    BLOCK_STATUS: { "isFinal": bool, "isOrphan": bool, "isOmmer": bool },
+    BLOCK_VALIDATION_DESC: { "validationInput": str, "validationCondition": str, "hashValue": str, "reward": float },
+    TRANSACTION: { ID: str, "descriptor": int, "fee": float, "feePrice": float, "feeUnit": str, "feeWei": decimal.Decimal },
+    TRANSACTION_DESC: { "from_": str, "to": str, "data": str, "value": float, "script": str, "unit": str, "valueWei": decimal.Decimal },
+    TRANSACTION_ADDRESS: { ID: str, "name": str },
+    ACCOUNT: { ID: str, "assets": int, "accountDescriptor": int },
+    ACCOUNT_DESC: { "isSmartContract": bool, "isExternallyOwned": bool, "addressType": str },
+    ACCOUNT_ASSET: { ID: int, "assetType": int, "balance": float },
+    ACCOUNT_ASSET_TYPE: { ID: int, "typeName": str, "unit": str },
+}
+
+
+# transactions as parallel lists of attribute values, e.g. of a block,
+# Transaction objects are only built when accessed as a list
+class TransactionColumns(object):
+    # fees and values are kept as exact integers in the smallest unit and divided by 10**decimals for unit values
+    __slots__ = ("id", "fee_wei", "value_wei", "from_", "to", "data", "unit", "decimals", "transactions")
+    def __init__(self):
+        self.id = []
+        self.fee_wei = []
+        self.value_wei = []
+        self.from_ = []
+        self.to = []
+        self.data = []
+        self.unit = ""
+        self.decimals = 0
+        self.transactions = None
+
+    def __len__(self):
+        return len(self.id)
+
+    def __getitem__(self, i):
+        return self.get_transactions()[i]
+
+    def __iter__(self):
+        return iter(self.get_transactions())
+
+    def get_column(self, attr):
+        # values of a Transaction attribute, None if not stored as a column
+        if attr == ID:
+            return self.id
+        if attr == 'fee':
+            return [ 0. if fee_wei is None else fee_wei / 10**self.decimals for fee_wei in self.fee_wei ]
+        if attr == 'feeWei':
+            return self.fee_wei
+        if attr == 'feeUnit':
+            return [ "" if fee_wei is None else self.unit for fee_wei in self.fee_wei ]
+        if attr == 'feePrice':
+            return [ 0. ] * len(self.id)
+        return None
+
+    def get_transactions(self):
+        if self.transactions is None:
+            self.transactions = [ self.get_transaction(i) for i in range(len(self.id)) ]
+        return self.transactions
+
+    def get_transaction(self, i):
+        tx = Transaction()
+        tx_desc = TransactionDescriptor()
+
+        tx.id = self.id[i]
+        if not self.fee_wei[i] is None:
+            tx.fee = self.fee_wei[i] / 10**self.decimals
+            tx.feeWei = self.fee_wei[i]
+            tx.feeUnit = self.unit
+
+        from_addr = Address()
+        from_addr.id = self.from_[i]
+        to_addr = Address()
+        to_addr.id = self.to[i]
+
+        tx_desc.from_.append(from_addr)
+        tx_desc.to.append(to_addr)
+
+        tx_desc.value = self.value_wei[i] / 10**self.decimals
+        tx_desc.valueWei = self.value_wei[i]
+        tx_desc.unit = self.unit
+        tx_desc.data = self.data[i]
+
+        tx.descriptor.append(tx_desc)
+        return tx
+
+
+# supported blockchains, networks and chain descriptors with their nodes, see chains.json
+CHAIN_REGISTRY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chains.json")
+
+# registry entries by <blockchain>:<network>:<chain_descriptor>, loaded on the first lookup
+CHAIN_REGISTRY = None
+CHAIN_MODELS = {}
+
+def init_bc(bc_id, bc_name, net_id, net_name, cd_id, cd_name):
+
+    cd = ChainDescriptor()
+    cd.id = str(cd_id)
+    cd.name = cd_name
+
+    net = Network()
+    net.id = str(net_id)
+    net.name = net_name
+    net.chainDescriptors.append(cd)
+
+    bc = Blockchain()
+    bc.id = str(bc_id)
+    bc.name = bc_name
+    bc.networks.append(net)
+
+    return bc
+
+def get_chain_key(bc_id, net_id, cd_id):
+    return str(bc_id) + ":" + str(net_id) + ":" + str(cd_id)
+
+def get_chain_registry():
+
+    global CHAIN_REGISTRY
+
+    if CHAIN_REGISTRY is None:
+        with open(CHAIN_REGISTRY_FILE) as f:
+            chains = json.load(f)["chains"]
+        CHAIN_REGISTRY = { get_chain_key(chain["id"], chain["network"], chain["chain_descriptor"]): chain for chain in chains }
+
+    return CHAIN_REGISTRY
+
+def get_chain(bc_id, net_id, cd_id):
+    # registry entry with node class, endpoint, and settings of the node class, None if not supported
+    return get_chain_registry().get(get_chain_key(bc_id, net_id, cd_id))
+
+def get_bc_by_id(bc_id, net_id, cd_id):
+
+    # data model instances are created for the chains used by a query only
+    key = get_chain_key(bc_id, net_id, cd_id)
+    if not key in CHAIN_MODELS:
+        chain = get_chain(bc_id, net_id, cd_id)
+        if chain is None:
+            return None
+        CHAIN_MODELS[key] = init_bc(chain["id"], chain["name"], chain["network"], chain["network_name"], chain["chain_descriptor"], chain["chain_descriptor_name"])
+
+    return CHAIN_MODELS[key]
+
+def get_chain_instance_list():
+    return list(get_chain_registry().keys())
+
+def print_obj(obj):
+    cl = type(obj).__name__
+    inst = ""
+    if hasattr(obj, 'id'):
+        inst = obj.id
+    elif hasattr(obj, 'height'):
+        inst = obj.name
+    else:
+        inst = obj
+    print(cl, inst)
+    for attr in dir(obj):
+        val = str(getattr(obj, attr))
+        if not attr.startswith("_"):
+            print(" -", attr, val)
+
+def print_objs(obj_list):
+    for obj in obj_list:
+        print_obj(obj)
+
+def print_obj_ids(obj_list):
+    out = ""
+    for obj in obj_list:
+        if hasattr(obj, 'id'):
+            out += obj.id + " "
+    print(out)
@@ -1,1207 +1,632 @@
-import os
-import subprocess
-import sys
-import binascii
-import requests
-import json
-from web3 import Web3
-
-from . import ccql_data
-
-LIMIT = 3
-
-# for proof-of-authority geth nodes, development
-from web3.middleware import geth_poa_middleware
-
-class CCQL_Node:
-
-	def __init__(self):
-		self.working_dir = "."
-
-	def run_node(self):
-		os.makedirs(self.working_dir, exist_ok=True)
-		os.chdir(self.working_dir)
-
-	def is_connected(self):
-		return False
-
-class Geth_Node(CCQL_Node):
-
-	GETH = "geth"
-	
-	GETH_DATADIR = "geth-data"
-	GETH_DATADIR_POA = "geth-data-poa"
-	
-	GETH_DATADIR_ANCIENT = "geth-data-ancient"
-	GETH_DATADIR_ANCIENT_POA = "geth-data-ancient-poa"
-
-	GETH_DAG_DIR = "geth-dag"
-
-	def __init__(self, working_dir):
-		super().__init__(working_dir)
-
-	def run_node(self, account_address, account_password_file):
-		super().run_node()
-		subprocess.run([self.GETH, "--datadir", self.GETH_DATADIR, "datadir.ancient", self.GETH_DATADIR_ANCIENT, "--ethash.dagdir", self.GETH_DAG_DIR, "--cache", 4000, "--syncmode", "full", "--ws", "--ws.api", "eth,net,web3"])
-	
-	def run_node_poa_development(self, account_address, account_password_file):
-		super().run_node()
-		subprocess.run([self.GETH, "--datadir", self.GETH_DATADIR_POA, "datadir.ancient", self.GETH_DATADIR_ANCIENT_POA, "--cache", 4000, "--syncmode", "full", "--rpccorsdomain", "*", "networkid", 55194, "--nodiscover", "--vmdebug"])
-		# --unlock "0xf7b13d6b33EC6492AfB9756205D1A9e58Bab70ee" -allow-insecure-unlock console
-
-class Web3_Avalanche_Node(CCQL_Node):
-
-	WEB3_ADDRESS = "https://api.avax.network/ext/bc/C/rpc"
-
-	def __init__(self, identity):
-		if len(identity) > 0 and identity != "0x0":
-			self.ci_account_address = Web3.toChecksumAddress(identity.address)
-			self.ci_account_privatekey = identity.privatekey
-
-		if self.WEB3_ADDRESS.startswith("ws"):
-			provider = Web3.WebsocketProvider(self.WEB3_ADDRESS) #, websocket_timeout=3)
-		else:
-			provider = Web3.HTTPProvider(self.WEB3_ADDRESS)
-		
-		self.w3 = Web3(provider)
-
-		self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
-
-	def is_connected(self):
-		return self.w3.isConnected()
-
-	def get_block(self, block_id, linked_block_desc, limit):
-		
-		#print("block_id", block_id)
-
-    	# block_id must be numberic, >=0 for block height, <0 for block depth
-		if isinstance(block_id, int) or block_id.isnumeric():
-			block_id = int(block_id)
-		else:
-			print("Error: block descriptor is not numeric")
-			sys.exit()
-		
-		# construct block id for web3
-		block_id_web3 = block_id
-		if (block_id == -1):
-			block_id_web3 = 'latest'
-		elif (block_id_web3 < -1):
-			tip = self.w3.eth.getBlockNumber()
-			block_id_web3 = tip + block_id + 1
-
-		web3_block = self.w3.eth.getBlock(block_id_web3, True)
-		#print(web3_block)
-
-		block = ccql_data.Block()
-		block_desc = ccql_data.BlockDescriptor()
-		status = ccql_data.Status()
-		validationDesc = ccql_data.ValidationDescriptor()
-
-		block.id = web3_block.hash.hex()
-		block.validationDescriptor = validationDesc
-		block.validationDescriptor.proposer = []
-		block.validationDescriptor.creator = []
-		block.validationDescriptor.attestations = []
-		
-		block_desc.height = web3_block.number
-		block_desc.timestamp = web3_block.timestamp
-		block_desc.status = status
-		block.descriptor = block_desc
-
-		block.linkedBlockDescriptor = linked_block_desc
-
-		accounts = {}
-
-		i = 0
-		for web3_tx in web3_block.transactions:
-
-			tx = ccql_data.Transaction()
-			tx_desc = ccql_data.TransactionDescriptor()
-
-			tx.id = web3_tx.hash.hex()
-			
-			if 'maxFeePerGas' in web3_tx and not web3_tx.maxFeePerGas is None:
-				baseFeePerGas = web3_tx.maxFeePerGas - web3_tx.maxPriorityFeePerGas
-				fee = baseFeePerGas * web3_tx.gas
-				tx.fee = fee / 10**18
-				tx.feeUnit = "AVAX"
-			elif 'gasPrice' in web3_tx and not web3_tx.gasPrice is None:
-				fee = web3_tx.gasPrice * web3_tx.gas
-				tx.fee = fee / 10**18
-				tx.feeUnit = "AVAX"
-
-			from_addr = ccql_data.Address()
-			from_addr.id = web3_tx['from']
-			to_addr = ccql_data.Address()
-			to_addr.id = web3_tx['to']
-
-			accounts[from_addr.id] = from_addr
-			accounts[to_addr.id] = to_addr
-
-			tx_desc.from_.append(from_addr)
-			tx_desc.to.append(to_addr)
-
-			tx_desc.value = web3_tx.value / 10**18
-			tx_desc.unit = "AVAX"
-			tx_desc.data = web3_tx.input
-
-			tx.descriptor.append(tx_desc)
-			block.transactions.append(tx)
-			
-			#ccql_data.print_obj(tx)
-			#ccql_data.print_obj(tx_desc)
-			#print(tx)
-			#print(tx_desc)
-
-			i += 1
-			if i >= limit:
-				break
-
-		for a in accounts.keys():
-			block.accounts.append(accounts[a])
-
-		return block
-
-
-	def get_blocks(self, block_id_list):
-		blocks = []
-		for block_id in block_id_list:
-			blocks.append(self.get_block(block_id))
-		return blocks
-
-
-	def get_transaction(self, transaction_id):
-
-		if not isinstance(transaction_id, str):
-			print("Error: transaction descriptor is not a string")
-			sys.exit()
-		
-		# construct block desciptor for web3
-		transaction_id_web3 = transaction_id
-		if (transaction_id == "0x0"):
-			transaction_id_web3 = '0xa'
-
-		web3_tx = self.w3.eth.getTransaction(transaction_id_web3)
-		
-		tx = ccql_data.Transaction()
-		tx_desc = ccql_data.TransactionDescriptor()
-
-		tx.id = web3_tx.hash.hex()
-		
-		if 'maxFeePerGas' in web3_tx and not web3_tx.maxFeePerGas is None:
-			baseFeePerGas = web3_tx.maxFeePerGas - web3_tx.maxPriorityFeePerGas
-			fee = baseFeePerGas * web3_tx.gas
-			tx.fee = fee / 10**18
-			tx.feeUnit = "AVAX"
-		elif 'gasPrice' in web3_tx and not web3_tx.gasPrice is None:
-			fee = web3_tx.gasPrice * web3_tx.gas
-			tx.fee = fee / 10**18
-			tx.feeUnit = "AVAX"
-
-		from_addr = ccql_data.Address()
-		from_addr.id = web3_tx['from']
-		to_addr = ccql_data.Address()
-		to_addr.id = web3_tx['to']
-
-		#tx[ccql_data.TX_BLOCK_ID] = web3_tx.blockNumber
-		#tx[ccql_data.TX_block_id] = web3_tx.blockHash
-
-		tx_desc.from_.append(from_addr)
-		tx_desc.to.append(to_addr)
-
-		tx_desc.value = web3_tx.value / 10**18
-		tx_desc.unit = "AVAX"
-		tx_desc.data = web3_tx.input
-
-		tx.descriptor.append(tx_desc)
-
-		return tx
-
-
-	def get_transactions(self, transaction_id_list):
-		transactions = []
-		for transaction_id in transaction_id_list:
-			transactions.append(self.get_transaction(transaction_id))
-		return transactions
-
-
-	def get_account(self, account_id):
-
-		if not isinstance(account_id, str):
-			print("Error: account descriptor is not a string")
-			sys.exit()
-		
-		# construct block desciptor for web3
-		account_id_web3 = account_id
-		if (account_id == "0x0"):
-			account_id_web3 = '0xa'
-		else:
-			account_id_web3 = self.w3.toChecksumAddress(account_id)
-
-		ac = ccql_data.Account()
-		ac_desc = ccql_data.AccountDescriptor()
-
-		ac.id = account_id
-
-		# Avalanche supports the "AVAX/AVAX" asset only
-		as_avax = ccql_data.Asset()
-		as_type = ccql_data.AssetType()
-
-		as_type.id = 1
-		as_type.typeName = "AVAX"
-		as_type.unit = "AVAX"
-
-		as_avax.id = 1
-		as_avax.assetType = as_type
-
-		# Balance returned in 10^⁻18
-		web3_balance = self.w3.eth.getBalance(account_id_web3)
-		as_avax.balance = web3_balance * pow(10, -18)
-
-		ac.accountDescriptor = ac_desc
-		ac.assets.append(as_avax)
-
-		return ac
-
-
-	def get_accounts(self, account_id_list):
-		accounts = []
-		for account_id in account_id_list:
-			accounts.append(self.get_account(account_id))
-		return accounts
-
-
-	def get_contract(self, address, abi):
-
-		self.contract = None
-		self.contract = self.w3.eth.contract(address=address, abi=abi)
-
-		if self.contract is None:
-			print("Contract not found, abort")
-			sys.exit()
-			
-		return self.contract
-
-	def call_contract(self, address, abi, function, parameters):
-		
-		self.get_contract()
-			
-		contract = self.get_attestation_contract()
-
-		#merkle_root_bytes32 = data_coding.encode_binary_bytes32(merkle_root)
-		#merkle_root_prime_bytes32 = data_coding.encode_binary_bytes32(merkle_root)
-
-		# receipt = contract.functions.function(parameters).call()
-		
-		return None
-
-	def get_current_gas_price(self):
-		gas_price_api = "https://www.etherchain.org/api/gasPriceOracle"
-		r = requests.get(gas_price_api).json()
-		gas_price = Web3.toWei(r.fastest, 'gwei')
-
-		if gas_price > 100000000000:
-			print("Gas price exceeds 100 Gwei, abort")
-			sys.exit()
-
-		return gas_price
-
-	def get_transaction_info(self):
-		nonce = self.w3.eth.getTransactionCount(self.ci_account_address)
-		#block = self.w3.eth.getBlock("latest")
-
-		gas_price = self.get_current_gas_price()
-		gas_limit = 300000
-
-		tx = {
-				"from": self.ci_account_address,
-				"value": 0,
-				'chainId': 1,
-				'nonce': nonce,
-				'gas': gas_limit,
-				'gasPrice': gas_price
-		}
-
-		print("Gas limit:", gas_limit)
-		print("Gas price:", gas_price)
-
-		return tx
-
-	def send_transaction(self, tx):
-		tx_hash = ""
-		pk_b = self.ci_account_privatekey
-		signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=pk_b)
-		print(signed_tx)
-		#signed_tx.r / s / v
-		tx_hash = self.w3.eth.sendRawTransaction(signed_tx.rawTransaction)
-		
-		receipt = self.w3.eth.waitForTransactionReceipt(tx_hash)
-
-		return receipt #tx_hash
-
-
-class Cardano_Node(CCQL_Node):
-
-	WEB3_ADDRESS = ""
-
-	def __init__(self, identity):
-		if len(identity) > 0 and identity != "0x0":
-			self.ci_account_address = Web3.toChecksumAddress(identity.address)
-			self.ci_account_privatekey = identity.privatekey
-
-		if self.WEB3_ADDRESS.startswith("ws"):
-			provider = Web3.WebsocketProvider(self.WEB3_ADDRESS) #, websocket_timeout=3)
-		else:
-			provider = Web3.HTTPProvider(self.WEB3_ADDRESS)
-		
-		self.w3 = Web3(provider)
-
-	def is_connected(self):
-		return self.w3.isConnected()
-
-	def get_block(self, block_id, linked_block_desc, limit):
-		
-		#print("block_id", block_id)
-
-    	# block_id must be numberic, >=0 for block height, <0 for block depth
-		if isinstance(block_id, int) or block_id.isnumeric():
-			block_id = int(block_id)
-		else:
-			print("Error: block descriptor is not numeric")
-			sys.exit()
-		
-		# construct block id for web3
-		block_id_web3 = block_id
-		if (block_id == -1):
-			block_id_web3 = 'latest'
-		elif (block_id_web3 < -1):
-			tip = self.w3.eth.getBlockNumber()
-			block_id_web3 = tip + block_id + 1
-
-		web3_block = self.w3.eth.getBlock(block_id_web3, True)
-		#print(web3_block)
-
-		block = ccql_data.Block()
-		block_desc = ccql_data.BlockDescriptor()
-		status = ccql_data.Status()
-		validationDesc = ccql_data.ValidationDescriptor()
-
-		block.id = web3_block.hash.hex()
-		block.validationDescriptor = validationDesc
-		block.validationDescriptor.proposer = []
-		block.validationDescriptor.creator = []
-		block.validationDescriptor.attestations = []
-		
-		block_desc.height = web3_block.number
-		block_desc.timestamp = web3_block.timestamp
-		block_desc.status = status
-		block.descriptor = block_desc
-
-		block.linkedBlockDescriptor = linked_block_desc
-
-		accounts = {}
-
-		i = 0
-		for web3_tx in web3_block.transactions:
-
-			tx = ccql_data.Transaction()
-			tx_desc = ccql_data.TransactionDescriptor()
-
-			tx.id = web3_tx.hash.hex()
-
-			if 'maxFeePerGas' in web3_tx and not web3_tx.maxFeePerGas is None:
-				baseFeePerGas = web3_tx.maxFeePerGas - web3_tx.maxPriorityFeePerGas
-				fee = baseFeePerGas * web3_tx.gas
-				tx.fee = fee / 10**18
-				tx.feeUnit = "ADA"
-			elif 'gasPrice' in web3_tx and not web3_tx.gasPrice is None:
-				fee = web3_tx.gasPrice * web3_tx.gas
-				tx.fee = fee / 10**18
-				tx.feeUnit = "ADA"
-
-			from_addr = ccql_data.Address()
-			from_addr.id = web3_tx['from']
-			to_addr = ccql_data.Address()
-			to_addr.id = web3_tx['to']
-
-			accounts[from_addr.id] = from_addr
-			accounts[to_addr.id] = to_addr
-
-			tx_desc.from_.append(from_addr)
-			tx_desc.to.append(to_addr)
-
-			tx_desc.value = web3_tx.value / 10**18
-			tx_desc.data = web3_tx.input
-
-			tx.descriptor.append(tx_desc)
-			block.transactions.append(tx)
-			
-			#ccql_data.print_obj(tx)
-			#ccql_data.print_obj(tx_desc)
-			#print(tx)
-			#print(tx_desc)
-
-			i += 1
-			if i >= limit:
-				break
-
-		for a in accounts.keys():
-			block.accounts.append(accounts[a])
-
-		return block
-
-
-	def get_blocks(self, block_id_list):
-		blocks = []
-		for block_id in block_id_list:
-			blocks.append(self.get_block(block_id))
-		return blocks
-
-
-	def get_transaction(self, transaction_id):
-
-		if not isinstance(transaction_id, str):
-			print("Error: transaction descriptor is not a string")
-			sys.exit()
-		
-		# construct block desciptor for web3
-		transaction_id_web3 = transaction_id
-		if (transaction_id == "0x0"):
-			transaction_id_web3 = '0xa'
-
-		web3_tx = self.w3.eth.getTransaction(transaction_id_web3)
-		
-		tx = ccql_data.Transaction()
-		tx_desc = ccql_data.TransactionDescriptor()
-
-		tx.id = web3_tx.hash.hex()
-		
-		if 'maxFeePerGas' in web3_tx and not web3_tx.maxFeePerGas is None:
-			baseFeePerGas = web3_tx.maxFeePerGas - web3_tx.maxPriorityFeePerGas
-			fee = baseFeePerGas * web3_tx.gas
-			tx.fee = fee / 10**18
-			tx.feeUnit = "ADA"
-		elif 'gasPrice' in web3_tx and not web3_tx.gasPrice is None:
-			fee = web3_tx.gasPrice * web3_tx.gas
-			tx.fee = fee / 10**18
-			tx.feeUnit = "ADA"
-
-		from_addr = ccql_data.Address()
-		from_addr.id = web3_tx['from']
-		to_addr = ccql_data.Address()
-		to_addr.id = web3_tx['to']
-
-		#tx[ccql_data.TX_BLOCK_ID] = web3_tx.blockNumber
-		#tx[ccql_data.TX_block_id] = web3_tx.blockHash
-
-		tx_desc.from_.append(from_addr)
-		tx_desc.to.append(to_addr)
-
-		tx_desc.value = web3_tx.value / 10**18
-		tx_desc.data = web3_tx.input
-
-		tx.descriptor.append(tx_desc)
-
-		return tx
-
-
-	def get_transactions(self, transaction_id_list):
-		transactions = []
-		for transaction_id in transaction_id_list:
-			transactions.append(self.get_transaction(transaction_id))
-		return transactions
-
-
-	def get_account(self, account_id):
-
-		if not isinstance(account_id, str):
-			print("Error: account descriptor is not a string")
-			sys.exit()
-		
-		# construct block desciptor for web3
-		account_id_web3 = account_id
-		if account_id == "0x0":
-			account_id_web3 = '0xa'
-		else:
-			account_id_web3 = self.w3.toChecksumAddress(account_id)
-
-		ac = ccql_data.Account()
-		ac_desc = ccql_data.AccountDescriptor()
-
-		ac.id = account_id
-
-		as_eth = ccql_data.Asset()
-		as_type = ccql_data.AssetType()
-
-		as_type.id = 1
-		as_type.typeName = "ADA"
-		as_type.unit = "ADA"
-
-		as_eth.id = 1
-		as_eth.assetType = as_type
-
-		# Balance returned in 10^⁻18
-		web3_balance = self.w3.eth.getBalance(account_id_web3)
-		as_eth.balance = web3_balance * pow(10, -18)
-
-		ac.accountDescriptor = ac_desc
-		ac.assets.append(as_eth)
-
-		return ac
-
-
-	def get_accounts(self, account_id_list):
-		accounts = []
-		for account_id in account_id_list:
-			accounts.append(self.get_account(account_id))
-		return accounts
-
-
-	def get_contract(self, address, abi):
-
-		self.contract = None
-		self.contract = self.w3.eth.contract(address=address, abi=abi)
-
-		if self.contract is None:
-			print("Contract not found, abort")
-			sys.exit()
-			
-		return self.contract
-
-	def call_contract(self, address, abi, function, parameters):
-		
-		self.get_contract()
-			
-		contract = self.get_attestation_contract()
-
-		#merkle_root_bytes32 = data_coding.encode_binary_bytes32(merkle_root)
-		#merkle_root_prime_bytes32 = data_coding.encode_binary_bytes32(merkle_root)
-
-		# TODO: receipt = contract.functions.function(parameters).call()
-		
-		return None
-
-	def get_current_gas_price(self):
-		gas_price_api = "https://www.etherchain.org/api/gasPriceOracle"
-		r = requests.get(gas_price_api).json()
-		gas_price = Web3.toWei(r.fastest, 'gwei')
-
-		if gas_price > 100000000000:
-			print("Gas price exceeds 100 Gwei, abort")
-			sys.exit()
-
-		return gas_price
-
-	def get_transaction_info(self):
-		nonce = self.w3.eth.getTransactionCount(self.ci_account_address)
-		#block = self.w3.eth.getBlock("latest")
-
-		gas_price = self.get_current_gas_price()
-		gas_limit = 300000
-
-		tx = {
-				"from": self.ci_account_address,
-				"value": 0,
-				'chainId': 1,
-				'nonce': nonce,
-				'gas': gas_limit,
-				'gasPrice': gas_price
-		}
-
-		print("Gas limit:", gas_limit)
-		print("Gas price:", gas_price)
-
-		return tx
-
-	def send_transaction(self, tx):
-		tx_hash = ""
-		pk_b = self.ci_account_privatekey
-		signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=pk_b)
-		print(signed_tx)
-		#signed_tx.r / s / v
-		tx_hash = self.w3.eth.sendRawTransaction(signed_tx.rawTransaction)
-		
-		receipt = self.w3.eth.waitForTransactionReceipt(tx_hash)
-
-		return receipt #tx_hash
-
-class Bitcoin_Node(CCQL_Node):
-
-	WEB3_ADDRESS = ""
-
-	def __init__(self, identity):
-		if len(identity) > 0 and identity != "0x0":
-			self.ci_account_address = Web3.toChecksumAddress(identity.address)
-			self.ci_account_privatekey = identity.privatekey
-
-		if self.WEB3_ADDRESS.startswith("ws"):
-			provider = Web3.WebsocketProvider(self.WEB3_ADDRESS) #, websocket_timeout=3)
-		else:
-			provider = Web3.HTTPProvider(self.WEB3_ADDRESS)
-		
-		self.w3 = Web3(provider)
-
-		#self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
-		
-	def is_connected(self):
-		return self.w3.isConnected()
-
-	def get_block(self, block_id, linked_block_desc, limit):
-		
-		#print("block_id", block_id)
-
-    	# block_id must be numberic, >=0 for block height, <0 for block depth
-		if isinstance(block_id, int) or block_id.isnumeric():
-			block_id = int(block_id)
-		else:
-			print("Error: block descriptor is not numeric")
-			sys.exit()
-		
-		# construct block id for web3
-		block_id_web3 = block_id
-		if (block_id == -1):
-			block_id_web3 = 'latest'
-		elif (block_id_web3 < -1):
-			tip = self.w3.eth.getBlockNumber()
-			block_id_web3 = tip + block_id + 1
-
-		web3_block = self.w3.eth.getBlock(block_id_web3, True)
-		#print(web3_block)
-
-		block = ccql_data.Block()
-		block_desc = ccql_data.BlockDescriptor()
-		status = ccql_data.Status()
-		validationDesc = ccql_data.ValidationDescriptor()
-
-		block.id = web3_block.hash.hex()
-		block.validationDescriptor = validationDesc
-		block.validationDescriptor.proposer = []
-		block.validationDescriptor.creator = []
-		block.validationDescriptor.attestations = []
-		
-		block_desc.height = web3_block.number
-		block_desc.timestamp = web3_block.timestamp
-		block_desc.status = status
-		block.descriptor = block_desc
-
-		block.linkedBlockDescriptor = linked_block_desc
-
-		accounts = {}
-
-		i = 0
-		for web3_tx in web3_block.transactions:
-
-			tx = ccql_data.Transaction()
-			tx_desc = ccql_data.TransactionDescriptor()
-
-			tx.id = web3_tx.hash.hex()
-			
-			if 'maxFeePerGas' in web3_tx and not web3_tx.maxFeePerGas is None:
-				baseFeePerGas = web3_tx.maxFeePerGas - web3_tx.maxPriorityFeePerGas
-				fee = baseFeePerGas * web3_tx.gas
-				tx.fee = fee / 10**18
-				tx.feeUnit = "BTC"
-			elif 'gasPrice' in web3_tx and not web3_tx.gasPrice is None:
-				fee = web3_tx.gasPrice * web3_tx.gas
-				tx.fee = fee / 10**18
-				tx.feeUnit = "BTC"
-
-			from_addr = ccql_data.Address()
-			from_addr.id = web3_tx['from']
-			to_addr = ccql_data.Address()
-			to_addr.id = web3_tx['to']
-
-			accounts[from_addr.id] = from_addr
-			accounts[to_addr.id] = to_addr
-
-			tx_desc.from_.append(from_addr)
-			tx_desc.to.append(to_addr)
-
-			tx_desc.value = web3_tx.value / 10**18
-			tx_desc.data = web3_tx.input
-
-			tx.descriptor.append(tx_desc)
-			block.transactions.append(tx)
-			
-			#ccql_data.print_obj(tx)
-			#ccql_data.print_obj(tx_desc)
-			#print(tx)
-			#print(tx_desc)
-
-			i += 1
-			if i >= limit:
-				break
-
-		for a in accounts.keys():
-			block.accounts.append(accounts[a])
-
-		return block
-
-
-	def get_blocks(self, block_id_list):
-		blocks = []
-		for block_id in block_id_list:
-			blocks.append(self.get_block(block_id))
-		return blocks
-
-
-	def get_transaction(self, transaction_id):
-
-		if not isinstance(transaction_id, str):
-			print("Error: transaction descriptor is not a string")
-			sys.exit()
-		
-		# construct block desciptor for web3
-		transaction_id_web3 = transaction_id
-		if (transaction_id == "0x0"):
-			transaction_id_web3 = '0xa'
-
-		web3_tx = self.w3.eth.getTransaction(transaction_id_web3)
-		
-		tx = ccql_data.Transaction()
-		tx_desc = ccql_data.TransactionDescriptor()
-
-		tx.id = web3_tx.hash.hex()
-		
-		if 'maxFeePerGas' in web3_tx and not web3_tx.maxFeePerGas is None:
-			baseFeePerGas = web3_tx.maxFeePerGas - web3_tx.maxPriorityFeePerGas
-			fee = baseFeePerGas * web3_tx.gas
-			tx.fee = fee / 10**18
-			tx.feeUnit = "BTC"
-		elif 'gasPrice' in web3_tx and not web3_tx.gasPrice is None:
-			fee = web3_tx.gasPrice * web3_tx.gas
-			tx.fee = fee / 10**18
-			tx.feeUnit = "BTC"
-
-		from_addr = ccql_data.Address()
-		from_addr.id = web3_tx['from']
-		to_addr = ccql_data.Address()
-		to_addr.id = web3_tx['to']
-
-		#tx[ccql_data.TX_BLOCK_ID] = web3_tx.blockNumber
-		#tx[ccql_data.TX_block_id] = web3_tx.blockHash
-
-		tx_desc.from_.append(from_addr)
-		tx_desc.to.append(to_addr)
-
-		tx_desc.value = web3_tx.value / 10**18
-		tx_desc.data = web3_tx.input
-
-		tx.descriptor.append(tx_desc)
-
-		return tx
-
-
-	def get_transactions(self, transaction_id_list):
-		transactions = []
-		for transaction_id in transaction_id_list:
-			transactions.append(self.get_transaction(transaction_id))
-		return transactions
-
-
-	def get_account(self, account_id):
-
-		if not isinstance(account_id, str):
-			print("Error: account descriptor is not a string")
-			sys.exit()
-		
-		# construct block desciptor for web3
-		account_id_web3 = account_id
-		if (account_id == "0x0"):
-			account_id_web3 = '0xa'
-		else:
-			account_id_web3 = self.w3.toChecksumAddress(account_id)
-
-		ac = ccql_data.Account()
-		ac_desc = ccql_data.AccountDescriptor()
-
-		ac.id = account_id
-
-		as_eth = ccql_data.Asset()
-		as_type = ccql_data.AssetType()
-
-		as_type.id = 1
-		as_type.typeName = "Bitcoin"
-		as_type.unit = "BTC"
-
-		as_eth.id = 1
-		as_eth.assetType = as_type
-
-		# Balance returned in 10^⁻18
-		web3_balance = self.w3.eth.getBalance(account_id_web3)
-		as_eth.balance = web3_balance * pow(10, -18)
-
-		ac.accountDescriptor = ac_desc
-		ac.assets.append(as_eth)
-
-		return ac
-
-
-	def get_accounts(self, account_id_list):
-		accounts = []
-		for account_id in account_id_list:
-			accounts.append(self.get_account(account_id))
-		return accounts
-
-
-	def get_contract(self, address, abi):
-
-		self.contract = None
-		self.contract = self.w3.eth.contract(address=address, abi=abi)
-
-		if self.contract is None:
-			print("Contract not found, abort")
-			sys.exit()
-			
-		return self.contract
-
-	def call_contract(self, address, abi, function, parameters):
-		
-		self.get_contract()
-			
-		contract = self.get_attestation_contract()
-
-		#merkle_root_bytes32 = data_coding.encode_binary_bytes32(merkle_root)
-		#merkle_root_prime_bytes32 = data_coding.encode_binary_bytes32(merkle_root)
-
-		# receipt = contract.functions.function(parameters).call()
-		
-		return None
-
-	def get_current_gas_price(self):
-		gas_price_api = "https://www.etherchain.org/api/gasPriceOracle"
-		r = requests.get(gas_price_api).json()
-		gas_price = Web3.toWei(r.fastest, 'gwei')
-
-		if gas_price > 100000000000:
-			print("Gas price exceeds 100 Gwei, abort")
-			sys.exit()
-
-		return gas_price
-
-	def get_transaction_info(self):
-		nonce = self.w3.eth.getTransactionCount(self.ci_account_address)
-		#block = self.w3.eth.getBlock("latest")
-
-		gas_price = self.get_current_gas_price()
-		gas_limit = 300000
-
-		tx = {
-				"from": self.ci_account_address,
-				"value": 0,
-				'chainId': 1,
-				'nonce': nonce,
-				'gas': gas_limit,
-				'gasPrice': gas_price
-		}
-
-		print("Gas limit:", gas_limit)
-		print("Gas price:", gas_price)
-
-		return tx
-
-	def send_transaction(self, tx):
-		tx_hash = ""
-		pk_b = self.ci_account_privatekey
-		signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=pk_b)
-		print(signed_tx)
-		#signed_tx.r / s / v
-		tx_hash = self.w3.eth.sendRawTransaction(signed_tx.rawTransaction)
-		
-		receipt = self.w3.eth.waitForTransactionReceipt(tx_hash)
-
-		return receipt #tx_hash
-
-
-class Web3_Eth_Node(CCQL_Node):
-
-	WEB3_ADDRESS = "wss://mainnet.infura.io/ws/v3/5cc53e4f3f614825be68d6aae4897cf4"
-
-	def __init__(self, identity):
-		if len(identity) > 0 and identity != "0x0":
-			self.ci_account_address = Web3.toChecksumAddress(identity.address)
-			self.ci_account_privatekey = identity.privatekey
-
-		if self.WEB3_ADDRESS.startswith("ws"):
-			provider = Web3.WebsocketProvider(self.WEB3_ADDRESS) #, websocket_timeout=3)
-		else:
-			provider = Web3.HTTPProvider(self.WEB3_ADDRESS)
-		
-		self.w3 = Web3(provider)
-
-	def is_connected(self):
-		return self.w3.isConnected()
-
-	def get_block(self, block_id, linked_block_desc, limit):
-		
-		#print("block_id", block_id)
-
-    	# block_id must be numberic, >=0 for block height, <0 for block depth
-		if isinstance(block_id, int) or block_id.isnumeric():
-			block_id = int(block_id)
-		else:
-			print("Error: block descriptor is not numeric")
-			sys.exit()
-		
-		# construct block id for web3
-		block_id_web3 = block_id
-		if (block_id == -1):
-			block_id_web3 = 'latest'
-		elif (block_id_web3 < -1):
-			tip = self.w3.eth.getBlockNumber()
-			block_id_web3 = tip + block_id + 1
-
-		web3_block = self.w3.eth.getBlock(block_id_web3, True)
-		#print(web3_block)
-
-		block = ccql_data.Block()
-		block_desc = ccql_data.BlockDescriptor()
-		status = ccql_data.Status()
-		validationDesc = ccql_data.ValidationDescriptor()
-
-		block.id = web3_block.hash.hex()
-		block.validationDescriptor = validationDesc
-		block.validationDescriptor.proposer = []
-		block.validationDescriptor.creator = []
-		block.validationDescriptor.attestations = []
-		
-		block_desc.height = web3_block.number
-		block_desc.timestamp = web3_block.timestamp
-		block_desc.status = status
-		block.descriptor = block_desc
-
-		block.linkedBlockDescriptor = linked_block_desc
-
-		accounts = {}
-
-		i = 0
-		for web3_tx in web3_block.transactions:
-
-			tx = ccql_data.Transaction()
-			tx_desc = ccql_data.TransactionDescriptor()
-
-			tx.id = web3_tx.hash.hex()
-			
-			if 'maxFeePerGas' in web3_tx and not web3_tx.maxFeePerGas is None:
-				#print(web3_tx.maxFeePerGas)
-				#maxFeePerGas = int.from_bytes(bytes.fromhex(web3_tx.maxFeePerGas[2:]), byteorder=sys.byteorder)
-				#maxPriorityFeePerGas = int.from_bytes(bytes.fromhex(web3_tx.maxPriorityFeePerGas[2:]), byteorder=sys.byteorder)
-				maxFeePerGas = web3_tx.maxFeePerGas
-				maxPriorityFeePerGas = web3_tx.maxPriorityFeePerGas
-				#print(maxFeePerGas, maxPriorityFeePerGas)
-				baseFeePerGas = maxFeePerGas - maxPriorityFeePerGas
-				fee = baseFeePerGas * web3_tx.gas
-				tx.fee = fee / 10**18
-				tx.feeUnit = "ETH"
-			elif 'gasPrice' in web3_tx and not web3_tx.gasPrice is None:
-				fee = web3_tx.gasPrice * web3_tx.gas
-				tx.fee = fee / 10**18
-				tx.feeUnit = "ETH"
-
-			from_addr = ccql_data.Address()
-			from_addr.id = web3_tx['from']
-			to_addr = ccql_data.Address()
-			to_addr.id = web3_tx['to']
-
-			accounts[from_addr.id] = from_addr
-			accounts[to_addr.id] = to_addr
-
-			tx_desc.from_.append(from_addr)
-			tx_desc.to.append(to_addr)
-
-			tx_desc.value = web3_tx.value / 10**18
-			tx_desc.unit = "ETH"
-			tx_desc.data = web3_tx.input
-
-			tx.descriptor.append(tx_desc)
-			block.transactions.append(tx)
-			
-			#ccql_data.print_obj(tx)
-			#ccql_data.print_obj(tx_desc)
-			#print(tx)
-			#print(tx_desc)
-
-			i += 1
-			if i >= limit:
-				break
-
-		for a in accounts.keys():
-			block.accounts.append(accounts[a])
-
-		return block
-
-
-	def get_blocks(self, block_id_list):
-		blocks = []
-		for block_id in block_id_list:
-			blocks.append(self.get_block(block_id))
-		return blocks
-
-
-	def get_transaction(self, transaction_id):
-
-		if not isinstance(transaction_id, str):
-			print("Error: transaction descriptor is not a string")
-			sys.exit()
-		
-		# construct block desciptor for web3
-		transaction_id_web3 = transaction_id
-		if (transaction_id == "0x0"):
-			transaction_id_web3 = '0xa'
-
-		web3_tx = self.w3.eth.getTransaction(transaction_id_web3)
-		
-		tx = ccql_data.Transaction()
-		tx_desc = ccql_data.TransactionDescriptor()
-
-		tx.id = web3_tx.hash.hex()
-		
-		if 'maxFeePerGas' in web3_tx and not web3_tx.maxFeePerGas is None:
-			baseFeePerGas = web3_tx.maxFeePerGas - web3_tx.maxPriorityFeePerGas
-			fee = baseFeePerGas * web3_tx.gas
-			tx.fee = fee / 10**18
-			tx.feeUnit = "ETH"
-		elif 'gasPrice' in web3_tx and not web3_tx.gasPrice is None:
-			fee = web3_tx.gasPrice * web3_tx.gas
-			tx.fee = fee / 10**18
-			tx.feeUnit = "ETH"
-
-		from_addr = ccql_data.Address()
-		from_addr.id = web3_tx['from']
-		to_addr = ccql_data.Address()
-		to_addr.id = web3_tx['to']
-
-		#tx[ccql_data.TX_BLOCK_ID] = web3_tx.blockNumber
-		#tx[ccql_data.TX_block_id] = web3_tx.blockHash
-
-		tx_desc.from_.append(from_addr)
-		tx_desc.to.append(to_addr)
-
-		tx_desc.value = web3_tx.value / 10**18
-		tx_desc.unit = "ETH"
-		tx_desc.data = web3_tx.input
-
-		tx.descriptor.append(tx_desc)
-
-		return tx
-
-
-	def get_transactions(self, transaction_id_list):
-		transactions = []
-		for transaction_id in transaction_id_list:
-			transactions.append(self.get_transaction(transaction_id))
-		return transactions
-
-
-	def get_account(self, account_id):
-
-		if not isinstance(account_id, str):
-			print("Error: account descriptor is not a string")
-			sys.exit()
-		
-		# construct block desciptor for web3
-		account_id_web3 = account_id
-		if (account_id == "0x0"):
-			account_id_web3 = '0xa'
-		else:
-			account_id_web3 = self.w3.toChecksumAddress(account_id)
-
-		ac = ccql_data.Account()
-		ac_desc = ccql_data.AccountDescriptor()
-
-		ac.id = account_id
-
-		as_eth = ccql_data.Asset()
-		as_type = ccql_data.AssetType()
-
-		as_type.id = 1
-		as_type.typeName = "Ether"
-		as_type.unit = "ETH"
-
-		as_eth.id = 1
-		as_eth.assetType = as_type
-
-		# Balance returned in 10^⁻18
-		web3_balance = self.w3.eth.getBalance(account_id_web3)
-		as_eth.balance = web3_balance * pow(10, -18)
-
-		ac.accountDescriptor = ac_desc
-		ac.assets.append(as_eth)
-
-		return ac
-
-
-	def get_accounts(self, account_id_list):
-		accounts = []
-		for account_id in account_id_list:
-			accounts.append(self.get_account(account_id))
-		return accounts
-
-
-	def get_contract(self, address, abi):
-
-		self.contract = None
-		self.contract = self.w3.eth.contract(address=address, abi=abi)
-
-		if self.contract is None:
-			print("Contract not found, abort")
-			sys.exit()
-			
-		return self.contract
-
-	def call_contract(self, address, abi, function, parameters):
-		
-		self.get_contract()
-			
-		contract = self.get_attestation_contract()
-
-		#merkle_root_bytes32 = data_coding.encode_binary_bytes32(merkle_root)
-		#merkle_root_prime_bytes32 = data_coding.encode_binary_bytes32(merkle_root)
-
-		# receipt = contract.functions.function(parameters).call()
-		
-		return None
-
-	def get_current_gas_price(self):
-		gas_price_api = "https://www.etherchain.org/api/gasPriceOracle"
-		r = requests.get(gas_price_api).json()
-		gas_price = Web3.toWei(r.fastest, 'gwei')
-
-		if gas_price > 100000000000:
-			print("Gas price exceeds 100 Gwei, abort")
-			sys.exit()
-
-		return gas_price
-
-	def get_transaction_info(self):
-		nonce = self.w3.eth.getTransactionCount(self.ci_account_address)
-		#block = self.w3.eth.getBlock("latest")
-
-		gas_price = self.get_current_gas_price()
-		gas_limit = 300000
-
-		tx = {
-				"from": self.ci_account_address,
-				"value": 0,
-				'chainId': 1,
-				'nonce': nonce,
-				'gas': gas_limit,
-				'gasPrice': gas_price
-		}
-
-		print("Gas limit:", gas_limit)
-		print("Gas price:", gas_price)
-
-		return tx
-
-	def send_transaction(self, tx):
-		tx_hash = ""
-		pk_b = self.ci_account_privatekey
-		signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=pk_b)
-		print(signed_tx)
-		#signed_tx.r / s / v
-		tx_hash = self.w3.eth.sendRawTransaction(signed_tx.rawTransaction)
-		
-		receipt = self.w3.eth.waitForTransactionReceipt(tx_hash)
-
-		return receipt #tx_hash
+import os
+import subprocess
+import sys
+import binascii
+import requests
+import json
+from web3 import Web3
+
+from . import ccql_data
+from . import rpc_batch
+from . import rpc_pool
+from . import rpc_scheduler
+from . import rpc_replay
+from . import query_profile
+from . import metrics
+
+# for proof-of-authority geth nodes, development
+from web3.middleware import geth_poa_middleware
+
+def get_fee_wei(raw_tx):
+	# fee of a transaction in wei, None without gas price
+	gas = int(raw_tx["gas"], 16)
+	if not raw_tx.get("maxFeePerGas") is None:
+		return (int(raw_tx["maxFeePerGas"], 16) - int(raw_tx["maxPriorityFeePerGas"], 16)) * gas
+	if not raw_tx.get("gasPrice") is None:
+		return int(raw_tx["gasPrice"], 16) * gas
+	return None
+
+def get_provider(endpoint, timeout, retries, hedged):
+	# requests are scheduled with retries, hedging and a concurrency limit, see module rpc_scheduler
+	if endpoint.startswith("ws"):
+		provider = Web3.WebsocketProvider(endpoint, websocket_timeout=timeout)
+	else:
+		provider = Web3.HTTPProvider(endpoint, request_kwargs={ "timeout": timeout })
+	return rpc_scheduler.Scheduled_Provider(provider, timeout, retries, hedged)
+
+def slice_transactions(transactions, limit, offset):
+	# transactions selected by the LIMIT and OFFSET clauses, all transactions without LIMIT
+	if limit is None:
+		return transactions[offset:]
+	return transactions[offset:offset+limit]
+
+
+class CCQL_Node:
+
+	# persistent cache of raw block and transaction payloads, see module block_cache
+	cache = None
+
+	# <blockchain>:<network>:<chain_descriptor> of the connection, label of metrics, see module metrics
+	chain_key = ""
+
+	# account used for signing, resolved on the first signing operation, see get_signing_account
+	ci_account_address = None
+	ci_account_privatekey = None
+
+	def __init__(self):
+		self.working_dir = "."
+
+	def get_signing_account(self):
+		# read-only queries do not decrypt the keystore, decrypted keys are kept by the identity provider
+		if self.ci_account_address is None:
+			import ccql_identity_provider
+			identity = ccql_identity_provider.CCQL_Identity_Provider().get_identity()
+			self.ci_account_address = Web3.toChecksumAddress(identity.address)
+			self.ci_account_privatekey = identity.privatekey
+		return (self.ci_account_address, self.ci_account_privatekey)
+
+	def run_node(self):
+		os.makedirs(self.working_dir, exist_ok=True)
+		os.chdir(self.working_dir)
+
+	def is_connected(self):
+		return False
+
+	def supports_concurrent_requests(self):
+		return False
+
+class Geth_Node(CCQL_Node):
+
+	GETH = "geth"
+	
+	GETH_DATADIR = "geth-data"
+	GETH_DATADIR_POA = "geth-data-poa"
+	
+	GETH_DATADIR_ANCIENT = "geth-data-ancient"
+	GETH_DATADIR_ANCIENT_POA = "geth-data-ancient-poa"
+
+	GETH_DAG_DIR = "geth-dag"
+
+	def __init__(self, working_dir):
+		super().__init__(working_dir)
+
+	def run_node(self, account_address, account_password_file):
+		super().run_node()
+		subprocess.run([self.GETH, "--datadir", self.GETH_DATADIR, "datadir.ancient", self.GETH_DATADIR_ANCIENT, "--ethash.dagdir", self.GETH_DAG_DIR, "--cache", 4000, "--syncmode", "full", "--ws", "--ws.api", "eth,net,web3"])
+	
+	def run_node_poa_development(self, account_address, account_password_file):
+		super().run_node()
+		subprocess.run([self.GETH, "--datadir", self.GETH_DATADIR_POA, "datadir.ancient", self.GETH_DATADIR_ANCIENT_POA, "--cache", 4000, "--syncmode", "full", "--rpccorsdomain", "*", "networkid", 55194, "--nodiscover", "--vmdebug"])
+		# --unlock "0xf7b13d6b33EC6492AfB9756205D1A9e58Bab70ee" -allow-insecure-unlock console
+
+class Web3_EVM_Node(CCQL_Node):
+
+	# nodes with the Ethereum JSON-RPC interface, chains differ in the configuration below
+	WEB3_ADDRESS = ""
+
+	# proof-of-authority chains require the geth PoA middleware
+	POA_MIDDLEWARE = False
+
+	# fees, values and balances are returned in 10^-UNIT_DECIMALS of FEE_UNIT
+	FEE_UNIT = "ETH"
+	UNIT_DECIMALS = 18
+	ASSET_TYPE_NAME = "Ether"
+
+	# blocks CONFIRMATION_DEPTH below the tip or below the block with FINALIZED_BLOCK_TAG are final,
+	# blocks near the tip are cached for TIP_CACHE_TTL seconds, chains with instant finality set a depth of 0
+	CONFIRMATION_DEPTH = 64
+	FINALIZED_BLOCK_TAG = None
+	TIP_CACHE_TTL = 2
+
+	# requests time out after REQUEST_TIMEOUT seconds and are retried REQUEST_RETRIES times,
+	# slow requests are duplicated with HEDGED_REQUESTS
+	REQUEST_TIMEOUT = rpc_scheduler.REQUEST_TIMEOUT
+	REQUEST_RETRIES = rpc_scheduler.REQUEST_RETRIES
+	HEDGED_REQUESTS = True
+
+	# JSON-RPC calls are recorded to RPC_RECORD_FILE or replayed from RPC_REPLAY_FILE without
+	# endpoints, with REPLAY_LATENCY seconds per request and REPLAY_CALL_LATENCY seconds per call
+	RPC_RECORD_FILE = None
+	RPC_REPLAY_FILE = None
+	REPLAY_LATENCY = 0
+	REPLAY_CALL_LATENCY = 0
+
+	def __init__(self, identity, endpoints=None, settings=None):
+		if len(identity) > 0 and identity != "0x0":
+			self.ci_account_address = Web3.toChecksumAddress(identity.address)
+			self.ci_account_privatekey = identity.privatekey
+
+		# endpoints and configuration of the chain registry replace the defaults of the class
+		if endpoints is None or len(endpoints) == 0:
+			endpoints = [self.WEB3_ADDRESS]
+		self.WEB3_ADDRESS = endpoints[0]
+		if not settings is None:
+			for (name, value) in settings.items():
+				if not name.isupper() or not hasattr(self, name):
+					print("Error: unknown node setting", name, "for", type(self).__name__)
+					sys.exit()
+				setattr(self, name, value)
+
+		# several endpoints, e.g. a local full node and backups, are pooled with failover
+		if not self.RPC_REPLAY_FILE is None:
+			provider = rpc_replay.Replay_Provider(self.RPC_REPLAY_FILE, self.REPLAY_LATENCY, self.REPLAY_CALL_LATENCY)
+		elif len(endpoints) > 1:
+			# pooled endpoints fail over at once, requests are retried by the pool, see rpc_pool.Pool_Provider
+			provider = rpc_pool.Pool_Provider([ (endpoint, self.get_provider(endpoint, 0)) for endpoint in endpoints ], self.REQUEST_RETRIES)
+		else:
+			provider = self.get_provider(self.WEB3_ADDRESS)
+
+		if not self.RPC_RECORD_FILE is None:
+			provider = rpc_replay.Recording_Provider(provider, self.RPC_RECORD_FILE)
+		
+		self.w3 = Web3(provider)
+
+		if self.POA_MIDDLEWARE:
+			self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+
+		# calls outside of batches, batches are instrumented by rpc_batch.RPC_Batch
+		self.w3.middleware_onion.add(metrics.get_rpc_middleware(self), "metrics")
+
+	def get_provider(self, endpoint, retries=None):
+		if retries is None:
+			retries = self.REQUEST_RETRIES
+		return get_provider(endpoint, self.REQUEST_TIMEOUT, retries, self.HEDGED_REQUESTS)
+
+	def is_connected(self):
+		return self.w3.isConnected()
+
+	def supports_concurrent_requests(self):
+		return rpc_batch.is_http_provider(self.w3.provider)
+
+	def parse_block_id(self, block_id):
+
+		# block_id must be numberic, >=0 for block height, <0 for block depth
+		if isinstance(block_id, int) or block_id.lstrip('-').isnumeric():
+			return int(block_id)
+
+		print("Error: block descriptor is not numeric")
+		sys.exit()
+
+	def get_block_id_web3(self, block_id, tip=None):
+		
+		# construct block id for web3
+		block_id_web3 = block_id
+		if (block_id == -1 and tip is None):
+			block_id_web3 = 'latest'
+		elif (block_id_web3 < 0):
+			if tip is None:
+				tip = self.w3.eth.blockNumber
+			block_id_web3 = tip + block_id + 1
+
+		return block_id_web3
+
+	def get_block(self, block_id, linked_block_desc, limit=None, offset=0, full_transactions=True, columnar_transactions=False):
+		
+		#print("block_id", block_id)
+
+		return self.get_blocks([block_id], linked_block_desc, limit, offset, full_transactions, columnar_transactions)[0]
+
+
+	def convert_block(self, raw_block, linked_block_desc, is_final, columnar_transactions=False):
+
+		block = ccql_data.Block()
+		block_desc = ccql_data.BlockDescriptor()
+		status = ccql_data.Status()
+		validationDesc = ccql_data.ValidationDescriptor()
+
+		block.id = raw_block["hash"]
+		block.validationDescriptor = validationDesc
+		block.validationDescriptor.proposer = []
+		block.validationDescriptor.creator = []
+		block.validationDescriptor.attestations = []
+		
+		block_desc.height = int(raw_block["number"], 16)
+		block_desc.timestamp = int(raw_block["timestamp"], 16)
+		block_desc.status = status
+		block.descriptor = block_desc
+
+		status.isFinal = is_final
+
+		block.linkedBlockDescriptor = linked_block_desc
+
+		accounts = {}
+
+		# transactions are kept as columns if only attributes of Transaction are queried, see ccql_data.TransactionColumns
+		transactions = self.convert_transaction_columns(raw_block["transactions"])
+
+		if columnar_transactions:
+			block.transactions = transactions
+			for addresses in zip(transactions.from_, transactions.to):
+				for address in addresses:
+					if not address in accounts:
+						addr = ccql_data.Address()
+						addr.id = address
+						accounts[address] = addr
+		else:
+			block.transactions = transactions.get_transactions()
+			for tx in block.transactions:
+				tx_desc = tx.descriptor[0]
+				for addr in tx_desc.from_ + tx_desc.to:
+					accounts[addr.id] = addr
+
+		for a in accounts.keys():
+			block.accounts.append(accounts[a])
+
+		return block
+
+
+	def get_blocks(self, block_id_list, linked_block_desc, limit=None, offset=0, full_transactions=True, columnar_transactions=False):
+
+		# all blocks are requested in JSON-RPC batches instead of one request per block
+		batch = rpc_batch.RPC_Batch(self.w3, chain_key=self.chain_key)
+
+		# blocks without transactions are requested with transaction hashes only
+		if limit == 0:
+			full_transactions = False
+		if not full_transactions:
+			limit = 0
+		block_id_list = [ self.parse_block_id(block_id) for block_id in block_id_list ]
+
+		# block depths are resolved against one tip for all blocks
+		(tip, final_height) = self.get_chain_tip(block_id_list)
+		block_id_web3_list = [ self.get_block_id_web3(block_id, tip) for block_id in block_id_list ]
+
+		# cached blocks are either final or near the tip and not expired
+		cached_blocks = {}
+		if not self.cache is None:
+			with query_profile.measure(query_profile.STAGE_CACHE):
+				cached_blocks = self.cache.get_blocks([ block_id_web3 for block_id_web3 in block_id_web3_list if isinstance(block_id_web3, int) ], full_transactions)
+			query_profile.add(query_profile.STAGE_CACHE, objects=len(cached_blocks))
+
+		for block_id_web3 in block_id_web3_list:
+			if not block_id_web3 in cached_blocks:
+				batch.add(rpc_batch.ETH_GET_BLOCK_BY_NUMBER, [rpc_batch.encode_block_id(block_id_web3), full_transactions])
+
+		# the finality of fetched blocks is determined within the same batch
+		if tip is None and len(batch.calls) > 0:
+			(tip_call, final_call) = self.add_chain_tip_calls(batch)
+
+		results = batch.execute()
+		if tip is None and len(results) > 0:
+			(tip, final_height) = self.read_chain_tip(results, tip_call, final_call)
+
+		raw_blocks = []
+		fetched_blocks = []
+		i = 0
+		for block_id_web3 in block_id_web3_list:
+			if block_id_web3 in cached_blocks:
+				raw_blocks.append(cached_blocks[block_id_web3])
+			else:
+				raw_block = results[i]
+				i += 1
+				if raw_block is None:
+					raw_blocks.append((None, False))
+				else:
+					raw_blocks.append((raw_block, int(raw_block["number"], 16) <= final_height))
+					fetched_blocks.append(raw_block)
+
+		if not self.cache is None:
+			with query_profile.measure(query_profile.STAGE_CACHE):
+				self.cache.put_blocks(fetched_blocks, full_transactions, final_height, self.TIP_CACHE_TTL)
+
+		# only the transactions selected by LIMIT and OFFSET are converted
+		blocks = []
+		with query_profile.measure(query_profile.STAGE_CONVERT):
+			for (raw_block, is_final) in raw_blocks:
+				if raw_block is None:
+					blocks.append(None)
+				else:
+					raw_block = dict(raw_block, transactions=slice_transactions(raw_block["transactions"], limit, offset))
+					blocks.append(self.convert_block(raw_block, linked_block_desc, is_final, columnar_transactions))
+
+		# blocks, transactions or rows of transaction columns, and accounts
+		if not query_profile.get_profile() is None:
+			query_profile.add(query_profile.STAGE_CONVERT, objects=sum(1 + len(block.transactions) + len(block.accounts) for block in blocks if not block is None))
+		return blocks
+
+
+	def get_chain_tip(self, block_id_list):
+
+		if not self.cache is None:
+			chain_tip = self.cache.get_tip(self.TIP_CACHE_TTL)
+			if not chain_tip is None:
+				return chain_tip
+
+		# the tip is requested in advance for block depths, 'latest' is requested directly
+		if not any(block_id < -1 for block_id in block_id_list) and not (len(block_id_list) > 1 and -1 in block_id_list):
+			return (None, None)
+
+		batch = rpc_batch.RPC_Batch(self.w3, chain_key=self.chain_key)
+		(tip_call, final_call) = self.add_chain_tip_calls(batch)
+		return self.read_chain_tip(batch.execute(), tip_call, final_call)
+
+	def add_chain_tip_calls(self, batch):
+		tip_call = batch.add(rpc_batch.ETH_BLOCK_NUMBER, [])
+		final_call = None
+		if not self.FINALIZED_BLOCK_TAG is None:
+			final_call = batch.add(rpc_batch.ETH_GET_BLOCK_BY_NUMBER, [self.FINALIZED_BLOCK_TAG, False], True)
+		return (tip_call, final_call)
+
+	def read_chain_tip(self, results, tip_call, final_call):
+
+		# blocks at CONFIRMATION_DEPTH or reported as finalized by the chain are final
+		tip = int(results[tip_call], 16)
+		final_height = tip - self.CONFIRMATION_DEPTH
+		if not final_call is None and not results[final_call] is None:
+			final_height = max(final_height, int(results[final_call]["number"], 16))
+
+		if not self.cache is None:
+			self.cache.put_tip(tip, final_height)
+
+		return (tip, final_height)
+
+
+	def get_transaction_id_web3(self, transaction_id):
+
+		if not isinstance(transaction_id, str):
+			print("Error: transaction descriptor is not a string")
+			sys.exit()
+		
+		# construct block desciptor for web3
+		transaction_id_web3 = transaction_id
+		if (transaction_id == "0x0"):
+			transaction_id_web3 = '0xa'
+
+		return transaction_id_web3
+
+	def get_transaction(self, transaction_id):
+
+		return self.get_transactions([transaction_id])[0]
+
+
+	def convert_transactions(self, raw_transactions):
+		return self.convert_transaction_columns(raw_transactions).get_transactions()
+
+	def convert_transaction_columns(self, raw_transactions):
+
+		# transactions are converted in bulk from JSON-RPC results without web3 result formatting,
+		# fees and values are kept in wei and converted into FEE_UNIT for output only
+		# addresses are checksummed once per list, as by web3
+		checksum_addresses = { None: None }
+		for raw_tx in raw_transactions:
+			for address in (raw_tx["from"], raw_tx["to"]):
+				if not address in checksum_addresses:
+					checksum_addresses[address] = Web3.toChecksumAddress(address)
+
+		transactions = ccql_data.TransactionColumns()
+		transactions.id = [ raw_tx["hash"] for raw_tx in raw_transactions ]
+		transactions.fee_wei = [ get_fee_wei(raw_tx) for raw_tx in raw_transactions ]
+		transactions.value_wei = [ int(raw_tx["value"], 16) for raw_tx in raw_transactions ]
+		transactions.from_ = [ checksum_addresses[raw_tx["from"]] for raw_tx in raw_transactions ]
+		transactions.to = [ checksum_addresses[raw_tx["to"]] for raw_tx in raw_transactions ]
+		transactions.data = [ raw_tx["input"] for raw_tx in raw_transactions ]
+		transactions.unit = self.FEE_UNIT
+		transactions.decimals = self.UNIT_DECIMALS
+
+		return transactions
+
+
+	def get_transactions(self, transaction_id_list):
+
+		batch = rpc_batch.RPC_Batch(self.w3, chain_key=self.chain_key)
+		transaction_id_web3_list = [ self.get_transaction_id_web3(transaction_id) for transaction_id in transaction_id_list ]
+
+		cached_transactions = {}
+		if not self.cache is None:
+			cached_transactions = self.cache.get_transactions(transaction_id_web3_list)
+
+		for transaction_id_web3 in transaction_id_web3_list:
+			if not transaction_id_web3 in cached_transactions:
+				batch.add(rpc_batch.ETH_GET_TRANSACTION_BY_HASH, [transaction_id_web3])
+
+		# fetched transactions are final with their block, the tip is requested within the same batch
+		(tip, final_height) = (None, None)
+		if not self.cache is None and len(batch.calls) > 0:
+			(tip, final_height) = self.get_chain_tip([])
+			if tip is None:
+				(tip_call, final_call) = self.add_chain_tip_calls(batch)
+
+		results = batch.execute()
+		if not self.cache is None and tip is None and len(results) > 0:
+			(tip, final_height) = self.read_chain_tip(results, tip_call, final_call)
+		results = iter(results)
+		raw_transactions = []
+		for transaction_id_web3 in transaction_id_web3_list:
+			if transaction_id_web3 in cached_transactions:
+				raw_transactions.append(cached_transactions[transaction_id_web3])
+			else:
+				raw_transactions.append(next(results))
+
+		# pending transactions are not cached
+		if not self.cache is None and not final_height is None:
+			self.cache.put_transactions([ raw_tx for raw_tx in raw_transactions if not raw_tx is None and not raw_tx.get("blockNumber") is None and not raw_tx["hash"] in cached_transactions ], final_height, self.TIP_CACHE_TTL)
+
+		with query_profile.measure(query_profile.STAGE_CONVERT):
+			converted_transactions = self.convert_transactions([ raw_tx for raw_tx in raw_transactions if not raw_tx is None ])
+		query_profile.add(query_profile.STAGE_CONVERT, objects=len(converted_transactions))
+		converted_transactions = iter(converted_transactions)
+		transactions = []
+		for raw_tx in raw_transactions:
+			if raw_tx is None:
+				transactions.append(None)
+			else:
+				transactions.append(next(converted_transactions))
+		return transactions
+
+
+	def get_account_id_web3(self, account_id):
+
+		if not isinstance(account_id, str):
+			print("Error: account descriptor is not a string")
+			sys.exit()
+		
+		# construct block desciptor for web3
+		account_id_web3 = account_id
+		if (account_id == "0x0"):
+			account_id_web3 = '0xa'
+		else:
+			account_id_web3 = self.w3.toChecksumAddress(account_id)
+
+		return account_id_web3
+
+	def get_account(self, account_id):
+
+		return self.get_accounts([account_id])[0]
+
+
+	def convert_account(self, account_id, web3_balance):
+
+		ac = ccql_data.Account()
+		ac_desc = ccql_data.AccountDescriptor()
+
+		ac.id = account_id
+
+		# the native asset of the chain only
+		as_native = ccql_data.Asset()
+		as_type = ccql_data.AssetType()
+
+		as_type.id = 1
+		as_type.typeName = self.ASSET_TYPE_NAME
+		as_type.unit = self.FEE_UNIT
+
+		as_native.id = 1
+		as_native.assetType = as_type
+
+		# balance returned in 10^-UNIT_DECIMALS
+		as_native.balance = web3_balance / 10**self.UNIT_DECIMALS
+
+		ac.accountDescriptor = ac_desc
+		ac.assets.append(as_native)
+
+		return ac
+
+
+	def get_accounts(self, account_id_list):
+
+		batch = rpc_batch.RPC_Batch(self.w3, chain_key=self.chain_key)
+		for account_id in account_id_list:
+			batch.add(rpc_batch.ETH_GET_BALANCE, [self.get_account_id_web3(account_id), 'latest'])
+
+		accounts = []
+		results = batch.execute()
+		with query_profile.measure(query_profile.STAGE_CONVERT):
+			for account_id, result in zip(account_id_list, results):
+				web3_balance = rpc_batch.format_result(rpc_batch.ETH_GET_BALANCE, result)
+				accounts.append(self.convert_account(account_id, web3_balance))
+		query_profile.add(query_profile.STAGE_CONVERT, objects=len(accounts))
+		return accounts
+
+
+	def get_contract(self, address, abi):
+
+		self.contract = None
+		self.contract = self.w3.eth.contract(address=address, abi=abi)
+
+		if self.contract is None:
+			print("Contract not found, abort")
+			sys.exit()
+			
+		return self.contract
+
+	def call_contract(self, address, abi, function, parameters):
+		
+		self.get_contract()
+			
+		contract = self.get_attestation_contract()
+
+		#merkle_root_bytes32 = data_coding.encode_binary_bytes32(merkle_root)
+		#merkle_root_prime_bytes32 = data_coding.encode_binary_bytes32(merkle_root)
+
+		# receipt = contract.functions.function(parameters).call()
+		
+		return None
+
+	def get_current_gas_price(self):
+		gas_price_api = "https://www.etherchain.org/api/gasPriceOracle"
+		r = requests.get(gas_price_api).json()
+		gas_price = Web3.toWei(r.fastest, 'gwei')
+
+		if gas_price > 100000000000:
+			print("Gas price exceeds 100 Gwei, abort")
+			sys.exit()
+
+		return gas_price
+
+	def get_transaction_info(self):
+		(account_address, account_privatekey) = self.get_signing_account()
+		nonce = self.w3.eth.getTransactionCount(account_address)
+		#block = self.w3.eth.getBlock("latest")
+
+		gas_price = self.get_current_gas_price()
+		gas_limit = 300000
+
+		tx = {
+				"from": account_address,
+				"value": 0,
+				'chainId': 1,
+				'nonce': nonce,
+				'gas': gas_limit,
+				'gasPrice': gas_price
+		}
+
+		print("Gas limit:", gas_limit)
+		print("Gas price:", gas_price)
+
+		return tx
+
+	def send_transaction(self, tx):
+		tx_hash = ""
+		(account_address, pk_b) = self.get_signing_account()
+		signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=pk_b)
+		print(signed_tx)
+		#signed_tx.r / s / v
+		tx_hash = self.w3.eth.sendRawTransaction(signed_tx.rawTransaction)
+		
+		receipt = self.w3.eth.waitForTransactionReceipt(tx_hash)
+
+		return receipt #tx_hash
+
+
+class Web3_Avalanche_Node(Web3_EVM_Node):
+
+	WEB3_ADDRESS = "https://api.avax.network/ext/bc/C/rpc"
+
+	POA_MIDDLEWARE = True
+
+	# Avalanche supports the "AVAX/AVAX" asset only
+	FEE_UNIT = "AVAX"
+	ASSET_TYPE_NAME = "AVAX"
+
+	# accepted blocks are final on the C-Chain
+	CONFIRMATION_DEPTH = 0
+	FINALIZED_BLOCK_TAG = None
+	TIP_CACHE_TTL = 2
+
+
+class Cardano_Node(Web3_EVM_Node):
+
+	WEB3_ADDRESS = ""
+
+	FEE_UNIT = "ADA"
+	ASSET_TYPE_NAME = "ADA"
+
+
+class Bitcoin_Node(Web3_EVM_Node):
+
+	WEB3_ADDRESS = ""
+
+	FEE_UNIT = "BTC"
+	ASSET_TYPE_NAME = "Bitcoin"
+
+
+class Web3_Eth_Node(Web3_EVM_Node):
+
+	WEB3_ADDRESS = "wss://mainnet.infura.io/ws/v3/5cc53e4f3f614825be68d6aae4897cf4"
+
+	FEE_UNIT = "ETH"
+	ASSET_TYPE_NAME = "Ether"
+
+	# blocks CONFIRMATION_DEPTH (two epochs) below the tip or below the finalized checkpoint are final
+	CONFIRMATION_DEPTH = 64
+	FINALIZED_BLOCK_TAG = "finalized"
+	TIP_CACHE_TTL = 12
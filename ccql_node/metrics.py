@@ -0,0 +1,369 @@
+import os
+import sys
+import time
+import json
+import bisect
+import atexit
+import threading
+import contextlib
+import contextvars
+
+# upper bounds of latency histograms in seconds
+LATENCY_BUCKETS = [ 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10 ]
+
+# seconds between exports of the Prometheus text file and to the OTLP collector
+EXPORT_INTERVAL = 10
+
+# exporters, see get_exporter
+EXPORTER_HISTOGRAMS = "histograms"
+EXPORTER_PROMETHEUS = "prometheus"
+EXPORTER_OTLP = "otlp"
+
+OTLP_ENDPOINT = "http://localhost:4318"
+SERVICE_NAME = "ccql"
+
+
+class Histogram:
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_quantile(self, q):
+        # upper bound of the bucket of the quantile, the largest bound for values beyond
+        rank = q * self.count
+        n = 0
+        for (bound, count) in zip(self.buckets, self.counts):
+            n += count
+            if n >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.sum = self.sum
+        histogram.count = self.count
+        return histogram
+
+
+class Metrics_Registry:
+
+    # counters and histograms by name and labels, labels are sorted (name, value) tuples
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.start = time.time_ns()
+        self.lock = threading.Lock()
+
+    def add(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if not key in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    def get_counters(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def get_histograms(self):
+        with self.lock:
+            return { key: histogram.copy() for (key, histogram) in self.histograms.items() }
+
+
+class Span:
+
+    # a traced operation, child spans share the trace of their parent
+    def __init__(self, name, attributes, parent):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = None
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+        self.start = time.time_ns()
+        self.end = None
+        self.error = False
+
+
+registry = Metrics_Registry()
+exporters = []
+current_span = contextvars.ContextVar("metrics_span", default=None)
+
+
+def is_enabled():
+    return len(exporters) > 0
+
+
+def add(name, value=1, **labels):
+    if len(exporters) > 0:
+        registry.add(name, value, labels)
+
+
+def observe(name, value, **labels):
+    if len(exporters) > 0:
+        registry.observe(name, value, labels)
+
+
+@contextlib.contextmanager
+def span(name, **labels):
+
+    # duration in the histogram <name>_seconds, errors in the counter <name>_errors_total,
+    # without exporters only the list of exporters is read
+    if len(exporters) == 0:
+        yield None
+        return
+
+    s = Span(name, labels, current_span.get())
+    token = current_span.set(s)
+    start = time.perf_counter()
+    try:
+        yield s
+    except BaseException:
+        s.error = True
+        registry.add(name + "_errors_total", 1, labels)
+        raise
+    finally:
+        current_span.reset(token)
+        s.end = time.time_ns()
+        registry.observe(name + "_seconds", time.perf_counter() - start, labels)
+        for exporter in exporters:
+            exporter.export_span(s)
+
+
+def get_rpc_middleware(node):
+
+    # web3 middleware for calls of the node outside of batches, see rpc_batch.RPC_Batch
+    def rpc_middleware(make_request, w3):
+        def middleware(method, params):
+            with span("ccql_rpc_request", chain=node.chain_key, method=method):
+                response = make_request(method, params)
+            add("ccql_rpc_calls_total", chain=node.chain_key, method=method)
+            if "error" in response:
+                add("ccql_rpc_errors_total", chain=node.chain_key, method=method)
+            return response
+        return middleware
+
+    return rpc_middleware
+
+
+class Exporter:
+
+    def export_span(self, s):
+        pass
+
+    def export(self):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.export()
+
+
+class Periodic_Exporter(Exporter):
+
+    def __init__(self, interval=EXPORT_INTERVAL):
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.export()
+
+    def stop(self):
+        self.stopped.set()
+        self.export()
+
+
+class Histogram_Exporter(Exporter):
+
+    # in-process histograms, summarized on stderr at exit, structured results are written to stdout
+    def export(self):
+
+        lines = []
+        for ((name, labels), value) in sorted(registry.get_counters().items()):
+            lines.append("%s%s %d" % (name, format_labels(labels), value))
+        for ((name, labels), histogram) in sorted(registry.get_histograms().items(), key=lambda item: item[0]):
+            lines.append("%s%s count %d, mean %.4f s, p50 <= %s s, p95 <= %s s, p99 <= %s s" % (name, format_labels(labels),
+                histogram.count, histogram.sum / histogram.count, histogram.get_quantile(0.5), histogram.get_quantile(0.95), histogram.get_quantile(0.99)))
+
+        if len(lines) > 0:
+            print("\nMetrics:\n\n" + "\n".join(lines) + "\n", file=sys.stderr)
+
+
+class Prometheus_Exporter(Periodic_Exporter):
+
+    # text exposition format, e.g. for the textfile collector of the node exporter
+    def __init__(self, path, interval=EXPORT_INTERVAL):
+        super().__init__(interval)
+        self.path = path
+
+    def export(self):
+
+        # the file is replaced at once, scrapers do not read partial files
+        with open(self.path + ".tmp", "w") as file:
+            file.write(get_prometheus_text())
+        os.replace(self.path + ".tmp", self.path)
+
+
+class OTLP_Exporter(Periodic_Exporter):
+
+    # spans and metrics in the OTLP/HTTP JSON encoding to a collector, e.g. the OpenTelemetry collector
+    def __init__(self, endpoint=OTLP_ENDPOINT, interval=EXPORT_INTERVAL):
+        super().__init__(interval)
+        self.endpoint = endpoint.rstrip("/")
+        self.spans = []
+        self.lock = threading.Lock()
+        self.failed = False
+
+    def export_span(self, s):
+        with self.lock:
+            self.spans.append(s)
+
+    def export(self):
+
+        with self.lock:
+            spans = self.spans
+            self.spans = []
+
+        resource = { "attributes": get_otlp_attributes({ "service.name": SERVICE_NAME }) }
+        scope = { "name": SERVICE_NAME }
+
+        if len(spans) > 0:
+            self.post("/v1/traces", { "resourceSpans": [ { "resource": resource, "scopeSpans": [ { "scope": scope, "spans": [ get_otlp_span(s) for s in spans ] } ] } ] })
+
+        metrics = get_otlp_metrics()
+        if len(metrics) > 0:
+            self.post("/v1/metrics", { "resourceMetrics": [ { "resource": resource, "scopeMetrics": [ { "scope": scope, "metrics": metrics } ] } ] })
+
+    def post(self, path, payload):
+
+        # an unavailable collector is reported once and does not affect queries
+        import requests
+        try:
+            response = requests.post(self.endpoint + path, data=json.dumps(payload), headers={ "Content-Type": "application/json" }, timeout=5)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if not self.failed:
+                print("Error: metrics not exported to", self.endpoint + path + ":", e, file=sys.stderr)
+                self.failed = True
+
+
+def format_labels(labels):
+    if len(labels) == 0:
+        return ""
+    return "{" + ",".join('%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for (name, value) in labels) + "}"
+
+
+def get_prometheus_text():
+
+    # counters and cumulative histograms in the Prometheus text exposition format
+    lines = []
+    counters = sorted(registry.get_counters().items())
+    for name in sorted(set(name for ((name, labels), value) in counters)):
+        lines.append("# TYPE " + name + " counter")
+        lines.extend("%s%s %d" % (name, format_labels(labels), value) for ((n, labels), value) in counters if n == name)
+
+    histograms = sorted(registry.get_histograms().items(), key=lambda item: item[0])
+    for name in sorted(set(name for ((name, labels), histogram) in histograms)):
+        lines.append("# TYPE " + name + " histogram")
+        for ((n, labels), histogram) in histograms:
+            if n != name:
+                continue
+            n_le = 0
+            for (bound, count) in zip(histogram.buckets + ["+Inf"], histogram.counts):
+                n_le += count
+                lines.append("%s_bucket%s %d" % (name, format_labels(labels + (("le", str(bound)),)), n_le))
+            lines.append("%s_sum%s %s" % (name, format_labels(labels), repr(histogram.sum)))
+            lines.append("%s_count%s %d" % (name, format_labels(labels), histogram.count))
+
+    return "\n".join(lines) + "\n"
+
+
+def get_otlp_attributes(labels):
+    return [ { "key": name, "value": { "stringValue": str(value) } } for (name, value) in dict(labels).items() ]
+
+
+def get_otlp_span(s):
+    otlp_span = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 1,
+        "startTimeUnixNano": str(s.start),
+        "endTimeUnixNano": str(s.end),
+        "attributes": get_otlp_attributes(s.attributes),
+        "status": { "code": 2 if s.error else 1 }
+    }
+    if not s.parent_id is None:
+        otlp_span["parentSpanId"] = s.parent_id
+    return otlp_span
+
+
+def get_otlp_metrics():
+
+    # cumulative sums and histograms since the start of the process
+    start = str(registry.start)
+    now = str(time.time_ns())
+    metrics = {}
+
+    for ((name, labels), value) in sorted(registry.get_counters().items()):
+        data_points = metrics.setdefault(name, { "name": name, "sum": { "dataPoints": [], "aggregationTemporality": 2, "isMonotonic": True } })["sum"]["dataPoints"]
+        data_points.append({ "attributes": get_otlp_attributes(labels), "asInt": str(value), "startTimeUnixNano": start, "timeUnixNano": now })
+
+    for ((name, labels), histogram) in sorted(registry.get_histograms().items(), key=lambda item: item[0]):
+        data_points = metrics.setdefault(name, { "name": name, "unit": "s", "histogram": { "dataPoints": [], "aggregationTemporality": 2 } })["histogram"]["dataPoints"]
+        data_points.append({ "attributes": get_otlp_attributes(labels), "count": str(histogram.count), "sum": histogram.sum,
+            "bucketCounts": [ str(count) for count in histogram.counts ], "explicitBounds": histogram.buckets, "startTimeUnixNano": start, "timeUnixNano": now })
+
+    return list(metrics.values())
+
+
+def get_exporter(exporter_spec):
+
+    # histograms, prometheus:<file>, otlp or otlp:<collector url>
+    (name, separator, argument) = exporter_spec.partition(":")
+    if name == EXPORTER_HISTOGRAMS:
+        return Histogram_Exporter()
+    if name == EXPORTER_PROMETHEUS and len(argument) > 0:
+        return Prometheus_Exporter(argument)
+    if name == EXPORTER_OTLP:
+        return OTLP_Exporter(argument if len(argument) > 0 else OTLP_ENDPOINT)
+
+    print("Error: metrics exporter", exporter_spec, "not in", [EXPORTER_HISTOGRAMS, EXPORTER_PROMETHEUS + ":<file>", EXPORTER_OTLP + "[:<url>]"])
+    sys.exit()
+
+
+def add_exporter(exporter):
+
+    # exporters are started with the first and stopped at exit of the process
+    if len(exporters) == 0:
+        atexit.register(stop_exporters)
+    exporters.append(exporter)
+    exporter.start()
+
+
+def stop_exporters():
+    for exporter in exporters:
+        exporter.stop()
@@ -0,0 +1,86 @@
+import time
+import threading
+import contextlib
+import contextvars
+
+from . import metrics
+
+# stages of a query in the order of processing
+STAGE_PARSE = "parse"
+STAGE_PLAN = "plan"
+STAGE_CONNECT = "connect"
+STAGE_CACHE = "cache"
+STAGE_RPC = "rpc"
+STAGE_CONVERT = "convert"
+STAGE_FLATTEN = "flatten"
+STAGE_FILTER = "filter"
+STAGE_MAP = "map"
+STAGE_JOIN = "join"
+STAGE_OUTPUT = "output"
+STAGES = [ STAGE_PARSE, STAGE_PLAN, STAGE_CONNECT, STAGE_CACHE, STAGE_RPC, STAGE_CONVERT, STAGE_FLATTEN, STAGE_FILTER, STAGE_MAP, STAGE_JOIN, STAGE_OUTPUT ]
+
+# counters per stage: wall time in seconds and number of runs of the stage, JSON-RPC requests,
+# calls and bytes of responses, data model objects created or passed on, and rows produced
+COUNTERS = [ "time", "runs", "rpc_requests", "rpc_calls", "bytes", "objects", "rows" ]
+
+# profile of the running query, copied into the threads of its sources
+current_profile = contextvars.ContextVar("query_profile", default=None)
+
+
+class Query_Profile:
+
+    def __init__(self):
+        self.stages = { stage: dict.fromkeys(COUNTERS, 0) for stage in STAGES }
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def add(self, stage, **counters):
+        with self.lock:
+            for (name, value) in counters.items():
+                self.stages[stage][name] += value
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.start
+
+    def get_lines(self):
+
+        # stages of concurrent threads overlap, e.g. requests of further blocks while blocks are mapped
+        lines = [ "Execution time: %.3f s, stage times summed over threads" % self.duration ]
+        lines.append("%-8s %10s %6s %8s %8s %12s %10s %10s" % ("Stage", "Time (s)", "Runs", "Requests", "Calls", "Bytes", "Objects", "Rows"))
+        for (stage, counters) in self.stages.items():
+            if counters["runs"] == 0:
+                continue
+            lines.append("%-8s %10.3f %6d %8d %8d %12d %10d %10d" % (stage, counters["time"], counters["runs"], counters["rpc_requests"],
+                counters["rpc_calls"], counters["bytes"], counters["objects"], counters["rows"]))
+        return lines
+
+
+def get_profile():
+    return current_profile.get()
+
+
+def add(stage, **counters):
+    profile = current_profile.get()
+    if not profile is None:
+        profile.add(stage, **counters)
+
+
+@contextlib.contextmanager
+def measure(stage):
+
+    # wall time of a stage for the profile and the histogram ccql_query_stage_seconds, without a
+    # profile and metrics only the context variable is read
+    profile = current_profile.get()
+    if profile is None and not metrics.is_enabled():
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        if not profile is None:
+            profile.add(stage, time=duration, runs=1)
+        metrics.observe("ccql_query_stage_seconds", duration, stage=stage)
@@ -0,0 +1,153 @@
+import sys
+import json
+import asyncio
+
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from web3._utils.request import make_post_request
+from web3._utils.method_formatters import PYTHONIC_RESULT_FORMATTERS
+
+from . import query_profile
+from . import metrics
+
+# maximum number of calls sent in one JSON-RPC batch request
+BATCH_SIZE = 100
+
+# JSON-RPC methods
+ETH_BLOCK_NUMBER = "eth_blockNumber"
+ETH_GET_BLOCK_BY_NUMBER = "eth_getBlockByNumber"
+ETH_GET_TRANSACTION_BY_HASH = "eth_getTransactionByHash"
+ETH_GET_BALANCE = "eth_getBalance"
+
+
+def encode_block_id(block_id_web3):
+    if isinstance(block_id_web3, int):
+        return hex(block_id_web3)
+    return block_id_web3
+
+
+def is_http_provider(provider):
+    # HTTP requests can be sent from several threads, a websocket connection is not shared
+    if hasattr(provider, "concurrent"):
+        # providers without a connection, see rpc_replay
+        return provider.concurrent
+    if hasattr(provider, "providers"):
+        # pools of endpoints, see rpc_pool
+        return all(is_http_provider(p) for p in provider.providers)
+    return isinstance(provider, Web3.HTTPProvider)
+
+
+def is_rate_limited(response):
+    # rate limits are reported as JSON-RPC errors by some providers, other errors are results of the request
+    error = response.get("error") if isinstance(response, dict) else None
+    return isinstance(error, dict) and (error.get("code") == 429 or "rate limit" in str(error.get("message", "")).lower())
+
+
+def is_valid_response(response):
+    return not is_rate_limited(response)
+
+
+def is_valid_batch_response(responses):
+    return isinstance(responses, list) and not any(is_rate_limited(response) for response in responses)
+
+
+def format_result(method, result):
+
+    # convert a raw JSON-RPC result into the web3 representation, e.g. hex to int
+    if result is None:
+        return None
+    if method in PYTHONIC_RESULT_FORMATTERS:
+        result = PYTHONIC_RESULT_FORMATTERS[method](result)
+    return AttributeDict.recursive(result)
+
+
+def send_batch(provider, rpc_requests):
+
+    if hasattr(provider, "make_batch_request"):
+        # providers routing a batch to one of several endpoints, see rpc_pool
+        return provider.make_batch_request(rpc_requests)
+
+    if isinstance(provider, Web3.HTTPProvider):
+        request_data = json.dumps(rpc_requests).encode("utf-8")
+        response = make_post_request(provider.endpoint_uri, request_data, **dict(provider.get_request_kwargs()))
+        return json.loads(response)
+
+    if isinstance(provider, Web3.WebsocketProvider):
+        # a batch is sent as one message and answered with one message
+        request_data = json.dumps(rpc_requests).encode("utf-8")
+        future = asyncio.run_coroutine_threadsafe(provider.coro_make_request(request_data), type(provider)._loop)
+        return future.result()
+
+    # providers without batch support: one request per call
+    responses = []
+    for rpc_request in rpc_requests:
+        response = dict(provider.make_request(rpc_request["method"], rpc_request["params"]))
+        response["id"] = rpc_request["id"]
+        responses.append(response)
+    return responses
+
+
+class RPC_Batch:
+
+    def __init__(self, w3, batch_size=BATCH_SIZE, chain_key=""):
+        self.w3 = w3
+        self.batch_size = batch_size
+        self.chain_key = chain_key
+        self.calls = []
+
+    def add(self, method, params, optional=False):
+        # errors of optional calls, e.g. unsupported block tags, result in None
+        self.calls.append((method, params, optional))
+        return len(self.calls) - 1
+
+    def execute(self):
+
+        # raw results in the order of the added calls, one round trip per batch_size calls
+        results = []
+
+        for start in range(0, len(self.calls), self.batch_size):
+
+            rpc_requests = []
+            optional_ids = set()
+            for i, (method, params, optional) in enumerate(self.calls[start:start+self.batch_size]):
+                rpc_requests.append({ "jsonrpc": "2.0", "method": method, "params": params, "id": start + i })
+                if optional:
+                    optional_ids.add(start + i)
+
+            # batches are labeled by their first method, calls and errors by their own method
+            with query_profile.measure(query_profile.STAGE_RPC), metrics.span("ccql_rpc_request", chain=self.chain_key, method=rpc_requests[0]["method"]):
+                responses = send_batch(self.w3.provider, rpc_requests)
+            if metrics.is_enabled():
+                self.add_metrics(rpc_requests, responses)
+
+            # the size of responses is only determined for EXPLAIN ANALYZE
+            if not query_profile.get_profile() is None:
+                query_profile.add(query_profile.STAGE_RPC, rpc_requests=1, rpc_calls=len(rpc_requests), bytes=len(json.dumps(responses)))
+
+            if not isinstance(responses, list):
+                print("Error: JSON-RPC batch request failed:", responses)
+                sys.exit()
+
+            results_by_id = {}
+            for response in responses:
+                if "error" in response and not response.get("id") in optional_ids:
+                    print("Error: JSON-RPC request failed:", response["error"])
+                    sys.exit()
+                results_by_id[response["id"]] = response.get("result")
+
+            for rpc_request in rpc_requests:
+                results.append(results_by_id.get(rpc_request["id"]))
+
+        self.calls = []
+        return results
+
+    def add_metrics(self, rpc_requests, responses):
+        methods = { rpc_request["id"]: rpc_request["method"] for rpc_request in rpc_requests }
+        for method in methods.values():
+            metrics.add("ccql_rpc_calls_total", chain=self.chain_key, method=method)
+        if isinstance(responses, list):
+            for response in responses:
+                if "error" in response:
+                    metrics.add("ccql_rpc_errors_total", chain=self.chain_key, method=methods.get(response.get("id"), ""))
+        else:
+            metrics.add("ccql_rpc_errors_total", chain=self.chain_key, method=rpc_requests[0]["method"])
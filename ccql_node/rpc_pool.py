@@ -0,0 +1,155 @@
+import time
+import random
+import threading
+import concurrent.futures
+
+from web3.providers.base import BaseProvider
+
+from . import rpc_batch
+from . import rpc_scheduler
+
+# seconds between health and latency probes of all endpoints of a pool
+HEALTH_CHECK_INTERVAL = 10
+
+# weight of the latest request in the smoothed latency of an endpoint
+LATENCY_SMOOTHING = 0.2
+
+# endpoints more than MAX_BLOCK_LAG blocks behind the highest tip of the pool are not healthy
+MAX_BLOCK_LAG = 5
+
+
+class Pool_Endpoint:
+
+    def __init__(self, uri, provider):
+        self.uri = uri
+        self.provider = provider
+        self.healthy = True
+        self.latency = 0.
+        self.tip = None
+        self.n_requests = 0
+        self.n_errors = 0
+        self.lock = threading.Lock()
+
+    def record_success(self, duration):
+        with self.lock:
+            if self.n_requests == 0:
+                self.latency = duration
+            else:
+                self.latency += LATENCY_SMOOTHING * (duration - self.latency)
+            self.n_requests += 1
+            self.healthy = True
+
+    def record_error(self):
+        with self.lock:
+            self.n_requests += 1
+            self.n_errors += 1
+            self.healthy = False
+
+
+class Pool_Provider(BaseProvider):
+
+    # endpoints of one chain, e.g. a local full node and backups: each request is sent to the healthiest
+    # endpoint with the lowest latency and to the next endpoint on errors, endpoints do not retry themselves,
+    # all endpoints are tried again up to retries times
+    def __init__(self, endpoints, retries=rpc_scheduler.REQUEST_RETRIES, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.endpoints = [ Pool_Endpoint(uri, provider) for (uri, provider) in endpoints ]
+        self.providers = [ endpoint.provider for endpoint in self.endpoints ]
+        self.retries = retries
+        self.health_check_interval = health_check_interval
+        self.health_check_thread = None
+        self.lock = threading.Lock()
+
+    def get_endpoints(self):
+        # healthy endpoints first, by latency, endpoints of equal latency in the order given
+        return sorted(self.endpoints, key=lambda endpoint: (not endpoint.healthy, endpoint.latency))
+
+    def send(self, request, is_valid):
+
+        response = None
+        for retry in range(self.retries + 1):
+            if retry > 0:
+                time.sleep(random.uniform(0, min(rpc_scheduler.RETRY_BACKOFF_MAX, rpc_scheduler.RETRY_BACKOFF * 2**(retry - 1))))
+            for endpoint in self.get_endpoints():
+                start = time.monotonic()
+                try:
+                    response = request(endpoint.provider)
+                except Exception as e:
+                    print("Endpoint", endpoint.uri, "failed:", repr(e))
+                    endpoint.record_error()
+                    continue
+                if not is_valid(response):
+                    endpoint.record_error()
+                    continue
+                endpoint.record_success(time.monotonic() - start)
+                return response
+
+        if response is None:
+            raise ConnectionError("no endpoint available of " + str([ endpoint.uri for endpoint in self.endpoints ]))
+
+        # invalid responses of all endpoints are reported by the caller
+        return response
+
+    def send_once(self, request):
+
+        # requests that are not idempotent, e.g. eth_sendRawTransaction, are sent to one endpoint only
+        endpoint = self.get_endpoints()[0]
+        start = time.monotonic()
+        try:
+            response = request(endpoint.provider)
+        except Exception:
+            endpoint.record_error()
+            raise
+        endpoint.record_success(time.monotonic() - start)
+        return response
+
+    def make_request(self, method, params):
+        self.start_health_checks()
+        if not method in rpc_scheduler.IDEMPOTENT_METHODS:
+            return self.send_once(lambda provider: provider.make_request(method, params))
+        return self.send(lambda provider: provider.make_request(method, params), rpc_batch.is_valid_response)
+
+    def make_batch_request(self, rpc_requests):
+        self.start_health_checks()
+        if not all(r["method"] in rpc_scheduler.IDEMPOTENT_METHODS for r in rpc_requests):
+            return self.send_once(lambda provider: rpc_batch.send_batch(provider, rpc_requests))
+        return self.send(lambda provider: rpc_batch.send_batch(provider, rpc_requests), rpc_batch.is_valid_batch_response)
+
+    def is_connected(self):
+        self.check_health()
+        return any(endpoint.healthy for endpoint in self.endpoints)
+
+    def isConnected(self):
+        return self.is_connected()
+
+    def start_health_checks(self):
+        with self.lock:
+            if self.health_check_thread is None and len(self.endpoints) > 1:
+                self.health_check_thread = threading.Thread(target=self.run_health_checks, daemon=True)
+                self.health_check_thread.start()
+
+    def run_health_checks(self):
+        while True:
+            time.sleep(self.health_check_interval)
+            self.check_health()
+
+    def check_health(self):
+
+        # all endpoints are probed concurrently for their tip and latency
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self.endpoints)) as executor:
+            list(executor.map(self.probe, self.endpoints))
+
+        tips = [ endpoint.tip for endpoint in self.endpoints if endpoint.healthy and not endpoint.tip is None ]
+        if len(tips) > 0:
+            for endpoint in self.endpoints:
+                if not endpoint.tip is None and endpoint.tip < max(tips) - MAX_BLOCK_LAG:
+                    endpoint.healthy = False
+
+    def probe(self, endpoint):
+        start = time.monotonic()
+        try:
+            response = endpoint.provider.make_request(rpc_batch.ETH_BLOCK_NUMBER, [])
+            endpoint.tip = int(response["result"], 16)
+        except Exception:
+            endpoint.record_error()
+            return
+        endpoint.record_success(time.monotonic() - start)
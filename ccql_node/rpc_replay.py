@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import threading
+import collections
+
+from web3.providers.base import BaseProvider
+
+from . import rpc_batch
+
+# fixture files of recorded JSON-RPC calls, one call per line, see get_fixture_file
+FIXTURE_EXTENSION = ".ndjson"
+
+
+def get_fixture_file(fixture_dir, chain_key):
+    # one fixture file per <blockchain>:<network>:<chain_descriptor>
+    return os.path.join(fixture_dir, chain_key.replace(":", "-") + FIXTURE_EXTENSION)
+
+
+def get_call_key(method, params):
+    return json.dumps([method, params], sort_keys=True)
+
+
+def get_response_content(response):
+    if "error" in response:
+        return { "error": response["error"] }
+    return { "result": response.get("result") }
+
+
+class Recording_Provider(BaseProvider):
+
+    # calls of the provider and their responses are written to the fixture file, batches are
+    # recorded per call, so that replays do not depend on the composition of batches
+    def __init__(self, provider, fixture_file):
+        self.provider = provider
+        self.providers = [provider]
+        self.fixture_file = fixture_file
+        self.lock = threading.Lock()
+
+        fixture_dir = os.path.dirname(fixture_file)
+        if fixture_dir != "":
+            os.makedirs(fixture_dir, exist_ok=True)
+        self.file = open(fixture_file, "w")
+
+    def record(self, calls):
+        with self.lock:
+            for (method, params, response) in calls:
+                self.file.write(json.dumps(dict({ "method": method, "params": params }, **get_response_content(response))) + "\n")
+            self.file.flush()
+
+    def make_request(self, method, params):
+        response = self.provider.make_request(method, params)
+        self.record([(method, params, response)])
+        return response
+
+    def make_batch_request(self, rpc_requests):
+        responses = rpc_batch.send_batch(self.provider, rpc_requests)
+        if isinstance(responses, list):
+            responses_by_id = { response.get("id"): response for response in responses }
+            self.record([ (r["method"], r["params"], responses_by_id[r["id"]]) for r in rpc_requests if r["id"] in responses_by_id ])
+        return responses
+
+    def is_connected(self):
+        return self.provider.isConnected()
+
+    def isConnected(self):
+        return self.is_connected()
+
+
+class Replay_Provider(BaseProvider):
+
+    # recorded responses are returned in the order of recording per call, the last response of a
+    # call is repeated, each request is delayed by latency seconds and call_latency seconds per call
+    concurrent = True
+
+    def __init__(self, fixture_file, latency=0, call_latency=0):
+        self.fixture_file = fixture_file
+        self.latency = latency
+        self.call_latency = call_latency
+        self.responses = collections.defaultdict(list)
+        self.positions = collections.defaultdict(int)
+        self.lock = threading.Lock()
+        self.n_requests = 0
+        self.n_calls = 0
+
+        if not os.path.exists(fixture_file):
+            print("Error: RPC fixture file not found:", fixture_file)
+            sys.exit()
+
+        with open(fixture_file) as file:
+            for line in file:
+                if line.strip() == "":
+                    continue
+                call = json.loads(line)
+                self.responses[get_call_key(call["method"], call["params"])].append(get_response_content(call))
+
+    def get_response(self, method, params, id):
+
+        key = get_call_key(method, params)
+        with self.lock:
+            self.n_calls += 1
+            if not key in self.responses:
+                # reported like errors of the endpoint
+                return { "jsonrpc": "2.0", "id": id, "error": { "code": -32000, "message": "call not recorded in " + self.fixture_file + ": " + key } }
+            responses = self.responses[key]
+            response = responses[min(self.positions[key], len(responses) - 1)]
+            self.positions[key] += 1
+
+        return dict({ "jsonrpc": "2.0", "id": id }, **response)
+
+    def delay(self, n_calls):
+        with self.lock:
+            self.n_requests += 1
+        if self.latency > 0 or self.call_latency > 0:
+            time.sleep(self.latency + self.call_latency * n_calls)
+
+    def make_request(self, method, params):
+        self.delay(1)
+        return self.get_response(method, params, 1)
+
+    def make_batch_request(self, rpc_requests):
+        self.delay(len(rpc_requests))
+        return [ self.get_response(r["method"], r["params"], r["id"]) for r in rpc_requests ]
+
+    def is_connected(self):
+        return True
+
+    def isConnected(self):
+        return self.is_connected()
@@ -0,0 +1,229 @@
+import time
+import random
+import threading
+import collections
+import concurrent.futures
+
+from web3.providers.base import BaseProvider
+
+from . import rpc_batch
+
+# seconds until a request to an endpoint is given up, see Scheduled_Provider
+REQUEST_TIMEOUT = 10
+
+# retries of failed, timed out or rate limited requests, with a random backoff of up to
+# RETRY_BACKOFF * 2^retry seconds
+REQUEST_RETRIES = 3
+RETRY_BACKOFF = 0.25
+RETRY_BACKOFF_MAX = 4
+
+# a duplicate of a request is sent if no response arrived within the HEDGE_PERCENTILE of the
+# latencies of the last LATENCY_SAMPLES requests
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+LATENCY_SAMPLES = 200
+
+# concurrent requests per endpoint, increased by one per limit of successful requests and halved
+# on errors, rate limits, or latencies above LATENCY_TOLERANCE times the lowest latency,
+# latencies are compared per JSON-RPC method and call of a batch
+CONCURRENCY_INITIAL = 4
+CONCURRENCY_MIN = 1
+CONCURRENCY_MAX = 32
+CONCURRENCY_DECREASE = 0.5
+LATENCY_TOLERANCE = 3
+LATENCY_SMOOTHING = 0.2
+
+# only idempotent reads are retried and hedged, other requests such as eth_sendRawTransaction
+# are sent once, a duplicate of a signed transaction would fail as already known
+IDEMPOTENT_METHODS = [ rpc_batch.ETH_BLOCK_NUMBER, rpc_batch.ETH_GET_BLOCK_BY_NUMBER, rpc_batch.ETH_GET_TRANSACTION_BY_HASH, rpc_batch.ETH_GET_BALANCE ]
+
+
+class Concurrency_Limit:
+
+    def __init__(self, limit=CONCURRENCY_INITIAL, min_limit=CONCURRENCY_MIN, max_limit=CONCURRENCY_MAX):
+        self.limit = limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.latency = {}
+        self.min_latency = {}
+        self.decreased = 0.
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def try_acquire(self):
+        with self.condition:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, key, latency=None):
+
+        # latency of a successful request, None for errors and rate limits
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            if not latency is None:
+                if not key in self.latency:
+                    self.latency[key] = latency
+                    self.min_latency[key] = latency
+                self.latency[key] += LATENCY_SMOOTHING * (latency - self.latency[key])
+                self.min_latency[key] = min(self.min_latency[key], latency)
+
+            if latency is None or self.latency[key] > LATENCY_TOLERANCE * self.min_latency[key]:
+                # requests in flight at a decrease do not decrease the limit again
+                if now - self.decreased > self.latency.get(key, 0):
+                    self.limit = max(self.min_limit, self.limit * CONCURRENCY_DECREASE)
+                    self.decreased = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+            self.condition.notify_all()
+
+    def free(self):
+        # slots of requests that do not change the limit, e.g. hedged duplicates
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+
+class Scheduled_Provider(BaseProvider):
+
+    # requests to one endpoint with timeouts, retries with jittered backoff, hedged duplicates of slow
+    # requests, and an AIMD concurrency limit, transport timeouts of the provider are set by the node
+    def __init__(self, provider, timeout=REQUEST_TIMEOUT, retries=REQUEST_RETRIES, hedged=True):
+        self.provider = provider
+        self.providers = [provider]
+        self.timeout = timeout
+        self.retries = retries
+
+        # a websocket connection is not shared by concurrent requests
+        self.concurrent = rpc_batch.is_http_provider(provider)
+        self.hedged = hedged and self.concurrent
+        if self.concurrent:
+            self.limit = Concurrency_Limit()
+        else:
+            self.limit = Concurrency_Limit(1, 1, 1)
+
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=LATENCY_SAMPLES))
+        self.executor = None
+        self.lock = threading.Lock()
+
+        self.n_requests = 0
+        self.n_retries = 0
+        self.n_hedged = 0
+        self.n_timeouts = 0
+
+    def get_hedge_delay(self, key, n_calls):
+        with self.lock:
+            if not self.hedged or len(self.latencies[key]) < HEDGE_MIN_SAMPLES:
+                return None
+            latencies = sorted(self.latencies[key])
+        return latencies[int(HEDGE_PERCENTILE * (len(latencies) - 1))] * n_calls
+
+    def get_backoff(self, retry):
+        return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2**retry))
+
+    def send(self, request, is_valid, key, n_calls=1):
+
+        # the last error is raised if all attempts failed, the last invalid response is returned
+        # if all attempts were rate limited, latencies are kept per key and call
+        error = None
+        response = None
+        for retry in range(self.retries + 1):
+            if retry > 0:
+                with self.lock:
+                    self.n_retries += 1
+                time.sleep(self.get_backoff(retry - 1))
+            with self.lock:
+                self.n_requests += 1
+
+            try:
+                response = self.send_attempt(request, is_valid, key, n_calls)
+                error = None
+                if is_valid(response):
+                    return response
+            except concurrent.futures.TimeoutError as e:
+                with self.lock:
+                    self.n_timeouts += 1
+                error = e
+            except Exception as e:
+                error = e
+
+        if not error is None:
+            raise error
+        return response
+
+    def release(self, future, is_valid, key, n_calls, start):
+
+        # the slot of a request is released when its own response arrived, also if a hedged
+        # duplicate answered first, with the latency of a valid response
+        latency = None
+        if future.exception() is None and is_valid(future.result()):
+            latency = (time.monotonic() - start) / n_calls
+            with self.lock:
+                self.latencies[key].append(latency)
+        self.limit.release(key, latency)
+
+    def send_attempt(self, request, is_valid, key, n_calls):
+
+        hedge_delay = self.get_hedge_delay(key, n_calls)
+        self.limit.acquire()
+        start = time.monotonic()
+
+        if hedge_delay is None:
+            # the transport timeout of the provider applies
+            future = concurrent.futures.Future()
+            try:
+                future.set_result(request(self.provider))
+            except Exception as e:
+                future.set_exception(e)
+            self.release(future, is_valid, key, n_calls, start)
+            return future.result()
+
+        with self.lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2 * CONCURRENCY_MAX)
+
+        futures = [self.executor.submit(request, self.provider)]
+        futures[0].add_done_callback(lambda future: self.release(future, is_valid, key, n_calls, start))
+        (done, pending) = concurrent.futures.wait(futures, timeout=hedge_delay)
+        if len(done) == 0 and self.limit.try_acquire():
+            # the duplicate request takes a free slot of the concurrency limit
+            futures.append(self.executor.submit(request, self.provider))
+            futures[-1].add_done_callback(lambda future: self.limit.free())
+            with self.lock:
+                self.n_hedged += 1
+
+        # the first response of either request is used
+        error = None
+        for future in concurrent.futures.as_completed(futures, timeout=self.timeout):
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+        raise error
+
+    def make_request(self, method, params):
+        if not method in IDEMPOTENT_METHODS:
+            return self.provider.make_request(method, params)
+        return self.send(lambda provider: provider.make_request(method, params), rpc_batch.is_valid_response, method)
+
+    def make_batch_request(self, rpc_requests):
+        if not all(r["method"] in IDEMPOTENT_METHODS for r in rpc_requests):
+            return rpc_batch.send_batch(self.provider, rpc_requests)
+        # batches are compared by their first method, e.g. blocks, transactions or balances
+        return self.send(lambda provider: rpc_batch.send_batch(provider, rpc_requests), rpc_batch.is_valid_batch_response,
+            "batch:" + rpc_requests[0]["method"], len(rpc_requests))
+
+    def is_connected(self):
+        return self.provider.isConnected()
+
+    def isConnected(self):
+        return self.is_connected()
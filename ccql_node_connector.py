@@ -1,186 +1,324 @@
-import sys
-
-from ccql_node import ccql_node
-from ccql_node import merkle_tree_hashing
-from ccql_node import data_coding
-
-from ccql_node import ccql_data
-
-class CCQL_Node_Connector:
-
-    node_connections = {}
-
-    def __init__(self, blockchain, network, chain_descriptor):
-        node = self.get_node_connection(blockchain, network, chain_descriptor)
-        self.node = node
-
-    def get_class_name_from_type(self, obj_type_class):
-        is_upper_case = True
-        for c in obj_type_class.__name__:
-            is_upper_case &= (c.upper() == c)
-        if is_upper_case:
-            return obj_type_class.__name__.lower()
-        else:
-            return obj_type_class.__name__[0].lower() + obj_type_class.__name__[1:]
-
-    def flatten_object_type_res(self, obj, obj_type_class, result_list, result_list_type):
-
-        if not obj is None:
-            result_list.append(obj)
-            type_attr_name = self.get_class_name_from_type(obj_type_class)
-            if not result_list_type is None:
-                object_type = getattr(obj, type_attr_name)
-                if not object_type is None:
-                    result_list_type.append(object_type)
-
-    def flatten_list_type_res(self, list, obj_type_class, result_list, result_list_type):
-
-        if not list is None and len(list) > 0:
-            for obj in list:
-                result_list.append(obj)
-                type_attr_name = self.get_class_name_from_type(obj_type_class)
-                if not result_list_type is None:
-                    object_type = getattr(obj, type_attr_name)
-                    if not object_type is None:
-                        result_list_type.append(object_type)
-
-    def get_blocks(self, number_from, number_to):
-
-        blocks = []
-        linked_block = None
-
-        for i in range(number_from, number_to+1):
-            result_list = self.get_block(i, linked_block)
-            if len(result_list) > 0:
-                block_i = result_list[-1]
-                blocks.append(block_i)
-                linked_block = block_i
-
-        return blocks
-
-    def get_block(self, id, linked_block_desc=None):
-
-        block_limit = 99999
-        linked_block_desc = None
-        block = self.node.get_block(id, linked_block_desc, block_limit)
-
-        if block is None:
-            print("Block not found, abort")
-            sys.exit()
-
-        block_res = [block]
-
-        # descriptor of block with status and linked blocks
-        block_desc_res = []
-        status_res = []
-        linked_block_desc_res = []
-
-        self.flatten_object_type_res(block.descriptor, ccql_data.Status, block_desc_res, status_res)
-        self.flatten_list_type_res(block.linkedBlockDescriptor, ccql_data.Status, linked_block_desc_res, None)
-
-        # descriptor of validation and validators        
-        validation_desc_res = []
-        val_desc_proposer_res = []
-        val_desc_creator_res = []
-        val_desc_attestations_res = []
-
-        self.flatten_object_type_res(block.validationDescriptor, ccql_data.ValidationDescriptor, validation_desc_res, None)
-        self.flatten_list_type_res(block.validationDescriptor.proposer, ccql_data.ValidatorDescriptor, val_desc_proposer_res, None)
-        self.flatten_list_type_res(block.validationDescriptor.creator, ccql_data.ValidatorDescriptor, val_desc_creator_res, None)
-        self.flatten_list_type_res(block.validationDescriptor.attestations, ccql_data.ValidatorDescriptor, val_desc_attestations_res, None)
-
-        # transactions and accounts
-        tx_res = []
-        acc_res = []
-        
-        self.flatten_list_type_res(block.transactions, ccql_data.TransactionDescriptor, tx_res, None)
-        self.flatten_list_type_res(block.accounts, ccql_data.AccountDescriptor, acc_res, None)
-
-        return (block_res, block_desc_res, status_res, linked_block_desc_res, validation_desc_res, val_desc_proposer_res, val_desc_creator_res, val_desc_attestations_res, tx_res, acc_res)
-        # path = data_coding.decode_cid_bytes32(path_b)
-        # path = data_coding.decode_str_bytes32(path_b)
-
-    def get_account(self, id):
-
-        account = self.node.get_account(id)
-
-        acc_res = []
-        acc_desc_res = []
-
-        if account is None:
-            print("Account not found, abort")
-            sys.exit()
-
-        self.flatten_object_type_res(account, ccql_data.AccountDescriptor, acc_res, acc_desc_res)
-
-        ass_res = []
-        ass_type_res = []
-        tok_res = []
-        tok_type_res = []
-        dat_res = []
-        str_type_res = []
-
-        self.flatten_list_type_res(account.assets, ccql_data.AssetType, ass_res, ass_type_res)
-        self.flatten_list_type_res(account.tokens, ccql_data.TokenType, tok_res, tok_type_res)
-        self.flatten_list_type_res(account.data, ccql_data.StorageType, dat_res, str_type_res)
-
-        return (acc_res, acc_desc_res, ass_res, ass_type_res, tok_res, tok_type_res, dat_res, str_type_res)
-        # path = data_coding.decode_cid_bytes32(path_b)
-        # path = data_coding.decode_str_bytes32(path_b)
-
-    def get_transaction(self, id):
-
-        tx = self.node.get_transaction(id)
-
-        if tx is None:
-            print("Transaction not found, abort")
-            sys.exit()
-
-        tx_res = [tx]
-        tx_desc_res = []
-        tx_utxo_res = []
-
-        self.flatten_list_type_res(tx.descriptor, ccql_data.UTXO, tx_desc_res, tx_utxo_res)
-
-        return (tx_res, tx_desc_res, tx_utxo_res)
-
-
-    def get_node_connection(self, blockchain, network, chain_descriptor):
-
-        node = None
-        key = blockchain + ":" + network + ":" + chain_descriptor
-
-        if key in CCQL_Node_Connector.node_connections.keys():
-            node = CCQL_Node_Connector.node_connections[key]
-
-        else:
-            node = ccql_node.CCQL_Node() 
-
-            bc = ccql_data.get_bc_by_id(blockchain, network, chain_descriptor)
-
-            if not node is None and not bc is None:
-                if bc.id == "eth":
-                    identity = "0x0"
-                    print("Create connection to Web3 Ethereum node ...")
-                    node = ccql_node.Web3_Eth_Node(identity)
-                if bc.id == "btc":
-                    identity = "0x0"
-                    print("Create connection to Bitcoin node ...")
-                    node = ccql_node.Bitcoin_Node(identity)
-                if bc.id == "ada":
-                    identity = "0x0"
-                    print("Create connection to Cardano node ...")
-                    node = ccql_node.Cardano_Node(identity)
-                if bc.id == "avax":
-                    identity = "0x0"
-                    print("Create connection to Avalanche node ...")
-                    node = ccql_node.Web3_Avalanche_Node(identity)
-            if bc is None:
-                print("No node connection available for", key)
-            if not node.is_connected():
-                print("Node not connected for chain:", bc.id)
-                sys.exit()
-
-            CCQL_Node_Connector.node_connections[key] = node
-
-        return node
+import sys
+import threading
+import collections
+import contextvars
+import concurrent.futures
+
+from ccql_node import ccql_node
+from ccql_node import block_cache
+from ccql_node import merkle_tree_hashing
+from ccql_node import data_coding
+
+from ccql_node import ccql_data
+from ccql_node import rpc_replay
+from ccql_node import query_profile
+
+class CCQL_Node_Connector:
+
+    node_connections = {}
+    node_connection_locks = {}
+    node_connections_lock = threading.Lock()
+
+    # blocks per batch request and batch requests in flight when scanning block ranges
+    SCAN_BATCH_SIZE = 100
+    SCAN_WORKERS = 4
+
+    # JSON-RPC calls of all chains are recorded to or replayed from fixture files in these directories,
+    # replayed requests are delayed by replay_latency seconds, see module rpc_replay
+    rpc_record_dir = None
+    rpc_replay_dir = None
+    replay_latency = 0
+
+    def __init__(self, blockchain, network, chain_descriptor):
+        node = self.get_node_connection(blockchain, network, chain_descriptor)
+        self.node = node
+
+    def get_class_name_from_type(self, obj_type_class):
+        is_upper_case = True
+        for c in obj_type_class.__name__:
+            is_upper_case &= (c.upper() == c)
+        if is_upper_case:
+            return obj_type_class.__name__.lower()
+        else:
+            return obj_type_class.__name__[0].lower() + obj_type_class.__name__[1:]
+
+    def flatten_object_type_res(self, obj, obj_type_class, result_list, result_list_type):
+
+        if not obj is None:
+            result_list.append(obj)
+            type_attr_name = self.get_class_name_from_type(obj_type_class)
+            if not result_list_type is None:
+                object_type = getattr(obj, type_attr_name)
+                if not object_type is None:
+                    result_list_type.append(object_type)
+
+    def flatten_list_type_res(self, list, obj_type_class, result_list, result_list_type):
+
+        if not list is None and len(list) > 0:
+            for obj in list:
+                result_list.append(obj)
+                type_attr_name = self.get_class_name_from_type(obj_type_class)
+                if not result_list_type is None:
+                    object_type = getattr(obj, type_attr_name)
+                    if not object_type is None:
+                        result_list_type.append(object_type)
+
+    def flatten_measured(self, flatten, obj):
+
+        # flattened objects are counted for EXPLAIN ANALYZE, see module query_profile
+        with query_profile.measure(query_profile.STAGE_FLATTEN):
+            res = flatten(obj)
+        if not query_profile.get_profile() is None:
+            query_profile.add(query_profile.STAGE_FLATTEN, objects=sum(len(r) for r in res))
+        return res
+
+    def merge_res(self, res_list):
+
+        # merge the result lists of several flattened objects, e.g. blocks
+        merged_res = None
+        for res in res_list:
+            if merged_res is None:
+                merged_res = tuple([] for r in res)
+            for merged_r, r in zip(merged_res, res):
+                merged_r.extend(r)
+        return merged_res
+
+    def get_blocks(self, number_from, number_to, tx_limit=None, tx_offset=0, full_transactions=True, columnar_transactions=False):
+
+        linked_block_desc = None
+        blocks = self.node.get_blocks(range(number_from, number_to+1), linked_block_desc, tx_limit, tx_offset, full_transactions, columnar_transactions)
+
+        return self.merge_res(self.flatten_blocks(blocks))
+
+    def select_block_ids(self, id_list, height_ranges):
+
+        # block heights outside of the height ranges of the filter clause are skipped, block depths are kept
+        if height_ranges is None:
+            return id_list
+
+        block_ids = []
+        for id in id_list:
+            if not str(id).isnumeric() or any(height_from <= int(id) <= height_to for (height_from, height_to) in height_ranges):
+                block_ids.append(id)
+        return block_ids
+
+    def scan_blocks(self, id_list, tx_limit=None, tx_offset=0, full_transactions=True, columnar_transactions=False):
+
+        # tx_limit and tx_offset select the transactions of each block, see LIMIT and OFFSET clauses,
+        # without full_transactions no transactions are requested and converted,
+        # with columnar_transactions the transactions of a block are returned as ccql_data.TransactionColumns
+        linked_block_desc = None
+
+        workers = self.SCAN_WORKERS
+        if not self.node.supports_concurrent_requests():
+            workers = 1
+
+        batches = [ id_list[i:i+self.SCAN_BATCH_SIZE] for i in range(0, len(id_list), self.SCAN_BATCH_SIZE) ]
+
+        # at most <workers> batches are fetched concurrently, blocks are returned in the order of id_list
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = collections.deque()
+            for batch in batches:
+                pending.append(executor.submit(contextvars.copy_context().run, self.node.get_blocks, batch, linked_block_desc, tx_limit, tx_offset, full_transactions, columnar_transactions))
+                if len(pending) >= workers:
+                    yield from self.flatten_blocks(pending.popleft().result())
+            while len(pending) > 0:
+                yield from self.flatten_blocks(pending.popleft().result())
+
+    def flatten_blocks(self, blocks):
+
+        for block in blocks:
+            if block is None:
+                print("Block not found, abort")
+                sys.exit()
+            yield self.flatten_measured(self.flatten_block, block)
+
+    def get_block(self, id, linked_block_desc=None, tx_limit=None, tx_offset=0, full_transactions=True, columnar_transactions=False):
+
+        block = self.node.get_block(id, linked_block_desc, tx_limit, tx_offset, full_transactions, columnar_transactions)
+
+        if block is None:
+            print("Block not found, abort")
+            sys.exit()
+
+        return self.flatten_block(block)
+
+    def flatten_block(self, block):
+
+        block_res = [block]
+
+        # descriptor of block with status and linked blocks
+        block_desc_res = []
+        status_res = []
+        linked_block_desc_res = []
+
+        self.flatten_object_type_res(block.descriptor, ccql_data.Status, block_desc_res, status_res)
+        self.flatten_list_type_res(block.linkedBlockDescriptor, ccql_data.Status, linked_block_desc_res, None)
+
+        # descriptor of validation and validators        
+        validation_desc_res = []
+        val_desc_proposer_res = []
+        val_desc_creator_res = []
+        val_desc_attestations_res = []
+
+        self.flatten_object_type_res(block.validationDescriptor, ccql_data.ValidationDescriptor, validation_desc_res, None)
+        self.flatten_list_type_res(block.validationDescriptor.proposer, ccql_data.ValidatorDescriptor, val_desc_proposer_res, None)
+        self.flatten_list_type_res(block.validationDescriptor.creator, ccql_data.ValidatorDescriptor, val_desc_creator_res, None)
+        self.flatten_list_type_res(block.validationDescriptor.attestations, ccql_data.ValidatorDescriptor, val_desc_attestations_res, None)
+
+        # transactions and accounts
+        tx_res = []
+        acc_res = []
+        
+        # transaction columns are passed on as one result list
+        if isinstance(block.transactions, ccql_data.TransactionColumns):
+            tx_res = block.transactions
+        else:
+            self.flatten_list_type_res(block.transactions, ccql_data.TransactionDescriptor, tx_res, None)
+        self.flatten_list_type_res(block.accounts, ccql_data.AccountDescriptor, acc_res, None)
+
+        return (block_res, block_desc_res, status_res, linked_block_desc_res, validation_desc_res, val_desc_proposer_res, val_desc_creator_res, val_desc_attestations_res, tx_res, acc_res)
+        # path = data_coding.decode_cid_bytes32(path_b)
+        # path = data_coding.decode_str_bytes32(path_b)
+
+    def get_accounts(self, id_list):
+
+        return self.merge_res(self.scan_accounts(id_list))
+
+    def scan_accounts(self, id_list):
+
+        accounts = self.node.get_accounts(id_list)
+
+        for account in accounts:
+            if account is None:
+                print("Account not found, abort")
+                sys.exit()
+            yield self.flatten_measured(self.flatten_account, account)
+
+    def get_account(self, id):
+
+        account = self.node.get_account(id)
+
+        if account is None:
+            print("Account not found, abort")
+            sys.exit()
+
+        return self.flatten_account(account)
+
+    def flatten_account(self, account):
+
+        acc_res = []
+        acc_desc_res = []
+
+        self.flatten_object_type_res(account, ccql_data.AccountDescriptor, acc_res, acc_desc_res)
+
+        ass_res = []
+        ass_type_res = []
+        tok_res = []
+        tok_type_res = []
+        dat_res = []
+        str_type_res = []
+
+        self.flatten_list_type_res(account.assets, ccql_data.AssetType, ass_res, ass_type_res)
+        self.flatten_list_type_res(account.tokens, ccql_data.TokenType, tok_res, tok_type_res)
+        self.flatten_list_type_res(account.data, ccql_data.StorageType, dat_res, str_type_res)
+
+        return (acc_res, acc_desc_res, ass_res, ass_type_res, tok_res, tok_type_res, dat_res, str_type_res)
+        # path = data_coding.decode_cid_bytes32(path_b)
+        # path = data_coding.decode_str_bytes32(path_b)
+
+    def select_transaction_ids(self, id_list, transaction_ids):
+
+        # transactions not matching the ids of the filter clause are skipped
+        if transaction_ids is None:
+            return id_list
+
+        return [ id for id in id_list if id.lower() in transaction_ids ]
+
+    def get_transactions(self, id_list, tx_limit=None, tx_offset=0):
+
+        txs_res = list(self.scan_transactions(id_list, tx_limit, tx_offset))
+
+        # no transactions remain for an OFFSET beyond the transaction list
+        if len(txs_res) == 0:
+            return ([], [], [])
+
+        return self.merge_res(txs_res)
+
+    def scan_transactions(self, id_list, tx_limit=None, tx_offset=0):
+
+        # only the transactions selected by LIMIT and OFFSET are requested
+        txs = self.node.get_transactions(ccql_node.slice_transactions(id_list, tx_limit, tx_offset))
+
+        for tx in txs:
+            if tx is None:
+                print("Transaction not found, abort")
+                sys.exit()
+            yield self.flatten_measured(self.flatten_transaction, tx)
+
+    def get_transaction(self, id):
+
+        tx = self.node.get_transaction(id)
+
+        if tx is None:
+            print("Transaction not found, abort")
+            sys.exit()
+
+        return self.flatten_transaction(tx)
+
+    def flatten_transaction(self, tx):
+
+        tx_res = [tx]
+        tx_desc_res = []
+        tx_utxo_res = []
+
+        self.flatten_list_type_res(tx.descriptor, ccql_data.UTXO, tx_desc_res, tx_utxo_res)
+
+        return (tx_res, tx_desc_res, tx_utxo_res)
+
+
+    def get_node_connection(self, blockchain, network, chain_descriptor):
+
+        node = None
+        key = blockchain + ":" + network + ":" + chain_descriptor
+
+        # a node is created once per chain, also by concurrent sources and requests of the query server
+        with CCQL_Node_Connector.node_connections_lock:
+            lock = CCQL_Node_Connector.node_connection_locks.setdefault(key, threading.Lock())
+
+        with lock:
+            if key in CCQL_Node_Connector.node_connections.keys():
+                node = CCQL_Node_Connector.node_connections[key]
+
+            else:
+                chain = ccql_data.get_chain(blockchain, network, chain_descriptor)
+
+                if chain is None or chain["node"] is None:
+                    print("No node connection available for", key)
+                    sys.exit()
+
+                # node class, endpoints, and node settings of the chain registry, see ccql_node/chains.json
+                settings = dict(chain.get("settings") or {})
+                if not self.rpc_record_dir is None:
+                    settings["RPC_RECORD_FILE"] = rpc_replay.get_fixture_file(self.rpc_record_dir, key)
+                if not self.rpc_replay_dir is None:
+                    settings["RPC_REPLAY_FILE"] = rpc_replay.get_fixture_file(self.rpc_replay_dir, key)
+                    settings["REPLAY_LATENCY"] = self.replay_latency
+
+                identity = "0x0"
+                print("Create connection to", chain["name"], "node ...")
+                node = getattr(ccql_node, chain["node"])(identity, chain.get("endpoints"), settings)
+
+                # an unavailable node is reported by the caller and connected again by the next query
+                if not node.is_connected():
+                    raise ConnectionError("Node not connected for chain: " + key)
+
+                # recorded and replayed calls bypass the persistent cache: fixtures contain all calls of a query,
+                # replayed blocks are not cached as blocks of the live chain
+                if getattr(node, "RPC_RECORD_FILE", None) is None and getattr(node, "RPC_REPLAY_FILE", None) is None:
+                    node.cache = block_cache.Block_Cache(key)
+                node.chain_key = key
+
+                CCQL_Node_Connector.node_connections[key] = node
+
+        return node
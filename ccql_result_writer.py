@@ -0,0 +1,200 @@
+import sys
+import csv
+import json
+import decimal
+
+# result formats, see get_result_writer
+FORMAT_TEXT = "text"
+FORMAT_NDJSON = "ndjson"
+FORMAT_CSV = "csv"
+FORMAT_ARROW = "arrow"
+FORMAT_PARQUET = "parquet"
+
+# rows per Arrow record batch and Parquet row group
+ARROW_BATCH_SIZE = 10000
+
+
+class Result_Writer:
+
+    # result rows are written as they are generated, values keep their types
+    binary = False
+    content_type = "text/plain; charset=utf-8"
+
+    def __init__(self, output=None):
+        self.output = output
+        self.n_rows = 0
+        self.columns = []
+        self.types = []
+        self.file = None
+
+    def open(self, columns, types=None):
+        # types of the column values, e.g. ccql_data.ATTRIBUTE_TYPES, None for columns of several types
+        self.columns = columns
+        self.types = types if not types is None else [None] * len(columns)
+        if self.output is None:
+            self.file = sys.stdout.buffer if self.binary else sys.stdout
+        elif hasattr(self.output, "write"):
+            # file objects, e.g. response buffers of the query server
+            self.file = self.output
+        elif self.binary:
+            self.file = open(self.output, "wb")
+        else:
+            self.file = open(self.output, "w", newline="")
+
+    def write_row(self, row):
+        self.n_rows += 1
+
+    def close(self):
+        self.file.flush()
+        if isinstance(self.output, str):
+            self.file.close()
+        return self.n_rows
+
+
+class Text_Result_Writer(Result_Writer):
+
+    def open(self, columns, types=None):
+        super().open(columns, types)
+        self.file.write("\nQuery results:\n\n")
+        self.file.write("".join(str(c) + "|" for c in columns) + "\n")
+
+    def write_row(self, row):
+        super().write_row(row)
+        self.file.write("".join(str(value) + "|" for value in row) + "\n")
+
+    def close(self):
+        self.file.write("\nNumber of rows: " + str(self.n_rows) + "\n\n")
+        return super().close()
+
+
+class NDJSON_Result_Writer(Result_Writer):
+
+    content_type = "application/x-ndjson"
+
+    def write_row(self, row):
+        super().write_row(row)
+        self.file.write(json.dumps(dict(zip(self.columns, row)), default=str) + "\n")
+
+
+class CSV_Result_Writer(Result_Writer):
+
+    content_type = "text/csv; charset=utf-8"
+
+    def open(self, columns, types=None):
+        super().open(columns, types)
+        self.csv_writer = csv.writer(self.file)
+        self.csv_writer.writerow(columns)
+
+    def write_row(self, row):
+        super().write_row(row)
+        self.csv_writer.writerow(row)
+
+
+class Arrow_Result_Writer(Result_Writer):
+
+    binary = True
+    content_type = "application/vnd.apache.arrow.stream"
+
+    def __init__(self, output=None):
+        super().__init__(output)
+
+        # pyarrow is only required for the arrow and parquet formats
+        try:
+            import pyarrow
+        except ImportError:
+            print("Error: result formats", FORMAT_ARROW, "and", FORMAT_PARQUET, "require the Python module pyarrow")
+            sys.exit()
+
+        self.pa = pyarrow
+        self.rows = []
+        self.schema = None
+        self.writer = None
+        self.invalid_columns = set()
+
+    def open(self, columns, types=None):
+
+        # the schema is given by the types of the queried attributes, columns of several types are strings
+        super().open(columns, types)
+        arrow_types = {
+            bool: self.pa.bool_(),
+            int: self.pa.int64(),
+            float: self.pa.float64(),
+            str: self.pa.string(),
+            decimal.Decimal: self.pa.decimal128(38, 0)
+        }
+        self.schema = self.pa.schema([ self.pa.field(column, arrow_types.get(value_type, self.pa.string())) for (column, value_type) in zip(self.columns, self.types) ])
+        self.writer = self.new_writer(self.schema)
+
+    def write_row(self, row):
+        super().write_row(row)
+        self.rows.append(row)
+        if len(self.rows) >= ARROW_BATCH_SIZE:
+            self.write_batch()
+
+    def write_batch(self):
+
+        arrays = []
+        for (j, field) in enumerate(self.schema):
+            arrays.append(self.get_array([ row[j] for row in self.rows ], field))
+
+        self.writer.write_batch(self.pa.record_batch(arrays, schema=self.schema))
+        self.rows = []
+
+    def get_array(self, values, field):
+
+        if self.pa.types.is_string(field.type):
+            return self.pa.array([ None if value is None else str(value) for value in values ], type=field.type)
+        try:
+            return self.pa.array(values, type=field.type)
+        except (self.pa.ArrowInvalid, self.pa.ArrowTypeError, OverflowError):
+            pass
+
+        # values not of the type of the attribute, e.g. amounts beyond decimal128, are written as null,
+        # the stream is not ended mid-way and the results are reported on stderr, not in the stream
+        if not field.name in self.invalid_columns:
+            self.invalid_columns.add(field.name)
+            print("Error: values of", field.name, "not of type", field.type, "are written as null", file=sys.stderr)
+        return self.pa.array([ self.get_value(value, field.type) for value in values ], type=field.type)
+
+    def get_value(self, value, value_type):
+        try:
+            self.pa.scalar(value, type=value_type)
+            return value
+        except (self.pa.ArrowInvalid, self.pa.ArrowTypeError, OverflowError):
+            return None
+
+    def new_writer(self, schema):
+        return self.pa.ipc.new_stream(self.file, schema)
+
+    def close(self):
+        if len(self.rows) > 0 or self.n_rows == 0:
+            self.write_batch()
+        self.writer.close()
+        return super().close()
+
+
+class Parquet_Result_Writer(Arrow_Result_Writer):
+
+    content_type = "application/vnd.apache.parquet"
+
+    def new_writer(self, schema):
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetWriter(self.file, schema)
+
+
+RESULT_WRITERS = {
+    FORMAT_TEXT: Text_Result_Writer,
+    FORMAT_NDJSON: NDJSON_Result_Writer,
+    FORMAT_CSV: CSV_Result_Writer,
+    FORMAT_ARROW: Arrow_Result_Writer,
+    FORMAT_PARQUET: Parquet_Result_Writer
+}
+
+
+def get_result_writer(result_format, output=None):
+
+    if not result_format in RESULT_WRITERS:
+        print("Error: result format", result_format, "not in", list(RESULT_WRITERS.keys()))
+        sys.exit()
+
+    return RESULT_WRITERS[result_format](output)
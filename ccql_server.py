@@ -0,0 +1,223 @@
+import os
+import io
+import sys
+import getopt
+import threading
+import contextvars
+import socketserver
+import http.server
+import urllib.parse
+
+import ccql
+import ccql_result_writer
+
+from ccql_node import metrics
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8547
+
+QUERY_PATH = "/query"
+HEALTH_PATH = "/health"
+METRICS_PATH = "/metrics"
+
+
+def print_usage():
+    print("Usage: ccql_server.py [-h|--help] [-b|--bind <host>] [-p|--port <port>] [-s|--socket <path>] [-u|--unlock]")
+    print("  [-m|--metrics <exporter>]")
+    print("")
+    print("CCQL query server, node connections and caches are kept between queries.")
+    print("")
+    print("POST " + QUERY_PATH + "?format=<format> with the query statement as request body")
+    print("  to http://<host>:<port> (default " + SERVER_HOST + ":" + str(SERVER_PORT) + ") or the Unix socket <path>")
+    print("  <format> in", list(ccql_result_writer.RESULT_WRITERS.keys()))
+    print("")
+    print("-u|--unlock decrypts the identity at startup, otherwise on the first signing operation")
+    print("")
+    print("-m|--metrics exports metrics and traces to <exporter> = histograms, prometheus:<file> or otlp[:<collector url>],")
+    print("  with metrics enabled, GET " + METRICS_PATH + " returns them in the Prometheus text format")
+    print("")
+    sys.exit()
+
+
+class Query_Output:
+
+    # messages of a query are written to the buffer of its context, including the threads of its sources,
+    # other messages to the stream
+    def __init__(self, stream):
+        self.stream = stream
+        self.messages = contextvars.ContextVar("messages", default=None)
+
+    def get_stream(self):
+        messages = self.messages.get()
+        if messages is None:
+            return self.stream
+        return messages
+
+    def write(self, s):
+        return self.get_stream().write(s)
+
+    def flush(self):
+        self.get_stream().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def run_query(query_statement, result_format):
+
+    # result and messages of a query as (status, content type, body)
+    if not result_format in ccql_result_writer.RESULT_WRITERS:
+        return (400, "text/plain; charset=utf-8", ("Error: result format " + result_format + " not in " + str(list(ccql_result_writer.RESULT_WRITERS.keys()))).encode("utf-8"))
+
+    result_writer_class = ccql_result_writer.RESULT_WRITERS[result_format]
+    if result_writer_class.binary:
+        output = io.BytesIO()
+    else:
+        output = io.StringIO()
+
+    messages = io.StringIO()
+    token = sys.stdout.messages.set(messages)
+    try:
+        ccql.process_query(query_statement.split(), result_format, output)
+    except SystemExit:
+        # query errors are reported with sys.exit
+        return (400, "text/plain; charset=utf-8", messages.getvalue().encode("utf-8"))
+    except ConnectionError as e:
+        # nodes not connected or without an available endpoint
+        return (503, "text/plain; charset=utf-8", (messages.getvalue() + "Error: " + str(e) + "\n").encode("utf-8"))
+    except Exception as e:
+        return (500, "text/plain; charset=utf-8", (messages.getvalue() + "Error: " + repr(e) + "\n").encode("utf-8"))
+    finally:
+        sys.stdout.messages.reset(token)
+
+    body = output.getvalue()
+    if not result_writer_class.binary:
+        body = body.encode("utf-8")
+    return (200, result_writer_class.content_type, body)
+
+
+class CCQL_Request_Handler(http.server.BaseHTTPRequestHandler):
+
+    server_version = "CCQL/0.1"
+
+    def do_GET(self):
+        if urllib.parse.urlparse(self.path).path == HEALTH_PATH:
+            self.send_body(200, "text/plain; charset=utf-8", ccql.CCQL_VERSION.encode("utf-8"))
+        elif urllib.parse.urlparse(self.path).path == METRICS_PATH and metrics.is_enabled():
+            self.send_body(200, "text/plain; version=0.0.4; charset=utf-8", metrics.get_prometheus_text().encode("utf-8"))
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+
+        url = urllib.parse.urlparse(self.path)
+        if url.path != QUERY_PATH:
+            self.send_error(404)
+            return
+
+        parameters = urllib.parse.parse_qs(url.query)
+        result_format = parameters.get("format", [ccql_result_writer.FORMAT_TEXT])[0]
+
+        content_length = int(self.headers.get("Content-Length", 0))
+        query_statement = self.rfile.read(content_length).decode("utf-8")
+
+        self.send_body(*run_query(query_statement, result_format))
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # clients of the Unix socket have no address
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+    def log_message(self, format, *args):
+        sys.stderr.write("%s - [%s] %s\n" % (self.address_string(), self.log_date_time_string(), format % args))
+
+
+class Unix_HTTP_Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+
+
+def serve(host, port, socket_path, unlock=False):
+
+    # the decrypted identity is kept by the identity provider for all queries
+    if unlock:
+        import ccql_identity_provider
+        ccql_identity_provider.CCQL_Identity_Provider().get_identity()
+
+    sys.stdout = Query_Output(sys.stdout)
+
+    servers = []
+    if not port is None:
+        servers.append(http.server.ThreadingHTTPServer((host, port), CCQL_Request_Handler))
+        print("Serving queries on http://" + host + ":" + str(port) + QUERY_PATH)
+    if not socket_path is None:
+        servers.append(Unix_HTTP_Server(socket_path, CCQL_Request_Handler))
+        print("Serving queries on Unix socket", socket_path)
+
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        servers[0].serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.server_close()
+        if not socket_path is None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def parse_cli():
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hb:p:s:um:",
+            ["help", "bind=", "port=", "socket=", "unlock", "metrics="])
+
+    except getopt.GetoptError as err:
+        print(err)
+        print_usage()
+
+    host = SERVER_HOST
+    port = SERVER_PORT
+    socket_path = None
+    unlock = False
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print_usage()
+        elif opt in ("-b", "--bind"):
+            host = arg
+        elif opt in ("-p", "--port"):
+            if not arg.isnumeric():
+                print("Error: port is not numeric")
+                sys.exit()
+            port = int(arg)
+        elif opt in ("-s", "--socket"):
+            socket_path = arg
+        elif opt in ("-u", "--unlock"):
+            unlock = True
+        elif opt in ("-m", "--metrics"):
+            metrics.add_exporter(metrics.get_exporter(arg))
+
+    # only the Unix socket is served if given without a port
+    if not socket_path is None and not any(opt in ("-p", "--port", "-b", "--bind") for (opt, arg) in opts):
+        port = None
+
+    serve(host, port, socket_path, unlock)
+
+if __name__ == "__main__":
+    parse_cli()
@@ -0,0 +1,42 @@
+import os
+import sys
+import subprocess
+import unittest
+
+CCQL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# microseconds of all imports of ccql.py -h, including the interpreter startup
+IMPORT_TIME_BUDGET = 100000
+
+# modules only loaded when a query has sources
+DEFERRED_MODULES = [ "web3", "requests", "asyncio" ]
+
+
+def get_import_times(args):
+
+    # cumulative import time per module in microseconds by -X importtime, nested imports are indented
+    process = subprocess.run([sys.executable, "-X", "importtime", os.path.join(CCQL_DIR, "ccql.py")] + args,
+        cwd=CCQL_DIR, capture_output=True, text=True)
+    import_times = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        (self_time, cumulative_time, module) = line[len("import time:"):].split("|")
+        import_times.append((module[1:].rstrip(), int(cumulative_time)))
+    return import_times
+
+
+class Import_Time_Test(unittest.TestCase):
+
+    def test_help_without_deferred_modules(self):
+        modules = [ module.strip() for (module, cumulative_time) in get_import_times(["-h"]) ]
+        for module in DEFERRED_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_help_within_budget(self):
+        total = sum(cumulative_time for (module, cumulative_time) in get_import_times(["-h"]) if not module.startswith(" "))
+        self.assertLess(total, IMPORT_TIME_BUDGET)
+
+
+if __name__ == "__main__":
+    unittest.main()